@@ -88,10 +88,16 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
 }
 
+# Authenticated users are cached for a short time instead of loaded on every request (0 disables).
+# Point the alias at a shared cache (Redis, Memcached) so revocations reach every process at once; with a
+# per-process one, tokens revoked elsewhere keep working until the entry expires.
+AUTH_USER_CACHE_ALIAS = config('AUTH_USER_CACHE_ALIAS', default='default')
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', cast=int, default=60)  # seconds
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
@@ -100,6 +106,7 @@ SIMPLE_JWT = {
 
     'ALGORITHM': 'HS256',
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'AUTH_TOKEN_CLASSES': ('users.authentication.VersionedAccessToken',),
 
     # Disable refresh token issuing completely
     'ISSUE_REFRESH_TOKEN': False,
@@ -187,6 +194,23 @@ LOGGING = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media storage. ContentAddressedStorage keeps each file once under its SHA-256
+# (HTML Brotli-compressed); `manage.py compact_media` adopts older files and
+# removes unreferenced ones.
+MEDIA_STORAGE_BACKEND = config('MEDIA_STORAGE_BACKEND', default='documents.storage.ContentAddressedStorage')
+MEDIA_BROTLI_QUALITY = config('MEDIA_BROTLI_QUALITY', cast=int, default=9)
+STORAGES = {
+    'default': {'BACKEND': MEDIA_STORAGE_BACKEND},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# How document PDFs are sent once access is checked: 'django' streams them from
+# the worker, 'x-accel' (nginx) or 'x-sendfile' (Apache, lighttpd) hands the
+# file to the front proxy. For x-accel, FILE_SERVE_ACCEL_PREFIX must be an
+# internal location aliased to MEDIA_ROOT.
+FILE_SERVE_MODE = config('FILE_SERVE_MODE', default='django')
+FILE_SERVE_ACCEL_PREFIX = config('FILE_SERVE_ACCEL_PREFIX', default='/protected-media/')
+
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='localhost')
 EMAIL_PORT = config('EMAIL_PORT', cast=int, default=587)
@@ -196,6 +220,104 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 
-OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+# Email outbox (documents/utils/outbox.py), delivered by `manage.py run_email_worker`
+EMAIL_OUTBOX_EAGER = config('EMAIL_OUTBOX_EAGER', cast=bool, default=False)  # deliver on commit, without a worker
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', cast=int, default=50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', cast=int, default=5)
+EMAIL_OUTBOX_RETRY_BACKOFF = config('EMAIL_OUTBOX_RETRY_BACKOFF', cast=int, default=30)  # seconds, doubled per attempt
+EMAIL_OUTBOX_POLL_INTERVAL = config('EMAIL_OUTBOX_POLL_INTERVAL', cast=float, default=5.0)
+SIGNER_EMAIL_ATTACH_PDF = config('SIGNER_EMAIL_ATTACH_PDF', cast=bool, default=True)  # False sends only the sign link
 
-FERNET_KEY = config('FERNET_KEY', default='')
\ No newline at end of file
+OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')  # e.g. http://127.0.0.1:8787/v1 for `manage.py run_openai_stub`
+
+# Shared AI client (documents/utils/ai_client.py)
+AI_CONNECT_TIMEOUT = config('AI_CONNECT_TIMEOUT', cast=float, default=5.0)
+AI_READ_TIMEOUT = config('AI_READ_TIMEOUT', cast=float, default=60.0)
+AI_MAX_CONNECTIONS = config('AI_MAX_CONNECTIONS', cast=int, default=20)
+AI_MAX_CONCURRENCY = config('AI_MAX_CONCURRENCY', cast=int, default=8)  # in-flight AI calls per process
+AI_ACQUIRE_TIMEOUT = config('AI_ACQUIRE_TIMEOUT', cast=float, default=30.0)
+AI_MAX_RETRIES = config('AI_MAX_RETRIES', cast=int, default=3)
+AI_RETRY_BACKOFF = config('AI_RETRY_BACKOFF', cast=float, default=0.5)  # seconds, doubled per attempt
+AI_RETRY_MAX_DELAY = config('AI_RETRY_MAX_DELAY', cast=float, default=20.0)
+
+# Clause generation latency budgets (seconds) before falling back to templates/clauses/<type>.html
+AI_LATENCY_BUDGET_DEFAULT = config('AI_LATENCY_BUDGET_DEFAULT', cast=float, default=8.0)
+AI_LATENCY_BUDGETS = {
+    'nda': config('AI_LATENCY_BUDGET_NDA', cast=float, default=AI_LATENCY_BUDGET_DEFAULT),
+    'invoice': config('AI_LATENCY_BUDGET_INVOICE', cast=float, default=4.0),
+    'offer': config('AI_LATENCY_BUDGET_OFFER', cast=float, default=6.0),
+}
+AI_CIRCUIT_FAILURE_THRESHOLD = config('AI_CIRCUIT_FAILURE_THRESHOLD', cast=int, default=5)
+AI_CIRCUIT_RESET_TIMEOUT = config('AI_CIRCUIT_RESET_TIMEOUT', cast=float, default=30.0)  # seconds
+
+# Document summaries: text beyond this many (estimated) input tokens per call is
+# summarised in chunks, up to SUMMARY_MAX_CONCURRENCY of them at a time.
+SUMMARY_MAX_INPUT_TOKENS = config('SUMMARY_MAX_INPUT_TOKENS', cast=int, default=3000)
+SUMMARY_MAX_CONCURRENCY = config('SUMMARY_MAX_CONCURRENCY', cast=int, default=4)
+# Summaries of new documents: 'thread' (in-process, after commit), 'worker'
+# (`manage.py run_summary_worker`) or 'off' (computed when first requested).
+SUMMARY_PRECOMPUTE = config('SUMMARY_PRECOMPUTE', default='thread')
+SUMMARY_JOB_TIMEOUT = config('SUMMARY_JOB_TIMEOUT', cast=int, default=300)  # seconds
+SUMMARY_JOB_MAX_ATTEMPTS = config('SUMMARY_JOB_MAX_ATTEMPTS', cast=int, default=3)
+
+FERNET_KEY = config('FERNET_KEY', default='')
+# Retired keys, still accepted for decryption until `manage.py rotate_keys` has run.
+FERNET_OLD_KEYS = config('FERNET_OLD_KEYS', cast=Csv(), default='')
+
+# Key for the HMAC blind indexes on encrypted user fields (derived from SECRET_KEY when empty).
+# Changing it requires `manage.py backfill_blind_index --all`.
+BLIND_INDEX_KEY = config('BLIND_INDEX_KEY', default='')
+# Master key wrapping the per-document metadata keys; derived from FERNET_KEY when empty.
+METADATA_MASTER_KEY = config('METADATA_MASTER_KEY', default='')
+METADATA_OLD_MASTER_KEYS = config('METADATA_OLD_MASTER_KEYS', cast=Csv(), default='')
+
+# Document generation queue
+DOCUMENT_JOBS_EAGER = config('DOCUMENT_JOBS_EAGER', cast=bool, default=False)
+GENERATION_JOB_MAX_ATTEMPTS = config('GENERATION_JOB_MAX_ATTEMPTS', cast=int, default=3)
+GENERATION_JOB_TIMEOUT = config('GENERATION_JOB_TIMEOUT', cast=int, default=300)  # seconds
+GENERATION_JOB_RETRY_BACKOFF = config('GENERATION_JOB_RETRY_BACKOFF', cast=int, default=30)  # seconds, doubled per attempt
+GENERATION_WORKER_POLL_INTERVAL = config('GENERATION_WORKER_POLL_INTERVAL', cast=float, default=1.0)
+
+# Bulk generation (documents/v1/generate/bulk/)
+BULK_GENERATION_MAX_ROWS = config('BULK_GENERATION_MAX_ROWS', cast=int, default=5000)
+BULK_GENERATION_CHUNK_SIZE = config('BULK_GENERATION_CHUNK_SIZE', cast=int, default=8)  # rows rendered per pool round trip
+BULK_SIGNER_BATCH_SIZE = config('BULK_SIGNER_BATCH_SIZE', cast=int, default=500)
+BULK_RENDER_BUSY_RETRIES = config('BULK_RENDER_BUSY_RETRIES', cast=int, default=4)  # while the renderer pool is full
+BULK_RENDER_BUSY_BACKOFF = config('BULK_RENDER_BUSY_BACKOFF', cast=float, default=0.5)  # seconds, doubled per retry
+
+# PDF engine: 'xhtml2pdf', 'reportlab' (native layouts for the bundled templates)
+# or a dotted path to a documents.utils.generate_pdf.PDFEngine subclass.
+PDF_ENGINE = config('PDF_ENGINE', default='xhtml2pdf')
+
+# PDF renderer pool. Leave PDF_RENDERER_ADDRESS empty to use a per-process pool,
+# or point it at `manage.py run_pdf_renderer` (unix socket path or host:port).
+PDF_RENDERER_ADDRESS = config('PDF_RENDERER_ADDRESS', default='')
+PDF_RENDERER_POOL_SIZE = config('PDF_RENDERER_POOL_SIZE', cast=int, default=2)  # 0 renders inline
+PDF_RENDERER_TIMEOUT = config('PDF_RENDERER_TIMEOUT', cast=int, default=60)  # seconds per job
+PDF_RENDERER_MAX_PENDING = config('PDF_RENDERER_MAX_PENDING', cast=int, default=32)
+
+# Encrypted HTML/PDF variants: 'lazy' renders them on first use, 'background'
+# right after the document is created. Either way they are cached in storage.
+ENCRYPTED_ARTEFACTS = config('ENCRYPTED_ARTEFACTS', default='lazy')
+
+# Signing: 'stamp' overlays the signature onto the stored PDFs as an incremental
+# update; 'render' re-renders the template with the signature text.
+SIGNATURE_MODE = config('SIGNATURE_MODE', default='stamp')
+
+# Bulk signing (signature/v1/sign/bulk/)
+BULK_SIGN_MAX_DOCUMENTS = config('BULK_SIGN_MAX_DOCUMENTS', cast=int, default=100)
+BULK_SIGN_WORKERS = config('BULK_SIGN_WORKERS', cast=int, default=4)
+
+
+# AI clause cache: 'locmem' (per-process LRU), 'django' (CACHES[AI_CLAUSE_CACHE_ALIAS]), 'db' or 'none'
+AI_CLAUSE_CACHE_BACKEND = config('AI_CLAUSE_CACHE_BACKEND', default='locmem')
+AI_CLAUSE_CACHE_ALIAS = config('AI_CLAUSE_CACHE_ALIAS', default='default')
+AI_CLAUSE_CACHE_TTL = config('AI_CLAUSE_CACHE_TTL', cast=int, default=7 * 24 * 3600)  # seconds, 0 = no expiry
+AI_CLAUSE_CACHE_MAX_ENTRIES = config('AI_CLAUSE_CACHE_MAX_ENTRIES', cast=int, default=1000)
+
+# Seconds a process trusts its cached list of active document templates before re-reading it
+TEMPLATE_REGISTRY_REFRESH = config('TEMPLATE_REGISTRY_REFRESH', cast=float, default=30.0)
+
+# How long a clause streamed from documents/v1/clause/stream/ can be reused by `clause_id` (seconds)
+CLAUSE_DRAFT_TTL = config('CLAUSE_DRAFT_TTL', cast=int, default=3600)
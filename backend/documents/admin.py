@@ -1,24 +1,99 @@
 from django.contrib import admin
-from documents.models import GeneratedDocument
+from users.admin import EncryptedUserSearchMixin
+from documents.utils import template_registry
+from documents.models import GeneratedDocument, DocumentTemplate, GenerationJob, ClauseDraft, AIClauseCacheEntry, OutboundEmail, KeyRotationCheckpoint, StoredBlob
 
 
 @admin.register(GeneratedDocument)
-class GeneratedDocumentAdmin(admin.ModelAdmin):
+class GeneratedDocumentAdmin(EncryptedUserSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'document_type', 'owner', 'signer', 'created_at')
     search_fields = ('name', 'owner__username', 'signer__username')
-    list_filter = ('document_type', 'created_at')
-    readonly_fields = ('plain_pdf', 'encrypted_pdf', 'encrypted_metadata', 'created_at', 'updated_at')
+    encrypted_search_lookups = ('owner', 'signer')
+    list_filter = ('document_type', 'clause_source', 'created_at')
+    readonly_fields = ('plain_pdf', 'encrypted_pdf', 'template', 'metadata', 'clause_source', 'created_at', 'updated_at')
     fieldsets = (
         (None, {
-            'fields': ('name', 'document_type', 'owner', 'signer') 
+            'fields': ('name', 'document_type', 'template', 'owner', 'signer')
         }),
         ('Files', {
             'fields': ('plain_pdf', 'encrypted_pdf')
         }),
         ('Metadata', {
-            'fields': ('encrypted_metadata',)
+            'fields': ('metadata', 'clause_source')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(DocumentTemplate)
+class DocumentTemplateAdmin(admin.ModelAdmin):
+    """Saved versions are read-only; adding a template publishes it as the next version of its type."""
+    list_display = ('document_type', 'version', 'name', 'is_active', 'created_at')
+    list_filter = ('document_type', 'is_active')
+    fields = ('document_type', 'name', 'version', 'is_active', 'required_fields', 'css', 'html', 'created_at')
+    readonly_fields = ('version', 'is_active', 'created_at')
+    actions = ['activate']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return self.fields
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            template_registry.publish(obj)
+
+    @admin.action(description="Make the selected version active")
+    def activate(self, request, queryset):
+        for row in queryset.order_by('document_type', 'version'):
+            template_registry.activate(row)
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'status', 'stage', 'attempts', 'next_attempt_at', 'document', 'created_at', 'finished_at')
+    search_fields = ('owner__username',)
+    list_filter = ('status', 'stage', 'created_at')
+    readonly_fields = ('stages', 'payload', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at')
+
+
+
+@admin.register(ClauseDraft)
+class ClauseDraftAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'template_type', 'source', 'created_at')
+    search_fields = ('owner__username',)
+    list_filter = ('template_type', 'source', 'created_at')
+    readonly_fields = ('owner', 'template_type', 'clause', 'source', 'created_at')
+
+
+@admin.register(AIClauseCacheEntry)
+class AIClauseCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'model', 'hits', 'created_at', 'last_used_at', 'expires_at')
+    search_fields = ('key',)
+    list_filter = ('model',)
+    readonly_fields = ('key', 'model', 'clause', 'hits', 'created_at', 'last_used_at', 'expires_at')
+
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    search_fields = ('subject',)
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('to', 'body', 'attachment', 'document', 'attempts', 'last_error', 'locked_at', 'created_at', 'sent_at')
+
+
+@admin.register(KeyRotationCheckpoint)
+class KeyRotationCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('target', 'key_id', 'start_pk', 'end_pk', 'last_pk', 'processed', 'rotated', 'finished', 'updated_at')
+    list_filter = ('target', 'finished')
+    readonly_fields = ('target', 'key_id', 'start_pk', 'end_pk', 'last_pk', 'processed', 'rotated', 'finished', 'updated_at')
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'stored_size', 'refcount', 'created_at', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'stored_size', 'refcount', 'created_at', 'updated_at')
@@ -0,0 +1,118 @@
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.encoding import force_bytes
+from django_cryptography.fields import EncryptedMixin
+
+from documents.utils import envelope
+
+
+class LazyDecryptedAttribute(DeferredAttribute):
+    """Decrypt the stored blob on first access and keep the result on the instance."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, bytes):
+            value = envelope.decrypt_json(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    # A data descriptor, so reads go through __get__ even once the raw blob is in the instance dict.
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class EnvelopeEncryptedJSONField(models.BinaryField):
+    """
+    JSON value stored as a single envelope-encrypted blob (see
+    `documents.utils.envelope`). Loading a row only fetches the ciphertext;
+    it is decrypted the first time the attribute is read, and saving a row
+    whose value was never read writes the blob back unchanged.
+    """
+    descriptor_class = LazyDecryptedAttribute
+
+    def from_db_value(self, value, expression, connection):
+        return bytes(value) if value is not None else None
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, bytes):
+            return value
+        return envelope.encrypt_json(value)
+
+    def to_python(self, value):
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class Ciphertext(bytes):
+    """The stored value of a `lazy_encrypt` field that hasn't been read yet."""
+
+
+class LazyFernetAttribute(DeferredAttribute):
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Ciphertext):
+            value = self.field.decrypt(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class LazyEncryptedMixin(EncryptedMixin):
+    """
+    `django_cryptography` encrypted field that keeps the ciphertext when a
+    row is loaded and decrypts it the first time the attribute is read.
+    Saving a row whose value was never read writes the ciphertext back as is.
+    `values()`/`values_list()` return the undecrypted `Ciphertext`; pass it
+    to `field.decrypt()` if needed.
+    """
+    descriptor_class = LazyFernetAttribute
+
+    def decrypt(self, value: bytes):
+        return self._load(bytes(value))
+
+    def from_db_value(self, value, *args, **kwargs):
+        return Ciphertext(force_bytes(value)) if value is not None else None
+
+    def pre_save(self, model_instance, add):
+        # Read the raw value so saving doesn't decrypt fields nobody looked at.
+        return model_instance.__dict__.get(self.attname)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, Ciphertext):
+            return connection.Database.Binary(bytes(value))
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def clone(self):
+        name, path, args, kwargs = super(EncryptedMixin, self).deconstruct()
+        return lazy_encrypt(self.base_class(*args, **kwargs), self.key, self.ttl)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(EncryptedMixin, self).deconstruct()
+        args = [self.base_class(*args, **kwargs)]
+        kwargs = {'ttl': self.ttl} if self.ttl is not None else {}
+        return name, f"{lazy_encrypt.__module__}.{lazy_encrypt.__name__}", args, kwargs
+
+
+_LAZY_FIELD_CLASSES = {}
+
+
+def lazy_encrypt(base_field, key=None, ttl=None):
+    """Like `django_cryptography.fields.encrypt`, for a field that decrypts on first access."""
+    base_class = type(base_field)
+    field_class = _LAZY_FIELD_CLASSES.setdefault(base_class, type(
+        f"LazyEncrypted{base_class.__name__}",
+        (LazyEncryptedMixin, base_class),
+        {'base_class': base_class, 'wasinstance': True},
+    ))
+    name, path, args, kwargs = base_field.deconstruct()
+    kwargs.update({'key': key, 'ttl': ttl})
+    return field_class(*args, **kwargs)
@@ -0,0 +1,80 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.utils import benchmarks, generate_pdf
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark template rendering, PDF generation, metadata encryption and the generate/sign/list "
+        "endpoints on a throwaway test database, offline. Save a baseline with --save and check "
+        "a later run against it with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', default=[], help="Run only cases whose name contains this (repeatable).")
+        parser.add_argument('--sizes', default='10,10000,100000', help="Comma-separated document counts for the list endpoints.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed iterations per case.")
+        parser.add_argument('--warmup', type=int, default=1, help="Untimed iterations per case.")
+        parser.add_argument('--pdf-engine', action='append', dest='engines', choices=list(generate_pdf.PDF_ENGINES),
+                            help="PDF engine to benchmark (repeatable; default: all).")
+        parser.add_argument('--save', metavar='PATH', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', metavar='PATH', help="Compare against a baseline saved with --save.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Allowed slowdown / memory growth before a case counts as a regression (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        baseline = benchmarks.load(options['compare']) if options['compare'] else None
+
+        self.stdout.write(f"{'case':<40} {'median ms':>10} {'p95 ms':>10} {'queries':>8} {'peak MB':>8}")
+
+        def report(name, result):
+            self.stdout.write(
+                f"{name:<40} {result['wall_ms']['median']:>10.3f} {result['wall_ms']['p95']:>10.3f} "
+                f"{result['queries']:>8g} {result['peak_rss_mb']:>8.1f}"
+            )
+
+        if options['verbosity'] < 2:
+            logging.disable(logging.INFO)  # keep the table readable
+        try:
+            results = benchmarks.run(
+                only=options['only'],
+                sizes=sizes,
+                repeat=options['repeat'],
+                warmup=options['warmup'],
+                engines=options['engines'],
+                report=report,
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+
+        if options['save']:
+            benchmarks.save(results, options['save'])
+            self.stdout.write(self.style.SUCCESS(f"Saved {len(results['results'])} result(s) to {options['save']}"))
+
+        if baseline is None:
+            return
+
+        rows = benchmarks.compare(results, baseline, options['threshold'], only=options['only'])
+        self.stdout.write('')
+        self.stdout.write(f"{'case':<40} {'min ms':>21} {'queries':>11} {'peak MB':>15}  status")
+        for name, state, details in rows:
+            if details:
+                wall, queries, rss = details['wall_ms'], details['queries'], details['peak_rss_mb']
+                columns = f"{wall[0]:>9.3f} -> {wall[1]:>8.3f} {queries[0]:>4g} -> {queries[1]:>4g} {rss[0]:>6.1f} -> {rss[1]:>6.1f}"
+            else:
+                columns = f"{'':>21} {'':>11} {'':>15}"
+            line = f"{name:<40} {columns}  {state}"
+            self.stdout.write(self.style.ERROR(line) if state == 'regression' else line)
+
+        regressions = [name for name, state, _ in rows if state == 'regression']
+        if regressions:
+            raise CommandError(f"{len(regressions)} case(s) regressed beyond {options['threshold']:.0%}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,143 @@
+from collections import Counter
+import os
+import uuid
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+
+from documents import storage
+from documents.models import OutboundEmail, StoredBlob
+
+
+def _file_fields():
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.storage, storage.ContentAddressedStorage):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files saved before content-addressed storage was enabled into it, recount "
+        "blob references and delete blobs nothing references any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600,
+                            help="Seconds an unreferenced blob is kept before it is deleted.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without changing it.")
+
+    def handle(self, *args, **options):
+        if not isinstance(storages['default'], storage.ContentAddressedStorage):
+            raise CommandError("MEDIA_STORAGE_BACKEND is not documents.storage.ContentAddressedStorage.")
+
+        dry_run = options['dry_run']
+        started = timezone.now()
+        adopted = self.adopt(dry_run)
+        recounted = self.recount(started, dry_run)
+        removed, freed = self.sweep(started - timedelta(seconds=options['grace']), dry_run)
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{adopted} file(s) adopted, {recounted} reference count(s) corrected, "
+            f"{removed} blob(s) removed ({freed} bytes freed)."
+        ))
+
+    def adopt(self, dry_run) -> int:
+        """Re-save files stored under their original names and point their rows at the blob."""
+        adopted = 0
+        for model, field in _file_fields():
+            rows = model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__startswith': storage.PREFIX})
+            for pk, name in rows.filter(**{f'{field.name}__isnull': False}).values_list('pk', field.name).iterator():
+                if not field.storage.exists(name):
+                    self.stderr.write(f"{model.__name__} {pk}: {field.name} file {name} is missing.")
+                    continue
+                adopted += 1
+                if dry_run:
+                    continue
+                with field.storage.open(name, 'rb') as f:
+                    blob = field.storage.save(name, f)
+                if model.objects.filter(pk=pk, **{field.name: name}).update(**{field.name: blob}):
+                    OutboundEmail.objects.filter(attachment=name).update(attachment=blob)
+                    if not any(m.objects.filter(**{f.name: name}).exists() for m, f in _file_fields()):
+                        field.storage.delete(name)
+                else:
+                    field.storage.delete(blob)
+        return adopted
+
+    def recount(self, started, dry_run) -> int:
+        """Set every blob's count to the number of rows referencing it."""
+        references = Counter()
+        for model, field in _file_fields():
+            references.update(
+                model.objects.filter(**{f'{field.name}__startswith': storage.PREFIX})
+                .values_list(field.name, flat=True).iterator()
+            )
+        # Attachments of emails still waiting to go out keep their blob alive.
+        references.update(
+            OutboundEmail.objects.filter(status__in=['pending', 'sending'], attachment__startswith=storage.PREFIX)
+            .values_list('attachment', flat=True).iterator()
+        )
+
+        corrected = 0
+        blobs = StoredBlob.objects.filter(updated_at__lt=started).values_list('pk', 'name', 'refcount', 'updated_at')
+        for pk, name, refcount, updated_at in blobs.iterator():
+            if references[name] == refcount:
+                continue
+            corrected += 1
+            if not dry_run:
+                # Skip blobs referenced again since the scan started; the next run settles them.
+                StoredBlob.objects.filter(pk=pk, updated_at=updated_at).update(refcount=references[name])
+        return corrected
+
+    def sweep(self, cutoff, dry_run) -> tuple:
+        removed = freed = 0
+        for pk, name, stored_size in (
+            StoredBlob.objects.filter(refcount=0, updated_at__lt=cutoff).values_list('pk', 'name', 'stored_size').iterator()
+        ):
+            if dry_run:
+                removed += 1
+                freed += stored_size
+                continue
+            if self.remove_blob(pk, name, cutoff):
+                removed += 1
+                freed += stored_size
+
+        # Leftovers of saves interrupted before their file was moved into place,
+        # and of removals interrupted before their tombstone was unlinked.
+        temp_dir = storages['default'].path(storage.PREFIX + 'tmp')
+        if not dry_run and os.path.isdir(temp_dir):
+            for entry in os.scandir(temp_dir):
+                if entry.stat().st_mtime < cutoff.timestamp():
+                    os.remove(entry.path)
+        return removed, freed
+
+    def remove_blob(self, pk, name, cutoff) -> bool:
+        """
+        Delete an unreferenced blob's row and file. The file is first renamed
+        to a tombstone in the same transaction as the row delete and only
+        unlinked after commit: a save of the same content blocks on the row
+        until then and writes a fresh file, which the unlink never touches.
+        """
+        path = storages['default'].path(name)
+        tombstone = None
+        try:
+            with transaction.atomic():
+                deleted, _ = StoredBlob.objects.filter(pk=pk, refcount=0, updated_at__lt=cutoff).delete()
+                if not deleted:
+                    return False
+                if os.path.exists(path):
+                    temp_dir = storages['default'].path(storage.PREFIX + 'tmp')
+                    os.makedirs(temp_dir, exist_ok=True)
+                    tombstone = os.path.join(temp_dir, f"{os.path.basename(path)}.{uuid.uuid4().hex}.swept")
+                    os.replace(path, tombstone)
+                    transaction.on_commit(lambda: os.remove(tombstone), robust=True)
+        except BaseException:
+            if tombstone and os.path.exists(tombstone):
+                os.replace(tombstone, path)
+            raise
+        return True
@@ -0,0 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from documents.utils import key_rotation
+
+
+def _init_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt document metadata, encrypted HTML files and summaries under the current "
+        "FERNET_KEY / metadata master key. Safe to run while the app is serving; resumes from "
+        "its checkpoints when interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', choices=list(key_rotation.TARGETS),
+                            help="What to rotate (repeatable). Defaults to everything.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes per target.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows fetched and checkpointed at a time.")
+        parser.add_argument('--rate', type=float, default=0,
+                            help="Max rows per second across all workers (0 = unthrottled).")
+        parser.add_argument('--restart', action='store_true', help="Discard checkpoints and start over.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        rate = options['rate'] / workers if options['rate'] else 0
+
+        failed = 0
+        for target in options['target'] or list(key_rotation.TARGETS):
+            checkpoints = key_rotation.plan(target, workers, restart=options['restart'])
+            if not checkpoints:
+                self.stdout.write(f"{target}: nothing to rotate.")
+                continue
+
+            self.stdout.write(f"{target}: rotating {len(checkpoints)} range(s) with {workers} worker(s).")
+            results = []
+            if workers == 1:
+                for checkpoint in checkpoints:
+                    try:
+                        results.append(key_rotation.run_shard(checkpoint.pk, options['batch_size'], rate))
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"{target}: range starting at {checkpoint.start_pk} stopped: {e}")
+            else:
+                # Child processes must open their own database connections.
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                    futures = {
+                        executor.submit(key_rotation.run_shard, c.pk, options['batch_size'], rate): c
+                        for c in checkpoints
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            failed += 1
+                            self.stderr.write(f"{target}: range starting at {futures[future].start_pk} stopped: {e}")
+
+            processed = sum(result[0] for result in results)
+            rotated = sum(result[1] for result in results)
+            self.stdout.write(self.style.SUCCESS(f"{target}: {rotated} of {processed} row(s) re-encrypted."))
+
+        if failed:
+            raise CommandError(f"{failed} range(s) stopped early; run the command again to resume them.")
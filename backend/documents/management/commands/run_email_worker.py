@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from documents.utils import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Deliver what is due and exit instead of polling.")
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+                            help="Seconds to sleep when nothing is due.")
+
+    def handle(self, *args, **options):
+        total = 0
+        self.stdout.write("Email worker started.")
+
+        while True:
+            outbox.requeue_stuck()
+            sent = outbox.deliver_pending(options['batch_size'])
+            total += sent
+
+            if sent == 0:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Delivered {total} email(s)."))
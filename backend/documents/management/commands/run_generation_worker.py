@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from documents.utils import ai_cache, jobs, template_registry
+
+
+class Command(BaseCommand):
+    help = "Process queued document generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling.")
+        parser.add_argument('--max-jobs', type=int, default=0, help="Exit after processing this many jobs (0 = no limit).")
+        parser.add_argument('--poll-interval', type=float, default=settings.GENERATION_WORKER_POLL_INTERVAL,
+                            help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        template_registry.preload()
+        self.stdout.write("Generation worker started.")
+
+        while True:
+            jobs.requeue_stale_jobs()
+            job = jobs.claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = jobs.run_job(job)
+            processed += 1
+            self.stdout.write(f"Job {job.id}: {job.status}")
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
+        self.stdout.write(f"AI clause cache: {ai_cache.get_cache().stats()}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from documents.utils import openai_stub
+
+
+class Command(BaseCommand):
+    help = "Run a local OpenAI-compatible stub server (set OPENAI_BASE_URL=http://<host>:<port>/v1)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8787)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds to wait before answering.")
+        parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- seconds added to the latency.")
+        parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed tokens.")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429/5xx.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"OpenAI stub listening on http://{options['host']}:{options['port']}/v1")
+        try:
+            openai_stub.serve(
+                host=options['host'],
+                port=options['port'],
+                latency=options['latency'],
+                jitter=options['jitter'],
+                error_rate=options['error_rate'],
+                token_delay=options['token_delay'],
+            )
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.utils import pdf_pool
+
+
+class Command(BaseCommand):
+    help = "Run the shared, pre-warmed PDF renderer pool on PDF_RENDERER_ADDRESS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=settings.PDF_RENDERER_POOL_SIZE, help="Number of renderer processes.")
+        parser.add_argument('--timeout', type=int, default=settings.PDF_RENDERER_TIMEOUT, help="Per-job timeout in seconds.")
+        parser.add_argument('--max-pending', type=int, default=settings.PDF_RENDERER_MAX_PENDING,
+                            help="Jobs accepted before new requests are rejected as busy.")
+
+    def handle(self, *args, **options):
+        if not settings.PDF_RENDERER_ADDRESS:
+            raise CommandError("PDF_RENDERER_ADDRESS is not configured.")
+
+        pool = pdf_pool.RendererPool(size=options['size'], timeout=options['timeout'], max_pending=options['max_pending'])
+        self.stdout.write(f"Starting {pool.size} PDF renderer(s) on {settings.PDF_RENDERER_ADDRESS}")
+        try:
+            pdf_pool.serve(pool)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.shutdown()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from documents.utils import smtp_stub
+
+
+class Command(BaseCommand):
+    help = "Run a local SMTP stand-in (set EMAIL_HOST/EMAIL_PORT to it and EMAIL_USE_TLS=False)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--output-dir', default=None, help="Directory to write received messages to as .eml files.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"SMTP stub listening on {options['host']}:{options['port']}")
+        try:
+            smtp_stub.serve(host=options['host'], port=options['port'], output_dir=options['output_dir'])
+        except KeyboardInterrupt:
+            pass
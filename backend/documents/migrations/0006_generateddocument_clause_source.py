@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_aiclausecacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generateddocument',
+            name='clause_source',
+            field=models.CharField(blank=True, choices=[('ai', 'AI'), ('cache', 'AI (cached)'), ('fallback', 'Clause library')], max_length=20, null=True),
+        ),
+    ]
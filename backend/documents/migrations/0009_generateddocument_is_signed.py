@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_is_signed(apps, schema_editor):
+    GeneratedDocument = apps.get_model('documents', 'GeneratedDocument')
+    GeneratedDocument.objects.filter(signed_version__isnull=False).update(is_signed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_generateddocument_owner_created_index'),
+        ('signature', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generateddocument',
+            name='is_signed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='generateddocument',
+            index=models.Index(fields=['signer', 'created_at'], name='doc_signer_created_idx'),
+        ),
+        migrations.RunPython(backfill_is_signed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.db import migrations
+
+import documents.fields
+
+
+def _fernet():
+    return Fernet(settings.FERNET_KEY.encode())
+
+
+def to_envelope(apps, schema_editor):
+    """Unwrap the per-value Fernet tokens and store the metadata as one envelope blob."""
+    GeneratedDocument = apps.get_model('documents', 'GeneratedDocument')
+    fernet = _fernet()
+    documents = GeneratedDocument.objects.only('id', 'encrypted_metadata')
+    for doc in documents.iterator(chunk_size=500):
+        if doc.encrypted_metadata is None:
+            continue
+        metadata = {}
+        for key, value in doc.encrypted_metadata.items():
+            try:
+                metadata[key] = fernet.decrypt(str(value).encode()).decode()
+            except InvalidToken:
+                metadata[key] = value
+        doc.metadata = metadata
+        doc.save(update_fields=['metadata'])
+
+
+def from_envelope(apps, schema_editor):
+    GeneratedDocument = apps.get_model('documents', 'GeneratedDocument')
+    fernet = _fernet()
+    documents = GeneratedDocument.objects.only('id', 'metadata')
+    for doc in documents.iterator(chunk_size=500):
+        if doc.metadata is None:
+            continue
+        doc.encrypted_metadata = {
+            key: fernet.encrypt(str(value).encode()).decode() for key, value in doc.metadata.items()
+        }
+        doc.save(update_fields=['encrypted_metadata'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_generateddocument_is_signed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generateddocument',
+            name='metadata',
+            field=documents.fields.EnvelopeEncryptedJSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(to_envelope, from_envelope),
+        migrations.RemoveField(
+            model_name='generateddocument',
+            name='encrypted_metadata',
+        ),
+    ]
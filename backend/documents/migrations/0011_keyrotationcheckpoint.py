@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_generateddocument_metadata_envelope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyRotationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=32)),
+                ('key_id', models.CharField(max_length=16)),
+                ('start_pk', models.BigIntegerField()),
+                ('end_pk', models.BigIntegerField()),
+                ('last_pk', models.BigIntegerField()),
+                ('processed', models.PositiveBigIntegerField(default=0)),
+                ('rotated', models.PositiveBigIntegerField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('target', 'key_id', 'start_pk')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:36
+
+import django.db.models.deletion
+import django_cryptography.fields
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0013_storedblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClauseDraft',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('template_type', models.CharField(choices=[('nda', 'NDA'), ('invoice', 'Invoice'), ('offer', 'Offer Letter')], max_length=20)),
+                ('clause', django_cryptography.fields.encrypt(models.TextField())),
+                ('source', models.CharField(choices=[('ai', 'AI'), ('cache', 'AI (cached)'), ('fallback', 'Clause library')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clause_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
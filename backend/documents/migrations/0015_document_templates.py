@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:38
+
+from pathlib import Path
+import re
+import textwrap
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / 'templates'
+
+# The templates that used to be picked by name in code, with the metadata they use.
+BUNDLED = {
+    'nda': ('nda.html', ['start_date', 'end_date', 'recipient_name']),
+    'offer': ('offer_letter.html', ['start_date', 'recipient_name', 'role', 'salary']),
+    'invoice': ('invoice.html', ['recipient_name', 'due_date', 'item', 'description', 'amount']),
+}
+STYLE_RE = re.compile(r'\s*<style[^>]*>(.*?)</style>', re.S)
+
+
+def seed_templates(apps, schema_editor):
+    DocumentTemplate = apps.get_model('documents', 'DocumentTemplate')
+    GeneratedDocument = apps.get_model('documents', 'GeneratedDocument')
+    for document_type, (name, required_fields) in BUNDLED.items():
+        source = (TEMPLATE_DIR / name).read_text(encoding='utf-8')
+        css = '\n'.join(textwrap.dedent(block).strip() for block in STYLE_RE.findall(source))
+        template = DocumentTemplate.objects.create(
+            document_type=document_type,
+            name=name,
+            version=1,
+            html=STYLE_RE.sub('', source),
+            css=css,
+            required_fields=required_fields,
+            is_active=True,
+        )
+        # Existing documents were rendered from these files.
+        GeneratedDocument.objects.filter(document_type=document_type, template__isnull=True).update(template=template)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0014_clausedraft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('nda', 'NDA'), ('invoice', 'Invoice'), ('offer', 'Offer Letter')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('version', models.PositiveIntegerField()),
+                ('html', models.TextField()),
+                ('css', models.TextField(blank=True, default='')),
+                ('required_fields', models.JSONField(blank=True, default=list)),
+                ('is_active', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('document_type', 'version'), name='doc_template_version_unique'), models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('document_type',), name='doc_template_one_active')],
+            },
+        ),
+        migrations.AddField(
+            model_name='generateddocument',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='documents.documenttemplate'),
+        ),
+        migrations.RunPython(seed_templates, migrations.RunPython.noop),
+    ]
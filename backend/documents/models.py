@@ -1,29 +1,212 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django_cryptography.fields import encrypt
 
+from documents.fields import EnvelopeEncryptedJSONField
+
 class GeneratedDocument(models.Model):
     DOCUMENT_TYPES = [
         ('nda', 'NDA'),
         ('invoice', 'Invoice'),
         ('offer', 'Offer Letter'),
     ]
-    
+    CLAUSE_SOURCES = [
+        ('ai', 'AI'),
+        ('cache', 'AI (cached)'),
+        ('fallback', 'Clause library'),
+    ]
+
     name = models.CharField(max_length=255, blank=True, null=True)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
     signer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents_to_sign')
 
     plain_pdf = models.FileField(upload_to='documents/plain/')
-    encrypted_pdf = models.FileField(upload_to='documents/encrypted/')
+    encrypted_pdf = models.FileField(upload_to='documents/encrypted/', null=True, blank=True)  # rendered on demand, see utils.artefacts
     
     plain_html = models.FileField(upload_to='documents/plain_html/', null=True, blank=True)
     encrypted_html = models.FileField(upload_to='documents/encrypted_html/', null=True, blank=True)
 
-    encrypted_metadata = encrypt(models.JSONField(null=True, blank=True))
+    metadata = EnvelopeEncryptedJSONField(null=True, blank=True)
+    template = models.ForeignKey('DocumentTemplate', on_delete=models.PROTECT, null=True, blank=True, related_name='documents')  # version rendered with
+    clause_source = models.CharField(max_length=20, choices=CLAUSE_SOURCES, blank=True, null=True)
+    is_signed = models.BooleanField(default=False)  # mirrors signed_version, kept in sync by SignedDocument
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='doc_owner_created_idx'),
+            models.Index(fields=['signer', 'created_at'], name='doc_signer_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_type} by {self.owner.username} for {self.signer.username if self.signer else 'N/A'}"
+
+class DocumentTemplate(models.Model):
+    """One version of a document type's template, see `documents.utils.template_registry`."""
+    document_type = models.CharField(max_length=20, choices=GeneratedDocument.DOCUMENT_TYPES)
+    name = models.CharField(max_length=100)  # also the hint PDF engines pick a layout by, e.g. 'nda.html'
+    version = models.PositiveIntegerField()
+    html = models.TextField()
+    css = models.TextField(blank=True, default='')
+    required_fields = models.JSONField(default=list, blank=True)  # metadata keys a document of this type must have
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document_type', 'version'], name='doc_template_version_unique'),
+            models.UniqueConstraint(fields=['document_type'], condition=models.Q(is_active=True), name='doc_template_one_active'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_type} v{self.version}{' (active)' if self.is_active else ''}"
+
+
+class GenerationJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    STAGE_CHOICES = [
+        ('ai', 'AI'),
+        ('render', 'Render'),
+        ('pdf', 'PDF'),
+        ('store', 'Store'),
+    ]
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='generation_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, blank=True, null=True)
+    stages = models.JSONField(default=dict, blank=True)  # e.g. { "ai": { "status": "done", "started_at": "...", "finished_at": "..." } }
+
+    payload = encrypt(models.JSONField(null=True, blank=True))
+    document = models.ForeignKey(GeneratedDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name='generation_jobs')
+    error = models.TextField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # failed attempts are retried with backoff
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Generation job {self.id} ({self.status})"
+
+    def mark_stage(self, stage):
+        now = timezone.now().isoformat()
+        if self.stage in self.stages:
+            self.stages[self.stage].update(status='done', finished_at=now)
+        self.stages[stage] = {'status': 'running', 'started_at': now}
+        self.stage = stage
+        self.save(update_fields=['stage', 'stages', 'updated_at'])
+
+
+class ClauseDraft(models.Model):
+    """A clause streamed from `documents/v1/clause/stream/`, reusable by a generate call via its id."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='clause_drafts')
+    template_type = models.CharField(max_length=20, choices=GeneratedDocument.DOCUMENT_TYPES)
+    clause = encrypt(models.TextField())
+    source = models.CharField(max_length=20, choices=GeneratedDocument.CLAUSE_SOURCES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Clause draft {self.id} ({self.template_type}, {self.source})"
+
+
+class AIClauseCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of (model, system prompt, prompt, context)
+    model = models.CharField(max_length=100)
+    clause = encrypt(models.TextField())
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    def __str__(self):
+        return f"AI clause cache {self.key[:12]} ({self.model})"
+
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to = encrypt(models.JSONField(default=list))
+    subject = models.CharField(max_length=255)
+    body = encrypt(models.TextField())
+    attachment = models.CharField(max_length=255, blank=True, null=True)  # storage name of a file to attach
+    document = models.ForeignKey(GeneratedDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)  # when a worker claimed it
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Email {self.id}: {self.subject} ({self.status})"
+
+
+class KeyRotationCheckpoint(models.Model):
+    """Progress of `manage.py rotate_keys` over one pk range of one target."""
+    target = models.CharField(max_length=32)
+    key_id = models.CharField(max_length=16)  # fingerprint of the keys being rotated to
+    start_pk = models.BigIntegerField()
+    end_pk = models.BigIntegerField()
+    last_pk = models.BigIntegerField()
+    processed = models.PositiveBigIntegerField(default=0)
+    rotated = models.PositiveBigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('target', 'key_id', 'start_pk')]
+
+    def __str__(self):
+        return f"Key rotation {self.target} [{self.start_pk}, {self.end_pk}] at {self.last_pk}"
+
+
+class StoredBlob(models.Model):
+    """One file in `documents.storage.ContentAddressedStorage` and how many rows reference it."""
+    name = models.CharField(max_length=128, unique=True)  # cas/<2 hex>/<sha256><ext>
+    size = models.PositiveBigIntegerField()  # uncompressed
+    stored_size = models.PositiveBigIntegerField(default=0)  # on disk
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at']),
+        ]
+
     def __str__(self):
-        return f"{self.document_type} by {self.owner.username} for {self.signer.username if self.signer else 'N/A'}"
\ No newline at end of file
+        return f"{self.name} ({self.refcount} reference(s))"
@@ -1,6 +1,9 @@
+import uuid
+
 from rest_framework import serializers
 from users.models import User
-from documents.models import GeneratedDocument
+from documents.models import GeneratedDocument, GenerationJob
+from documents.utils import template_registry
 from signature.models import SignedDocument
 
 
@@ -14,6 +17,28 @@ class DocumentCreateSerializer(serializers.Serializer):
     signer_first_name = serializers.CharField()
     signer_last_name = serializers.CharField()
     name = serializers.CharField(required=False)
+    fresh_clause = serializers.BooleanField(required=False, default=False)  # bypass the AI clause cache
+    clause_id = serializers.CharField(required=False)  # a ClauseDraft from documents/v1/clause/stream/
+
+    def validate_clause_id(self, value):
+        try:
+            return str(uuid.UUID(value))
+        except ValueError:
+            raise serializers.ValidationError("Not a valid clause id.")
+
+    def validate(self, attrs):
+        template = template_registry.active(attrs['template_type'])
+        missing = [field for field in template.required_fields if attrs['metadata'].get(field) in (None, '')]
+        if missing:
+            raise serializers.ValidationError({'metadata': [f"Missing required field(s): {', '.join(missing)}."]})
+        return attrs
+
+
+class ClauseStreamSerializer(serializers.Serializer):
+    template_type = serializers.ChoiceField(choices=['nda', 'offer', 'invoice'])
+    prompt = serializers.CharField()
+    metadata = serializers.DictField()
+    fresh_clause = serializers.BooleanField(required=False, default=False)
 
 
 class GeneratedDocumentSerializer(serializers.ModelSerializer):
@@ -23,10 +48,9 @@ class GeneratedDocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = GeneratedDocument
         fields = [
-            'id', 'name', 'document_type', 'plain_pdf', 'encrypted_pdf',
-            'encrypted_metadata', 'signer', 'owner', 'created_at', 'signed', 'signed_at'
+            'id', 'name', 'document_type', 'plain_pdf', 'encrypted_pdf', 'clause_source', 'signer', 'owner', 'created_at', 'signed', 'signed_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'plain_pdf', 'encrypted_pdf']
+        read_only_fields = ['id', 'owner', 'created_at', 'plain_pdf', 'encrypted_pdf', 'clause_source']
 
     def get_signed(self, obj):
         return hasattr(obj, 'signed_version')
@@ -37,7 +61,23 @@ class GeneratedDocumentSerializer(serializers.ModelSerializer):
         return None
 
 
-class GeneratedDocumentListSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Limit output to the comma-separated `fields` query parameter of the
+    request in the serializer context, e.g. `?fields=id,name,signed`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            allowed = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class GeneratedDocumentListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     signer_username = serializers.CharField(source='signer.username', read_only=True)
     signed = serializers.SerializerMethodField()
     signed_at = serializers.SerializerMethodField()
@@ -52,4 +92,35 @@ class GeneratedDocumentListSerializer(serializers.ModelSerializer):
     def get_signed_at(self, obj):
         if hasattr(obj, 'signed_version'):
             return obj.signed_version.signed_at
-        return None
\ No newline at end of file
+        return None
+
+
+class SignerInboxSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    owner_username = serializers.CharField(source='owner.username', read_only=True)
+    signed = serializers.BooleanField(source='is_signed', read_only=True)
+    signed_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GeneratedDocument
+        fields = ['id', 'name', 'document_type', 'owner_username', 'created_at', 'signed', 'signed_at']
+
+    def get_signed_at(self, obj):
+        if hasattr(obj, 'signed_version'):
+            return obj.signed_version.signed_at
+        return None
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    document = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'status', 'stage', 'stages', 'error', 'attempts', 'next_attempt_at',
+            'document', 'created_at', 'started_at', 'finished_at'
+        ]
+
+    def get_document(self, obj):
+        if obj.document_id is None:
+            return None
+        return GeneratedDocumentSerializer(obj.document).data
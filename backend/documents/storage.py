@@ -0,0 +1,186 @@
+"""
+Content-addressed media storage.
+
+Every file is stored once, under the SHA-256 of its bytes
+(`cas/<2 hex>/<sha256><ext>`), so byte-identical PDFs and HTML across
+documents share one copy. `StoredBlob` counts the references: saving bumps
+the count once the file is in place, deleting drops it, and `manage.py compact_media` removes blobs
+nobody references any more. HTML is Brotli-compressed on disk and
+decompressed as it is read; PDFs are stored as-is so they can still be
+served straight from disk.
+
+Names written before this storage was enabled (`documents/plain/...`) keep
+working as ordinary files until `compact_media` adopts them.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+import brotli
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+PREFIX = 'cas/'
+COMPRESSED_EXTENSIONS = ('.html', '.htm')
+COMPRESSED_SUFFIX = '.br'
+CHUNK_SIZE = 64 * 1024
+
+
+def is_blob(name: str) -> bool:
+    return bool(name) and name.startswith(PREFIX)
+
+
+def is_compressed(name: str) -> bool:
+    return is_blob(name) and os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS
+
+
+class BrotliReader(io.RawIOBase):
+    """Read-only stream that decompresses a Brotli file a chunk at a time."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._decompressor = brotli.Decompressor()
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = self._raw.read(CHUNK_SIZE)
+            if not chunk:
+                if not self._decompressor.is_finished():
+                    raise OSError("Truncated Brotli stream.")
+                return 0
+            self._pending = memoryview(self._decompressor.process(chunk))
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+class CompressedFile(File):
+    """A compressed blob opened for reading; reopening starts a new decompression stream."""
+
+    def __init__(self, path, name, mode='rb'):
+        self._path = path
+        super().__init__(self._stream(mode), name)
+        self.mode = mode
+
+    def _stream(self, mode):
+        reader = io.BufferedReader(BrotliReader(open(self._path, 'rb')), CHUNK_SIZE)
+        return reader if 'b' in mode else io.TextIOWrapper(reader, encoding='utf-8')
+
+    def open(self, mode=None):
+        mode = mode or self.mode
+        if not self.closed:
+            self.file.close()
+        self.file = self._stream(mode)
+        self.mode = mode
+        return self
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name is derived from the content in _save(); identical
+        # content is meant to end up under the same name.
+        return name
+
+    def path(self, name):
+        """Location on disk; for compressed blobs this is the `.br` file."""
+        if is_compressed(name):
+            name += COMPRESSED_SUFFIX
+        return super().path(name)
+
+    def _write_temp(self, name, content):
+        """Stream `content` into a temporary file under MEDIA_ROOT; returns (temp path, sha256, size)."""
+        directory = super().path(PREFIX + 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        compressor = None
+        if os.path.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS:
+            compressor = brotli.Compressor(quality=settings.MEDIA_BROTLI_QUALITY)
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temp:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                digest.update(chunk)
+                size += len(chunk)
+                temp.write(compressor.process(chunk) if compressor else chunk)
+            if compressor:
+                temp.write(compressor.finish())
+        return temp.name, digest.hexdigest(), size
+
+    def _save(self, name, content):
+        from documents.models import StoredBlob
+
+        temp_path, digest, size = self._write_temp(name, content)
+        blob = f"{PREFIX}{digest[:2]}/{digest}{os.path.splitext(name)[1].lower()}"
+
+        full_path = self.path(blob)
+        try:
+            with transaction.atomic():
+                # Touch the row first. That locks it until this save commits,
+                # so `compact_media` can't delete the row and its file
+                # underneath it, and afterwards the blob is inside the sweep's
+                # grace period. The reference itself is only taken once the
+                # file is in place, so a failed save can't leave a count behind.
+                created = not StoredBlob.objects.filter(name=blob).update(updated_at=timezone.now())
+                if created:
+                    _, created = StoredBlob.objects.get_or_create(name=blob, defaults={'size': size})
+
+                if os.path.exists(full_path) and not created:
+                    os.remove(temp_path)
+                    stored_size = None
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(temp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+                    stored_size = os.path.getsize(full_path)
+
+                updates = {'refcount': F('refcount') + 1, 'updated_at': timezone.now()}
+                if stored_size is not None:
+                    updates['stored_size'] = stored_size
+                StoredBlob.objects.filter(name=blob).update(**updates)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return blob
+
+    def _open(self, name, mode='rb'):
+        if is_compressed(name):
+            if 'r' not in mode or '+' in mode:
+                raise ValueError("Compressed blobs can only be opened for reading.")
+            return CompressedFile(self.path(name), name, mode)
+        return super()._open(name, mode)
+
+    def size(self, name):
+        if is_compressed(name):
+            from documents.models import StoredBlob
+            blob = StoredBlob.objects.filter(name=name).values_list('size', flat=True).first()
+            if blob is not None:
+                return blob
+        return super().size(name)
+
+    def delete(self, name):
+        """Drop one reference to a blob; the file itself is removed by `compact_media`."""
+        if not is_blob(name):
+            return super().delete(name)
+        from documents.models import StoredBlob
+        StoredBlob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated_at=timezone.now()
+        )
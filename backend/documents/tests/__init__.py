@@ -0,0 +1,8 @@
+from users.models import User
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password='pw12345678',
+        first_name=username.title(), last_name='Doe', **extra,
+    )
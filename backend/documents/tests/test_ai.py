@@ -0,0 +1,132 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from documents.utils import ai
+from documents.utils.circuit_breaker import CircuitBreaker
+
+METADATA = {'recipient_name': 'Bob', 'start_date': '2025-01-01', 'end_date': '2026-01-01', 'issuer': 'Alice Doe'}
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('documents.utils.circuit_breaker.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def open_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_frees_the_trial(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+
+@override_settings(AI_LATENCY_BUDGETS={'nda': 0.3})
+class ClauseFallbackTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ai, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate(self):
+        return ai.generate_clause('nda', 'confidentiality', 'context', METADATA, use_cache=False)
+
+    def test_model_answer(self):
+        with mock.patch.object(ai, 'generate_ai_clause', return_value='<p>AI clause</p>'):
+            self.assertEqual(self.generate(), ('<p>AI clause</p>', 'ai'))
+
+    def test_failure_falls_back_and_opens_the_circuit(self):
+        with mock.patch.object(ai, 'generate_ai_clause', side_effect=RuntimeError('model down')) as model:
+            with self.assertLogs(ai.logger, 'WARNING'):
+                for _ in range(3):
+                    clause, source = self.generate()
+                    self.assertEqual(source, 'fallback')
+                    self.assertIn('Bob', clause)
+        # The third call found the circuit open and never reached the model.
+        self.assertEqual(model.call_count, 2)
+
+    def test_over_budget_falls_back(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow(*args, **kwargs):
+            release.wait(5)
+            return '<p>late</p>'
+
+        with mock.patch.object(ai, 'generate_ai_clause', side_effect=slow), self.assertLogs(ai.logger, 'WARNING'):
+            started = time.monotonic()
+            clause, source = self.generate()
+        self.assertEqual(source, 'fallback')
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(ai.breaker.failures, 1)
+
+    def stream(self, deltas):
+        def chunks():
+            for delta in deltas:
+                if isinstance(delta, Exception):
+                    raise delta
+                yield delta
+        return mock.patch.object(ai.ai_client, 'stream_chat_completion', side_effect=lambda **kwargs: chunks())
+
+    def test_stream(self):
+        with self.stream(['Both ', 'parties']):
+            events = list(ai.stream_clause('nda', 'p', 'context', METADATA, use_cache=False))
+        self.assertEqual(events[:2], [('delta', 'Both '), ('delta', 'parties')])
+        self.assertEqual(events[-1], ('done', '<p>Both parties</p>', 'ai'))
+
+    def test_stream_failing_before_first_token_falls_back(self):
+        with self.stream([RuntimeError('model down')]), self.assertLogs(ai.logger, 'ERROR'):
+            events = list(ai.stream_clause('nda', 'p', 'context', METADATA, use_cache=False))
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][2], 'fallback')
+        self.assertEqual(ai.breaker.failures, 1)
+
+    def test_abandoned_stream_releases_the_half_open_trial(self):
+        ai.breaker.record_failure()
+        ai.breaker.record_failure()
+        ai.breaker.opened_at -= 60  # half-open
+
+        with self.stream(['Both ', 'parties']):
+            events = ai.stream_clause('nda', 'p', 'context', METADATA, use_cache=False)
+            self.assertEqual(next(events), ('delta', 'Both '))
+            events.close()
+        self.assertEqual(ai.breaker.state, 'half-open')
+        self.assertTrue(ai.breaker.allow())
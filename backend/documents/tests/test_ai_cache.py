@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from documents.utils import ai_cache
+
+
+class ClauseKeyTests(SimpleTestCase):
+    def test_key_covers_every_input(self):
+        key = ai_cache.make_key('model', 'system', 'prompt', 'context')
+        self.assertEqual(key, ai_cache.make_key('model', 'system', 'prompt', 'context'))
+        self.assertNotEqual(key, ai_cache.make_key('model', 'system', 'prompt', 'other context'))
+        self.assertNotEqual(key, ai_cache.make_key('other-model', 'system', 'prompt', 'context'))
+
+
+class LocMemLRUBackendTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        backend = ai_cache.LocMemLRUBackend(max_entries=2)
+        backend.set('a', 'A', ttl=0)
+        backend.set('b', 'B', ttl=0)
+        backend.get('a')
+        backend.set('c', 'C', ttl=0)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), ('A', None, 'C'))
+
+    def test_expiry(self):
+        backend = ai_cache.LocMemLRUBackend(max_entries=2)
+        with mock.patch.object(ai_cache.time, 'monotonic', return_value=100):
+            backend.set('a', 'A', ttl=10)
+        with mock.patch.object(ai_cache.time, 'monotonic', return_value=109):
+            self.assertEqual(backend.get('a'), 'A')
+        with mock.patch.object(ai_cache.time, 'monotonic', return_value=111):
+            self.assertIsNone(backend.get('a'))
+
+
+class DatabaseBackendTests(TestCase):
+    def test_round_trip_and_eviction(self):
+        backend = ai_cache.DatabaseBackend(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            backend.set(key, key.upper(), ttl=60, model='m')
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.get('c'), 'C')
+
+    def test_failing_backend_is_a_miss(self):
+        backend = mock.Mock()
+        backend.get.side_effect = RuntimeError('cache down')
+        cache = ai_cache.ClauseCache(backend, ttl=60)
+        with self.assertLogs(ai_cache.logger, 'WARNING'):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['misses'], 1)
@@ -0,0 +1,132 @@
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from documents.models import GeneratedDocument
+from documents.tests import make_user
+from documents.utils import bulk, pdf_pool, pipeline
+from users.models import User
+
+ROW = {
+    'template_type': 'nda',
+    'prompt': 'confidentiality',
+    'metadata': {'recipient_name': 'Bob', 'start_date': '2025-01-01', 'end_date': '2026-01-01'},
+    'signer_username': 'bob',
+    'signer_email': 'bob@example.com',
+    'signer_first_name': 'Bob',
+    'signer_last_name': 'Doe',
+}
+
+
+def fake_pdfs(*jobs):
+    return [b'%PDF-1.4 fake' for _ in jobs]
+
+
+@override_settings(SUMMARY_PRECOMPUTE='off', ENCRYPTED_ARTEFACTS='lazy', BULK_GENERATION_CHUNK_SIZE=2,
+                   BULK_RENDER_BUSY_RETRIES=1, BULK_RENDER_BUSY_BACKOFF=0)
+class BulkGenerateTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = make_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        clause = mock.patch.object(pipeline, 'resolve_clause', return_value=('<p>Shared clause</p>', 'ai'))
+        self.resolve_clause = clause.start()
+        self.addCleanup(clause.stop)
+
+    def post(self, rows):
+        response = self.client.post('/documents/v1/generate/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def rows(self, count):
+        return [
+            {**ROW, 'metadata': {**ROW['metadata'], 'recipient_name': f"Recipient {i}"},
+             'signer_username': f"signer{i}", 'signer_email': f"signer{i}@example.com"}
+            for i in range(count)
+        ]
+
+    def test_streams_rows_progress_and_summary(self):
+        rows = self.rows(3) + [{**ROW, 'signer_email': 'not-an-email'}]
+        with mock.patch.object(pdf_pool, 'render_pdfs', side_effect=fake_pdfs):
+            events = self.post(rows)
+
+        self.assertEqual(events[0], {'type': 'start', 'total': 4})
+        self.assertEqual(events[-1], {'type': 'summary', 'total': 4, 'created': 3, 'failed': 1})
+        by_index = {event['index']: event for event in events if event['type'] == 'row'}
+        self.assertEqual(by_index[3]['status'], 'invalid')
+        self.assertIn('signer_email', by_index[3]['errors'])
+        self.assertEqual({by_index[i]['status'] for i in range(3)}, {'created'})
+        self.assertEqual([e['done'] for e in events if e['type'] == 'progress'], [3, 4])
+
+        # Rows sharing a template and prompt share one clause.
+        self.resolve_clause.assert_called_once()
+        self.assertNotIn('recipient_name', self.resolve_clause.call_args.args[1]['metadata'])
+        self.assertEqual(GeneratedDocument.objects.filter(owner=self.owner).count(), 3)
+
+    def test_provisioned_signers_have_unusable_passwords(self):
+        with mock.patch.object(pdf_pool, 'render_pdfs', side_effect=fake_pdfs):
+            self.post(self.rows(2))
+        for signer in User.objects.filter(username__in=['signer0', 'signer1']):
+            self.assertFalse(signer.has_usable_password())
+            self.assertTrue(signer.password.startswith('!'))
+
+    def test_existing_signer_is_matched_by_email(self):
+        existing = make_user('robert')
+        row = {**ROW, 'signer_username': 'bobby', 'signer_email': 'ROBERT@example.com'}
+        with mock.patch.object(pdf_pool, 'render_pdfs', side_effect=fake_pdfs):
+            events = self.post([row])
+        doc = GeneratedDocument.objects.get(pk=events[1]['document_id'])
+        self.assertEqual(doc.signer, existing)
+        self.assertFalse(User.objects.filter(username='bobby').exists())
+
+    def test_busy_renderer_fails_the_chunk_after_retrying(self):
+        busy = pdf_pool.RendererBusy('PDF renderer queue is full.')
+        with mock.patch.object(pdf_pool, 'render_pdfs', side_effect=busy) as render, self.assertLogs(bulk.logger, 'WARNING'):
+            events = self.post(self.rows(2))
+        self.assertEqual(render.call_count, 2)
+        errors = [event['error'] for event in events if event['type'] == 'row']
+        self.assertEqual(errors, ['The server is busy, please try again shortly.'] * 2)
+        self.assertEqual(events[-1], {'type': 'summary', 'total': 2, 'created': 0, 'failed': 2})
+
+    def test_stream_ends_with_error_and_summary_when_stopped_early(self):
+        with mock.patch.object(bulk, 'provision_signers', side_effect=RuntimeError('database gone')), \
+                self.assertLogs(bulk.logger, 'ERROR'):
+            events = self.post(self.rows(2))
+        self.assertEqual([event['type'] for event in events], ['start', 'error', 'summary'])
+        self.assertEqual(events[1]['done'], 0)
+        self.assertEqual(events[2], {'type': 'summary', 'total': 2, 'created': 0, 'failed': 0})
+
+    def test_rejects_bad_input(self):
+        response = self.client.post('/documents/v1/generate/bulk/', {'rows': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_rows(self):
+        body = (
+            "signer_username,signer_email,signer_first_name,signer_last_name,recipient_name\n"
+            "carol,carol@example.com,Carol,Doe,Carol\n"
+        )
+        query = '?template_type=nda&prompt=confidentiality&metadata=' + json.dumps(
+            {'start_date': '2025-01-01', 'end_date': '2026-01-01'})
+        with mock.patch.object(pdf_pool, 'render_pdfs', side_effect=fake_pdfs):
+            response = self.client.post('/documents/v1/generate/bulk/' + query, body, content_type='text/csv')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(events[-1], {'type': 'summary', 'total': 1, 'created': 1, 'failed': 0})
+
+
+class SignerDefaultsTests(TestCase):
+    def test_single_path_signer_has_an_unusable_password(self):
+        signer = pipeline.get_or_create_signer(ROW)
+        self.assertFalse(signer.has_usable_password())
+        self.assertTrue(signer.password.startswith('!'))
@@ -0,0 +1,67 @@
+from cryptography.fernet import Fernet
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from documents.models import GeneratedDocument
+from documents.tests import make_user
+from documents.utils import envelope
+
+
+class EnvelopeTests(TestCase):
+    def test_round_trip(self):
+        blob = envelope.encrypt(b'secret')
+        self.assertNotIn(b'secret', blob)
+        self.assertEqual(envelope.decrypt(blob), b'secret')
+        self.assertTrue(envelope.is_current(blob))
+
+    def test_json_round_trip(self):
+        value = {'recipient_name': 'Bob', 'salary': 100000}
+        self.assertEqual(envelope.decrypt_json(envelope.encrypt_json(value)), value)
+
+    def test_fresh_data_key_per_value(self):
+        self.assertNotEqual(envelope.encrypt(b'same'), envelope.encrypt(b'same'))
+
+    def test_tampered_value_is_rejected(self):
+        blob = bytearray(envelope.encrypt(b'secret'))
+        blob[-1] ^= 1
+        with self.assertRaises(envelope.EnvelopeError):
+            envelope.decrypt(bytes(blob))
+
+    def test_not_an_envelope(self):
+        with self.assertRaises(envelope.EnvelopeError):
+            envelope.decrypt(b'plain text')
+
+    @override_settings(METADATA_MASTER_KEY='old-master-key', METADATA_OLD_MASTER_KEYS=[])
+    def test_rotation(self):
+        blob = envelope.encrypt(b'secret')
+
+        with override_settings(METADATA_MASTER_KEY='new-master-key', METADATA_OLD_MASTER_KEYS=['old-master-key']):
+            self.assertFalse(envelope.is_current(blob))
+            self.assertEqual(envelope.decrypt(blob), b'secret')
+            rotated = envelope.rotate(blob)
+            self.assertTrue(envelope.is_current(rotated))
+            self.assertEqual(envelope.decrypt(rotated), b'secret')
+            self.assertIs(envelope.rotate(rotated), rotated)
+
+        with override_settings(METADATA_MASTER_KEY='new-master-key', METADATA_OLD_MASTER_KEYS=[]):
+            self.assertEqual(envelope.decrypt(rotated), b'secret')
+            with self.assertRaises(envelope.EnvelopeError):
+                envelope.decrypt(blob)
+
+    @override_settings(METADATA_MASTER_KEY='', METADATA_OLD_MASTER_KEYS=[])
+    def test_derived_keys_follow_fernet_rotation(self):
+        old_key = Fernet.generate_key().decode()
+        with override_settings(FERNET_KEY=old_key, FERNET_OLD_KEYS=[]):
+            blob = envelope.encrypt(b'secret')
+        with override_settings(FERNET_KEY=Fernet.generate_key().decode(), FERNET_OLD_KEYS=[old_key]):
+            self.assertFalse(envelope.is_current(blob))
+            self.assertTrue(envelope.is_current(envelope.rotate(blob)))
+
+    def test_metadata_field_stores_envelope(self):
+        doc = GeneratedDocument.objects.create(owner=make_user('alice'), document_type='nda', metadata={'recipient_name': 'Bob'})
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT metadata FROM {GeneratedDocument._meta.db_table} WHERE id = %s", [doc.pk])
+            raw = bytes(cursor.fetchone()[0])
+        self.assertTrue(raw.startswith(envelope.VERSION))
+        self.assertNotIn(b'Bob', raw)
+        self.assertEqual(GeneratedDocument.objects.get(pk=doc.pk).metadata, {'recipient_name': 'Bob'})
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from documents.models import GeneratedDocument, GenerationJob
+from documents.tests import make_user
+from documents.utils import jobs
+
+PAYLOAD = {'template_type': 'nda', 'prompt': 'confidentiality', 'metadata': {'recipient_name': 'Bob'}}
+
+
+def fail_at_ai(owner, data, on_stage):
+    on_stage('ai')
+    raise RuntimeError('AI unavailable')
+
+
+@override_settings(DOCUMENT_JOBS_EAGER=False, GENERATION_JOB_MAX_ATTEMPTS=3, GENERATION_JOB_RETRY_BACKOFF=30)
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('alice')
+
+    def enqueue(self):
+        return jobs.enqueue_generation(self.owner, PAYLOAD)
+
+    def test_claim_is_exclusive(self):
+        job = self.enqueue()
+        self.assertTrue(jobs.claim_job(job.id))
+        self.assertFalse(jobs.claim_job(job.id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertIsNotNone(job.started_at)
+
+    def test_claim_next_takes_the_oldest_due_job(self):
+        first, second, later = self.enqueue(), self.enqueue(), self.enqueue()
+        GenerationJob.objects.filter(pk=first.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(jobs.claim_next_job().pk, second.pk)
+        self.assertEqual(jobs.claim_next_job().pk, later.pk)
+        self.assertIsNone(jobs.claim_next_job())
+
+    def test_success(self):
+        doc = GeneratedDocument.objects.create(owner=self.owner, document_type='nda')
+        job = self.enqueue()
+        jobs.claim_job(job.id)
+        with mock.patch.object(jobs.pipeline, 'generate_document', return_value=doc):
+            job = jobs.run_job(GenerationJob.objects.get(pk=job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.document, doc)
+        self.assertIsNone(job.payload)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_is_retried_with_backoff(self):
+        job = self.enqueue()
+        with mock.patch.object(jobs.pipeline, 'generate_document', side_effect=fail_at_ai):
+            for attempt, delay in ((1, 30), (2, 60)):
+                job = jobs.claim_next_job()
+                self.assertEqual(job.attempts, attempt)
+                before = timezone.now()
+                with self.assertLogs(jobs.logger, 'ERROR'):
+                    jobs.run_job(job)
+
+                job.refresh_from_db()
+                self.assertEqual(job.status, 'pending')
+                self.assertEqual(job.error, 'AI unavailable')
+                self.assertEqual(job.stages['ai']['status'], 'failed')
+                self.assertGreaterEqual(job.next_attempt_at, before + timedelta(seconds=delay))
+                # Not due yet.
+                self.assertIsNone(jobs.claim_next_job())
+                GenerationJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+
+            job = jobs.claim_next_job()
+            with self.assertLogs(jobs.logger, 'ERROR'):
+                jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(GENERATION_JOB_TIMEOUT=60)
+    def test_stale_jobs_are_requeued_or_failed(self):
+        stale, exhausted, fresh = self.enqueue(), self.enqueue(), self.enqueue()
+        for job in (stale, exhausted, fresh):
+            jobs.claim_job(job.id)
+        long_ago = timezone.now() - timedelta(minutes=5)
+        GenerationJob.objects.filter(pk__in=[stale.pk, exhausted.pk]).update(started_at=long_ago)
+        GenerationJob.objects.filter(pk=exhausted.pk).update(attempts=3)
+
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        statuses = dict(GenerationJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {stale.pk: 'pending', exhausted.pk: 'failed', fresh.pk: 'running'})
+
+    @override_settings(DOCUMENT_JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        doc = GeneratedDocument.objects.create(owner=self.owner, document_type='nda')
+        with mock.patch.object(jobs.pipeline, 'generate_document', return_value=doc) as generate:
+            job = self.enqueue()
+        generate.assert_called_once()
+        self.assertEqual(job.status, 'succeeded')
@@ -0,0 +1,120 @@
+from unittest import mock
+
+from cryptography.fernet import Fernet
+from django.test import TestCase, override_settings
+
+from documents.models import GeneratedDocument, KeyRotationCheckpoint
+from documents.tests import make_user
+from documents.utils import encryption, envelope, key_rotation
+from summary.models import DocumentSummary
+
+
+class KeyRotationTests(TestCase):
+    def setUp(self):
+        self.old_key = Fernet.generate_key().decode()
+        self.use_keys(self.old_key)
+        owner = make_user('alice')
+        self.docs = [
+            GeneratedDocument.objects.create(owner=owner, document_type='nda', metadata={'index': index})
+            for index in range(5)
+        ]
+        self.summary = DocumentSummary.objects.create(
+            document=self.docs[0],
+            terms=encryption.encrypt_value('Pay on time'),
+            dates={'effective': encryption.encrypt_value('2025-01-01')},
+        )
+        self.use_keys(Fernet.generate_key().decode(), self.old_key)
+
+    def use_keys(self, key, *old_keys):
+        # Envelope master keys are derived from the Fernet keys when unset.
+        settings_override = override_settings(
+            FERNET_KEY=key, FERNET_OLD_KEYS=list(old_keys), METADATA_MASTER_KEY='', METADATA_OLD_MASTER_KEYS=[],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        encryption.reset()
+        self.addCleanup(encryption.reset)
+
+    def raw_metadata(self, doc):
+        return GeneratedDocument.objects.filter(pk=doc.pk).values_list('metadata', flat=True).get()
+
+    def test_shards_rotate_every_row_once(self):
+        checkpoints = key_rotation.plan('metadata', workers=2)
+        self.assertEqual([(c.start_pk, c.end_pk) for c in checkpoints],
+                         [(self.docs[0].pk, self.docs[2].pk), (self.docs[3].pk, self.docs[4].pk)])
+
+        totals = [key_rotation.run_shard(c.pk, batch_size=2) for c in checkpoints]
+        self.assertEqual(totals, [(3, 3), (2, 2)])
+        for index, doc in enumerate(self.docs):
+            self.assertTrue(envelope.is_current(self.raw_metadata(doc)))
+            self.assertEqual(GeneratedDocument.objects.get(pk=doc.pk).metadata, {'index': index})
+        self.assertEqual(key_rotation.plan('metadata', workers=2), [])
+
+    def test_interrupted_shard_resumes_from_its_checkpoint(self):
+        checkpoint, = key_rotation.plan('metadata', workers=1)
+        model, fields, rotate_row = key_rotation.TARGETS['metadata']
+
+        def fail_on_third(pk, blob):
+            if pk == self.docs[2].pk:
+                raise RuntimeError('connection lost')
+            return rotate_row(pk, blob)
+
+        with mock.patch.dict(key_rotation.TARGETS, {'metadata': (model, fields, fail_on_third)}), \
+                self.assertRaises(RuntimeError):
+            key_rotation.run_shard(checkpoint.pk, batch_size=10)
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.last_pk, checkpoint.rotated, checkpoint.finished), (self.docs[1].pk, 2, False))
+
+        self.assertEqual(key_rotation.plan('metadata', workers=4), [checkpoint])
+        self.assertEqual(key_rotation.run_shard(checkpoint.pk, batch_size=10), (5, 5))
+        self.assertTrue(KeyRotationCheckpoint.objects.get(pk=checkpoint.pk).finished)
+
+    def test_metadata_rewritten_meanwhile_is_left_alone(self):
+        doc = self.docs[0]
+        stale = self.raw_metadata(doc)
+        doc.metadata = {'index': 'edited'}
+        doc.save(update_fields=['metadata'])
+
+        self.assertFalse(key_rotation._rotate_metadata(doc.pk, stale))
+        self.assertEqual(GeneratedDocument.objects.get(pk=doc.pk).metadata, {'index': 'edited'})
+
+    def summary_values(self):
+        return DocumentSummary.objects.filter(pk=self.summary.pk).values_list(*key_rotation.SUMMARY_FIELDS).get()
+
+    def test_summary_rotation(self):
+        self.assertTrue(key_rotation._rotate_summary(self.summary.pk, *self.summary_values()))
+        terms, _, dates, signatures = self.summary_values()
+        self.assertTrue(encryption.is_current(terms))
+        self.assertEqual(encryption.decrypt_value(terms), 'Pay on time')
+        self.assertEqual(encryption.decrypt_value(dates['effective']), '2025-01-01')
+        self.assertIsNone(signatures)
+        self.assertFalse(key_rotation._rotate_summary(self.summary.pk, *self.summary_values()))
+
+    def test_summary_filled_in_meanwhile_is_read_again(self):
+        stale = self.summary_values()
+        with override_settings(FERNET_KEY=self.old_key, FERNET_OLD_KEYS=[]):
+            encryption.reset()
+            late = encryption.encrypt_value('Bob Doe')
+        encryption.reset()
+        DocumentSummary.objects.filter(pk=self.summary.pk).update(signatures_required=[late])
+
+        self.assertTrue(key_rotation._rotate_summary(self.summary.pk, *stale))
+        terms, _, _, signatures = self.summary_values()
+        self.assertTrue(encryption.is_current(terms))
+        self.assertTrue(encryption.is_current(signatures[0]))
+        self.assertEqual(encryption.decrypt_value(signatures[0]), 'Bob Doe')
+
+    def test_summary_that_keeps_changing_is_skipped(self):
+        stale = self.summary_values()
+        with mock.patch.object(DocumentSummary.objects, 'filter') as filter_, \
+                self.assertLogs(key_rotation.logger, 'WARNING'):
+            # Every compare-and-swap misses and every re-read finds the row still unrotated.
+            filter_.return_value.update.return_value = 0
+            filter_.return_value.values_list.return_value.first.return_value = stale
+            self.assertFalse(key_rotation._rotate_summary(self.summary.pk, *stale, attempts=3))
+        self.assertEqual(filter_.return_value.update.call_count, 3)
+
+    def test_deleted_summary(self):
+        stale = self.summary_values()
+        DocumentSummary.objects.filter(pk=self.summary.pk).delete()
+        self.assertFalse(key_rotation._rotate_summary(self.summary.pk, *stale))
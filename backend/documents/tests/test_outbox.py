@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from documents.models import OutboundEmail
+from documents.utils import outbox
+
+
+@override_settings(EMAIL_OUTBOX_EAGER=False, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BACKOFF=30,
+                   EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    def queue(self, subject='Hello', **kwargs):
+        return outbox.queue_email(subject, 'Body', ['bob@example.com'], **kwargs)
+
+    def test_queue_only_writes_a_row(self):
+        email = self.queue()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(mail.outbox, [])
+
+    def test_delivers_a_batch(self):
+        for i in range(3):
+            self.queue(f"Hello {i}")
+        self.assertEqual(outbox.deliver_pending(batch_size=2), 2)
+        self.assertEqual(outbox.deliver_pending(batch_size=2), 1)
+        self.assertEqual(outbox.deliver_pending(batch_size=2), 0)
+
+        self.assertEqual(sorted(m.subject for m in mail.outbox), ['Hello 0', 'Hello 1', 'Hello 2'])
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(set(OutboundEmail.objects.values_list('attempts', flat=True)), {1})
+
+    def test_attachment(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            name = default_storage.save('documents/plain/nda.pdf', ContentFile(b'%PDF-1.4'))
+            self.queue(attachment=name)
+            outbox.deliver_pending()
+        self.assertEqual(mail.outbox[0].attachments[0][1], b'%PDF-1.4')
+
+    def test_failures_back_off_then_give_up(self):
+        email = self.queue()
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('mailbox unavailable')):
+            for attempt, delay in ((1, 30), (2, 60)):
+                before = timezone.now()
+                with self.assertLogs(outbox.logger, 'WARNING'):
+                    self.assertEqual(outbox.deliver_pending(), 0)
+                email.refresh_from_db()
+                self.assertEqual((email.status, email.attempts), ('pending', attempt))
+                self.assertEqual(email.last_error, 'mailbox unavailable')
+                self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=delay))
+                # Not due yet.
+                self.assertEqual(outbox._claim_batch(10), [])
+                OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+
+            with self.assertLogs(outbox.logger, 'ERROR'):
+                outbox.deliver_pending()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+
+    def test_one_failure_does_not_stop_the_batch(self):
+        bad, good = self.queue('Bad'), self.queue('Good')
+        send = mail.EmailMessage.send
+
+        def flaky(message, *args, **kwargs):
+            if message.subject == 'Bad':
+                raise OSError('rejected')
+            return send(message, *args, **kwargs)
+
+        with mock.patch('django.core.mail.EmailMessage.send', flaky), self.assertLogs(outbox.logger, 'WARNING'):
+            self.assertEqual(outbox.deliver_pending(), 1)
+        self.assertEqual(dict(OutboundEmail.objects.values_list('pk', 'status')), {bad.pk: 'pending', good.pk: 'sent'})
+
+    def test_connection_failure_retries_the_whole_batch(self):
+        self.queue(), self.queue()
+        connection = mock.Mock(**{'open.side_effect': OSError('connection refused')})
+        with mock.patch.object(outbox, 'get_connection', return_value=connection), self.assertLogs(outbox.logger, 'WARNING'):
+            self.assertEqual(outbox.deliver_pending(), 0)
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', flat=True)), {'pending'})
+        self.assertEqual(set(OutboundEmail.objects.values_list('last_error', flat=True)), {'connection refused'})
+
+    def test_claimed_email_is_not_claimed_twice(self):
+        self.queue()
+        self.assertEqual(len(outbox._claim_batch(10)), 1)
+        self.assertEqual(outbox._claim_batch(10), [])
+
+    def test_requeue_stuck(self):
+        stuck, recent = self.queue(), self.queue()
+        OutboundEmail.objects.update(status='sending', locked_at=timezone.now())
+        OutboundEmail.objects.filter(pk=stuck.pk).update(locked_at=timezone.now() - timedelta(minutes=20))
+
+        self.assertEqual(outbox.requeue_stuck(older_than=600), 1)
+        self.assertEqual(dict(OutboundEmail.objects.values_list('pk', 'status')), {stuck.pk: 'pending', recent.pk: 'sending'})
+
+    @override_settings(EMAIL_OUTBOX_EAGER=True)
+    def test_eager_delivery_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue()
+        self.assertEqual(len(mail.outbox), 1)
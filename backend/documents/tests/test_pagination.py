@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from documents.models import GeneratedDocument
+from documents.tests import make_user
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        signer = make_user('bob')
+        docs = [GeneratedDocument.objects.create(owner=self.user, signer=signer, document_type='nda') for _ in range(7)]
+        # Ties on created_at must be broken by id.
+        now = timezone.now()
+        GeneratedDocument.objects.filter(pk__in=[d.pk for d in docs[:4]]).update(created_at=now)
+        GeneratedDocument.objects.filter(pk__in=[d.pk for d in docs[4:]]).update(created_at=now - timedelta(days=1))
+        GeneratedDocument.objects.create(owner=signer, document_type='nda')
+        self.expected = [d.pk for d in sorted(docs[:4], key=lambda d: -d.pk)] + [d.pk for d in sorted(docs[4:], key=lambda d: -d.pk)]
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        url = '/documents/v1/list/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.client.get('/documents/v1/list/?page_size=3').data
+        GeneratedDocument.objects.create(owner=self.user, document_type='nda')
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['id'] for row in second['results']], self.expected[3:6])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        counts = []
+        for size in (1, 7):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/documents/v1/list/?page_size={size}')
+            self.assertEqual(len(response.data['results']), size)
+            self.assertEqual(response.data['results'][0]['signer_username'], 'bob')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/documents/v1/list/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
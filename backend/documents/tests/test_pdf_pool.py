@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from documents.utils import pdf_pool
+
+
+def fake_render(job):
+    """Jobs are ('sleep', seconds) or ('fail', message); forked workers inherit this patch."""
+    kind, value = job
+    if kind == 'fail':
+        raise ValueError(value)
+    time.sleep(value)
+    return f"pdf after {value}s".encode()
+
+
+@mock.patch.object(pdf_pool, '_warmup_jobs', list)
+@mock.patch.object(pdf_pool, '_render', fake_render)
+class RendererPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        pool = pdf_pool.RendererPool(**kwargs)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_renders_in_order(self):
+        pool = self.make_pool(size=2, timeout=5, max_pending=4)
+        self.assertEqual(pool.render_many([('sleep', 0.2), ('sleep', 0)]), [b'pdf after 0.2s', b'pdf after 0s'])
+
+    def test_timeout_is_per_job(self):
+        # Three jobs in a row on one worker take longer than one timeout in total.
+        pool = self.make_pool(size=1, timeout=1, max_pending=4)
+        self.assertEqual(len(pool.render_many([('sleep', 0.6)] * 3)), 3)
+
+    def test_overrunning_job_only_replaces_its_worker(self):
+        pool = self.make_pool(size=2, timeout=1, max_pending=8)
+        pool.start()
+        first_pids = {worker.process.pid for worker in pool._workers}
+
+        results = {}
+
+        def quick_batch():
+            results['quick'] = pool.render_many([('sleep', 0.3)] * 4)
+
+        thread = threading.Thread(target=quick_batch)
+        with self.assertRaises(pdf_pool.RendererTimeout), self.assertLogs(pdf_pool.logger, 'WARNING'):
+            thread.start()
+            pool.render_many([('sleep', 30)])
+        thread.join()
+
+        self.assertEqual(results['quick'], [b'pdf after 0.3s'] * 4)
+        pids = {worker.process.pid for worker in pool._workers}
+        self.assertEqual(len(first_pids & pids), 1)
+        self.assertEqual(pool.render_many([('sleep', 0)] * 2), [b'pdf after 0s'] * 2)
+
+    def test_render_errors_keep_the_worker(self):
+        pool = self.make_pool(size=1, timeout=5, max_pending=4)
+        with self.assertRaisesMessage(ValueError, 'bad template'):
+            pool.render_many([('fail', 'bad template')])
+        pid = next(iter(pool._workers)).process.pid
+        pool.render_many([('sleep', 0)])
+        self.assertEqual(next(iter(pool._workers)).process.pid, pid)
+
+    def test_batch_larger_than_max_pending(self):
+        pool = self.make_pool(size=2, timeout=5, max_pending=2)
+        self.assertEqual(len(pool.render_many([('sleep', 0)] * 7)), 7)
+
+    def test_full_queue_is_busy(self):
+        pool = self.make_pool(size=1, timeout=5, max_pending=1)
+        pool._slots.acquire()
+        try:
+            with self.assertRaises(pdf_pool.RendererBusy):
+                pool.render_many([('sleep', 0)])
+        finally:
+            pool._slots.release()
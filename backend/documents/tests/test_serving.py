@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from documents.models import GeneratedDocument
+from documents.tests import make_user
+from documents.utils.serving import MAX_RANGES, parse_ranges, serve_file
+
+
+class ParseRangesTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(parse_ranges('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_ranges('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_ranges('bytes=-10', 100), [(90, 99)])
+        self.assertEqual(parse_ranges('bytes=95-200', 100), [(95, 99)])
+        self.assertEqual(parse_ranges('bytes=-200', 100), [(0, 99)])
+
+    def test_multiple_ranges(self):
+        self.assertEqual(parse_ranges('bytes=0-0, 10-19', 100), [(0, 0), (10, 19)])
+
+    def test_unsatisfiable(self):
+        self.assertEqual(parse_ranges('bytes=100-', 100), [])
+        self.assertEqual(parse_ranges('bytes=-0', 100), [])
+
+    def test_ignored(self):
+        self.assertIsNone(parse_ranges('items=0-9', 100))
+        self.assertIsNone(parse_ranges('bytes=', 100))
+        self.assertIsNone(parse_ranges('bytes=-', 100))
+        self.assertIsNone(parse_ranges('bytes=a-b', 100))
+        self.assertIsNone(parse_ranges('bytes=9-0', 100))
+        self.assertIsNone(parse_ranges('bytes=' + ','.join(['0-0'] * (MAX_RANGES + 1)), 100))
+
+
+class ServeFileTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, FILE_SERVE_MODE='django')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.doc = GeneratedDocument.objects.create(owner=make_user('alice'), document_type='nda')
+        self.doc.plain_pdf.save('nda.pdf', ContentFile(self.content))
+        self.factory = RequestFactory()
+
+    def serve(self, headers=None):
+        return serve_file(self.factory.get('/', headers=headers), self.doc.plain_pdf, 'application/pdf', 'nda.pdf')
+
+    def test_full_response(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+
+    def test_single_range(self):
+        response = self.serve({'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_multiple_ranges(self):
+        response = self.serve({'Range': 'bytes=0-3,-4'})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(response.streaming_content)
+        self.assertIn(f"Content-Range: bytes 0-3/{len(self.content)}".encode(), body)
+        self.assertIn(self.content[:4], body)
+        self.assertIn(self.content[-4:], body)
+
+    def test_unsatisfiable_range(self):
+        response = self.serve({'Range': f"bytes={len(self.content)}-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f"bytes */{len(self.content)}")
+
+    def test_not_modified(self):
+        etag = self.serve()['ETag']
+        response = self.serve({'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_stale_if_range_serves_whole_file(self):
+        response = self.serve({'Range': 'bytes=10-19', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(FILE_SERVE_MODE='x-accel', FILE_SERVE_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_offload(self):
+        response = self.serve()
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-media/{self.doc.plain_pdf.name}")
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(FILE_SERVE_MODE='x-sendfile')
+    def test_x_sendfile_offload(self):
+        response = self.serve()
+        self.assertEqual(response['X-Sendfile'], self.doc.plain_pdf.path)
+
+    @override_settings(FILE_SERVE_MODE='x-accel')
+    def test_compressed_files_are_not_offloaded(self):
+        self.doc.plain_html.save('nda.html', ContentFile(b'<p>NDA</p>'))
+        response = serve_file(self.factory.get('/', headers={'Range': 'bytes=0-1'}), self.doc.plain_html, 'text/html')
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'none')
+        self.assertEqual(b''.join(response.streaming_content), b'<p>NDA</p>')
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from documents import storage
+from documents.management.commands.compact_media import Command
+from documents.models import StoredBlob
+
+PDF = b'%PDF-1.4 same bytes'
+HTML = '<p>' + 'Confidential information. ' * 200 + '</p>'
+
+
+class MediaTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def blob(self, name):
+        return StoredBlob.objects.get(name=name)
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('documents/plain/a.pdf', ContentFile(PDF))
+        second = default_storage.save('documents/plain/b.pdf', ContentFile(PDF))
+        self.assertEqual(first, second)
+        self.assertTrue(storage.is_blob(first))
+        self.assertEqual(self.blob(first).refcount, 2)
+        with default_storage.open(first) as f:
+            self.assertEqual(f.read(), PDF)
+
+        default_storage.delete(first)
+        self.assertEqual(self.blob(first).refcount, 1)
+        default_storage.delete(first)
+        default_storage.delete(first)
+        self.assertEqual(self.blob(first).refcount, 0)
+        self.assertTrue(os.path.exists(default_storage.path(first)))
+
+    def test_html_is_compressed_on_disk(self):
+        name = default_storage.save('documents/plain_html/a.html', ContentFile(HTML.encode()))
+        self.assertTrue(default_storage.path(name).endswith('.html.br'))
+        self.assertLess(os.path.getsize(default_storage.path(name)), len(HTML))
+        self.assertEqual(default_storage.size(name), len(HTML))
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read().decode(), HTML)
+
+    def test_failed_save_takes_no_reference(self):
+        with mock.patch.object(os, 'replace', side_effect=OSError('disk full')), self.assertRaises(OSError):
+            default_storage.save('documents/plain/a.pdf', ContentFile(PDF))
+        self.assertFalse(StoredBlob.objects.filter(refcount__gt=0).exists())
+        self.assertEqual(os.listdir(default_storage.path(storage.PREFIX + 'tmp')), [])
+
+
+class SweepTests(MediaTestCase):
+    def unreferenced(self, content=PDF, age=timedelta(hours=2)):
+        name = default_storage.save('documents/plain/a.pdf', ContentFile(content))
+        default_storage.delete(name)
+        StoredBlob.objects.filter(name=name).update(updated_at=timezone.now() - age)
+        return name
+
+    def sweep(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Command().sweep(timezone.now() - timedelta(hours=1), dry_run=False)
+
+    def test_unreferenced_blob_is_removed(self):
+        name = self.unreferenced()
+        self.assertEqual(self.sweep(), (1, len(PDF)))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(default_storage.path(name)))
+        self.assertEqual(os.listdir(default_storage.path(storage.PREFIX + 'tmp')), [])
+
+    def test_blobs_in_use_or_within_grace_are_kept(self):
+        recent = self.unreferenced(age=timedelta(minutes=5))
+        used = default_storage.save('documents/plain/b.pdf', ContentFile(b'%PDF-1.4 other'))
+        StoredBlob.objects.filter(name=used).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(self.sweep(), (0, 0))
+        self.assertTrue(os.path.exists(default_storage.path(recent)))
+        self.assertTrue(os.path.exists(default_storage.path(used)))
+
+    def test_save_before_the_unlink_keeps_its_file(self):
+        # A save of the same content that lands after the row is deleted but
+        # before the old file is unlinked must keep the file it wrote.
+        name = self.unreferenced()
+        real_remove = os.remove
+        saved = []
+
+        def save_then_remove(path):
+            if not saved:
+                saved.append(default_storage.save('documents/plain/again.pdf', ContentFile(PDF)))
+            real_remove(path)
+
+        with mock.patch.object(os, 'remove', side_effect=save_then_remove):
+            self.assertEqual(self.sweep(), (1, len(PDF)))
+
+        self.assertEqual(saved, [name])
+        self.assertEqual(self.blob(name).refcount, 1)
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), PDF)
+
+    def test_failed_removal_restores_the_file(self):
+        name = self.unreferenced()
+        with mock.patch.object(transaction, 'on_commit', side_effect=RuntimeError('boom')), \
+                self.assertRaises(RuntimeError):
+            Command().remove_blob(self.blob(name).pk, name, timezone.now())
+        self.assertEqual(self.blob(name).refcount, 0)
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), PDF)
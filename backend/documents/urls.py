@@ -3,12 +3,20 @@ from documents.views import (
     GenerateDocumentView,
     GeneratedDocumentListView,
     GeneratedDocumentServeView,
-    SendToSignerView
+    SendToSignerView,
+    GenerationJobStatusView,
+    BulkGenerateDocumentView,
+    ClauseStreamView,
+    SignerInboxView
 )
 
 urlpatterns = [
     path('generate/', GenerateDocumentView.as_view(), name='generate-document'),
+    path('generate/bulk/', BulkGenerateDocumentView.as_view(), name='generate-documents-bulk'),
+    path('clause/stream/', ClauseStreamView.as_view(), name='stream-clause'),
+    path('jobs/<int:pk>/', GenerationJobStatusView.as_view(), name='generation-job-status'),
     path('list/', GeneratedDocumentListView.as_view(), name='my-documents'),
+    path('inbox/', SignerInboxView.as_view(), name='signer-inbox'),
     path('view/<int:pk>/', GeneratedDocumentServeView.as_view(), name='serve-document'),
     path('send/<int:pk>/', SendToSignerView.as_view(), name='send-to-signer'),
 ]
\ No newline at end of file
@@ -1,16 +1,136 @@
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 from django.conf import settings
+from django.db import connection
+
+from documents.utils import ai_cache, ai_client, render_html
+from documents.utils.circuit_breaker import CircuitBreaker
 import markdown as md
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+import logging
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are an assistant that generates NDA clauses. Generate a clause based on the provided context and prompt."
+
+breaker = CircuitBreaker(settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_RESET_TIMEOUT)
+_executor = ThreadPoolExecutor(max_workers=settings.AI_MAX_CONCURRENCY, thread_name_prefix='ai-clause')
+
+
+def _messages(prompt: str, context: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n{context}\n\nPrompt:\n{prompt}"}
+    ]
 
-def generate_ai_clause(prompt: str, context: str) -> str:
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an assistant that generates NDA clauses. Generate a clause based on the provided context and prompt."},
-            {"role": "user", "content": f"Context:\n{context}\n\nPrompt:\n{prompt}"}
-        ],
-    )
+
+def generate_ai_clause(prompt: str, context: str, use_cache: bool = True) -> str:
+    cache = ai_cache.get_cache()
+    key = ai_cache.make_key(MODEL, SYSTEM_PROMPT, prompt, context)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    response = ai_client.chat_completion(model=MODEL, messages=_messages(prompt, context))
     result = response.choices[0].message.content
-    return md.markdown(result).strip()
+    clause = md.markdown(result).strip()
+    cache.set(key, clause, model=MODEL)
+    return clause
+
+
+def fallback_clause(template_type: str, metadata: dict) -> str:
+    return render_html.render_html(f"clauses/{template_type}.html", metadata).strip()
+
+
+def _generate_in_thread(prompt, context):
+    try:
+        return generate_ai_clause(prompt, context, use_cache=False)
+    finally:
+        connection.close()  # the DB cache backend may have opened one in this thread
+
+
+def generate_clause(template_type: str, prompt: str, context: str, metadata: dict, use_cache: bool = True):
+    """
+    Return `(clause, source)` where source is 'cache', 'ai' or 'fallback'.
+
+    The model gets `AI_LATENCY_BUDGETS[template_type]` seconds to answer;
+    past that, or while the circuit breaker is open, the template's clause
+    from `templates/clauses/` is used instead. A call that overruns its
+    budget keeps running in the background and still fills the cache.
+    """
+    if use_cache:
+        cached = ai_cache.get_cache().get(ai_cache.make_key(MODEL, SYSTEM_PROMPT, prompt, context))
+        if cached is not None:
+            return cached, 'cache'
+
+    if not breaker.allow():
+        logger.warning(f"AI circuit open, using fallback clause for {template_type}")
+        return fallback_clause(template_type, metadata), 'fallback'
+
+    budget = settings.AI_LATENCY_BUDGETS.get(template_type, settings.AI_LATENCY_BUDGET_DEFAULT)
+    future = _executor.submit(_generate_in_thread, prompt, context)
+    try:
+        clause = future.result(timeout=budget)
+    except FutureTimeout:
+        breaker.record_failure()
+        logger.warning(f"AI clause for {template_type} exceeded its {budget}s budget, using fallback")
+        return fallback_clause(template_type, metadata), 'fallback'
+    except Exception as e:
+        breaker.record_failure()
+        logger.error(f"AI clause generation failed, using fallback: {str(e)}", exc_info=True)
+        return fallback_clause(template_type, metadata), 'fallback'
+
+    breaker.record_success()
+    return clause, 'ai'
+
+
+def stream_clause(template_type: str, prompt: str, context: str, metadata: dict, use_cache: bool = True):
+    """
+    Yield the clause while the model writes it: `('delta', text)` for each
+    piece of markdown, then `('done', clause, source)` with the finished
+    clause as HTML. Cached clauses come back as a single 'done'. As in
+    `generate_clause`, the template's clause is used while the circuit
+    breaker is open or when the model fails before its first token; a
+    failure after that is raised, since part of the clause was already sent.
+    """
+    cache = ai_cache.get_cache()
+    key = ai_cache.make_key(MODEL, SYSTEM_PROMPT, prompt, context)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield 'done', cached, 'cache'
+            return
+
+    if not breaker.allow():
+        logger.warning(f"AI circuit open, using fallback clause for {template_type}")
+        yield 'done', fallback_clause(template_type, metadata), 'fallback'
+        return
+
+    parts = []
+    settled = False
+    stream = ai_client.stream_chat_completion(model=MODEL, messages=_messages(prompt, context))
+    try:
+        for delta in stream:
+            parts.append(delta)
+            yield 'delta', delta
+        settled = True
+        breaker.record_success()
+    except Exception as e:
+        settled = True
+        breaker.record_failure()
+        if parts:
+            raise
+        logger.error(f"AI clause stream failed, using fallback: {str(e)}", exc_info=True)
+        yield 'done', fallback_clause(template_type, metadata), 'fallback'
+        return
+    finally:
+        stream.close()
+        if not settled:
+            # Closed early (GeneratorExit, the client went away): no verdict, but
+            # a half-open trial must not stay in flight forever.
+            breaker.release()
+
+    clause = md.markdown(''.join(parts)).strip()
+    cache.set(key, clause, model=MODEL)
+    yield 'done', clause, 'ai'
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for AI generated clauses.
+
+Entries are keyed by a SHA-256 of (model, system prompt, prompt, context) so
+identical generations reuse the clause instead of calling the model again.
+The backend is chosen with `AI_CLAUSE_CACHE_BACKEND`:
+
+- "locmem": per-process LRU (default)
+- "django": the Django cache named by `AI_CLAUSE_CACHE_ALIAS`
+- "db": the `AIClauseCacheEntry` table, shared by every process
+- "none": caching disabled
+"""
+from collections import OrderedDict
+from datetime import timedelta
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Q
+from django.utils import timezone
+
+from documents.models import AIClauseCacheEntry
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def make_key(model: str, system_prompt: str, prompt: str, context: str) -> str:
+    payload = json.dumps([model, system_prompt, prompt, context], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LocMemLRUBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, model=''):
+        with self._lock:
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCacheBackend:
+    prefix = 'ai-clause:'
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key, value, ttl, model=''):
+        self.cache.set(self.prefix + key, value, timeout=ttl or None)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class DatabaseBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+
+    def get(self, key):
+        now = timezone.now()
+        entry = (
+            AIClauseCacheEntry.objects
+            .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now), key=key)
+            .only('clause')
+            .first()
+        )
+        if entry is None:
+            return None
+        AIClauseCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=now)
+        return entry.clause
+
+    def set(self, key, value, ttl, model=''):
+        now = timezone.now()
+        AIClauseCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'model': model,
+                'clause': value,
+                'last_used_at': now,
+                'expires_at': now + timedelta(seconds=ttl) if ttl else None,
+            },
+        )
+        self._evict(now)
+
+    def _evict(self, now):
+        AIClauseCacheEntry.objects.filter(expires_at__lte=now).delete()
+        overflow = AIClauseCacheEntry.objects.count() - self.max_entries
+        if overflow > 0:
+            stale = AIClauseCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+            AIClauseCacheEntry.objects.filter(pk__in=list(stale)).delete()
+
+    def clear(self):
+        AIClauseCacheEntry.objects.all().delete()
+
+
+class ClauseCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            logger.warning("AI clause cache lookup failed", exc_info=True)
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, model=''):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl, model=model)
+        except Exception:
+            logger.warning("AI clause cache store failed", exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': settings.AI_CLAUSE_CACHE_BACKEND,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def _build_backend():
+    backend = settings.AI_CLAUSE_CACHE_BACKEND
+    if backend == 'locmem':
+        return LocMemLRUBackend(settings.AI_CLAUSE_CACHE_MAX_ENTRIES)
+    if backend == 'django':
+        return DjangoCacheBackend(settings.AI_CLAUSE_CACHE_ALIAS)
+    if backend == 'db':
+        return DatabaseBackend(settings.AI_CLAUSE_CACHE_MAX_ENTRIES)
+    if backend == 'none':
+        return None
+    raise ValueError(f"Unknown AI_CLAUSE_CACHE_BACKEND: {backend}")
+
+
+_cache = None
+
+
+def get_cache() -> ClauseCache:
+    global _cache
+    if _cache is None:
+        _cache = ClauseCache(_build_backend(), settings.AI_CLAUSE_CACHE_TTL)
+    return _cache
@@ -0,0 +1,118 @@
+"""
+Shared OpenAI client used by clause generation and summaries.
+
+All AI calls go through `chat_completion` (or `stream_chat_completion`),
+which use one pooled httpx
+client with explicit timeouts, retries 429/5xx responses with exponential
+backoff and caps the number of in-flight calls per process. Point
+`OPENAI_BASE_URL` at `manage.py run_openai_stub` to exercise the AI paths
+offline.
+"""
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+from django.conf import settings
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class AIUnavailable(Exception):
+    """Raised when no AI call slot frees up within `AI_ACQUIRE_TIMEOUT`."""
+
+
+_client = None
+_client_lock = threading.Lock()
+_slots = None
+
+
+def get_client() -> OpenAI:
+    global _client, _slots
+    with _client_lock:
+        if _client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_MAX_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(settings.AI_READ_TIMEOUT, connect=settings.AI_CONNECT_TIMEOUT),
+            )
+            _client = OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                http_client=http_client,
+                max_retries=0,  # retries are handled below so the policy lives in one place
+            )
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENCY)
+        return _client
+
+
+def reset_client():
+    """Drop the shared client so the next call is made with the current settings."""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _is_retryable(error) -> bool:
+    return isinstance(error, openai.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _retry_delay(error, attempt) -> float:
+    retry_after = error.response.headers.get('retry-after') if error.response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), settings.AI_RETRY_MAX_DELAY)
+    except ValueError:
+        pass
+    delay = settings.AI_RETRY_BACKOFF * (2 ** attempt)
+    return min(delay + random.uniform(0, delay / 2), settings.AI_RETRY_MAX_DELAY)
+
+
+def _create(client, **kwargs):
+    attempt = 0
+    while True:
+        try:
+            return client.chat.completions.create(**kwargs)
+        except openai.APIStatusError as e:
+            if not _is_retryable(e) or attempt >= settings.AI_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"AI call failed with {e.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def chat_completion(**kwargs):
+    client = get_client()
+    if not _slots.acquire(timeout=settings.AI_ACQUIRE_TIMEOUT):
+        raise AIUnavailable("Too many AI requests in flight.")
+
+    try:
+        return _create(client, **kwargs)
+    finally:
+        _slots.release()
+
+
+def stream_chat_completion(**kwargs):
+    """
+    Like `chat_completion` with `stream=True`, yielding the text of each
+    delta as it arrives. Only opening the stream is retried; the call slot
+    is held until the stream is exhausted or the generator is closed.
+    """
+    client = get_client()
+    if not _slots.acquire(timeout=settings.AI_ACQUIRE_TIMEOUT):
+        raise AIUnavailable("Too many AI requests in flight.")
+
+    try:
+        with _create(client, stream=True, **kwargs) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    finally:
+        _slots.release()
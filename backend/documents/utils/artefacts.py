@@ -0,0 +1,115 @@
+"""
+Encrypted variants of a document, derived on demand.
+
+The encrypted HTML and PDF render the template with Fernet tokens in place
+of the metadata values. The long tokens make them the slowest renders of a
+document, and only summaries and the encrypted download read them, so they
+are not produced at generation time. The first reader renders them from the
+stored metadata and caches them in storage. With
+`ENCRYPTED_ARTEFACTS=background` they are rendered on a worker thread as
+soon as the document is committed instead.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+
+from documents.models import GeneratedDocument
+from documents.utils import pdf_pool, encryption, template_registry
+
+import logging
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='encrypted-artefacts')
+
+
+def encrypt_metadata(metadata: dict) -> dict:
+    return {k: encryption.encrypt_value(str(v)) for k, v in metadata.items()}
+
+
+def _file_stem(doc) -> str:
+    name = doc.name or f"{doc.document_type.capitalize()} Document"
+    return name.replace(" ", "_")
+
+
+def _read(field_file):
+    try:
+        with field_file.open('rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def store(instance, field: str, filename: str, content: bytes):
+    """
+    Cache `content` in `instance.<field>` unless another request stored it
+    first, in which case the other copy wins and ours is deleted.
+    """
+    field_file = getattr(instance, field)
+    name = field_file.storage.save(field_file.field.generate_filename(instance, filename), ContentFile(content))
+    current = field_file.name or ''
+
+    unchanged = Q(**{field: current}) if current else Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+    if type(instance)._default_manager.filter(unchanged, pk=instance.pk).update(**{field: name}):
+        setattr(instance, field, name)
+        return
+    field_file.storage.delete(name)
+    instance.refresh_from_db(fields=[field])
+
+
+def _render_html(doc):
+    template = template_registry.for_document(doc)
+    metadata = encrypt_metadata(doc.metadata or {})
+    return template, metadata, template_registry.render(template, metadata)
+
+
+def encrypted_html(doc) -> str:
+    """The encrypted HTML of `doc`, rendered and cached on first use."""
+    if doc.encrypted_html:
+        cached = _read(doc.encrypted_html)
+        if cached is not None:
+            return cached.decode('utf-8')
+
+    _, _, html = _render_html(doc)
+    store(doc, 'encrypted_html', f"{_file_stem(doc)}_encrypted.html", html.encode('utf-8'))
+    return html
+
+
+def encrypted_pdf(doc) -> bytes:
+    """
+    The encrypted PDF of `doc`, rendered and cached on first use. The HTML
+    it was rendered from is cached too if it wasn't already.
+    """
+    if doc.encrypted_pdf:
+        cached = _read(doc.encrypted_pdf)
+        if cached is not None:
+            return cached
+
+    template, metadata, html = _render_html(doc)
+    pdf, = pdf_pool.render_pdfs(template_registry.render_job(template, metadata, html))
+
+    stem = _file_stem(doc)
+    store(doc, 'encrypted_pdf', f"{stem}_encrypted.pdf", pdf)
+    if not doc.encrypted_html:
+        store(doc, 'encrypted_html', f"{stem}_encrypted.html", html.encode('utf-8'))
+    return pdf
+
+
+def _render_in_background(pk: int):
+    try:
+        doc = GeneratedDocument.objects.filter(pk=pk).first()
+        if doc is not None and not doc.encrypted_pdf:
+            encrypted_pdf(doc)
+            logger.info(f"Encrypted artefacts rendered for document {pk}")
+    except Exception as e:
+        logger.error(f"[EncryptedArtefacts] Document {pk}: {str(e)}", exc_info=True)
+    finally:
+        connection.close()
+
+
+def schedule(doc):
+    """Queue the encrypted renders of a new document when `ENCRYPTED_ARTEFACTS` is 'background'."""
+    if settings.ENCRYPTED_ARTEFACTS == 'background':
+        transaction.on_commit(lambda: _executor.submit(_render_in_background, doc.pk))
@@ -0,0 +1,386 @@
+"""
+Microbenchmarks for the generation and signing hot paths, run with
+`manage.py benchmark`.
+
+Everything runs offline against a throwaway test database: the OpenAI stub
+answers on a local port, email goes to the locmem backend, PDFs render
+inline and media is written to a temporary directory. Each case is timed
+over a few iterations after a warm-up. For each case we record wall time,
+the number of SQL queries per iteration and the peak RSS of the process
+while the case ran.
+
+Results can be saved as a JSON baseline. A later run can be compared
+against it, and cases that got slower (or use more memory) by more than a
+threshold, or that make more queries, are reported as regressions.
+"""
+from collections import namedtuple
+from http.server import ThreadingHTTPServer
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+import logging
+logger = logging.getLogger(__name__)
+
+# `number` calls of `run` make up one timed iteration; times and queries are reported per call.
+Case = namedtuple('Case', ['name', 'run', 'setup', 'number'], defaults=[None, 1])
+
+MICRO_NUMBER = 1000  # for cases that take microseconds, which a single call can't time reliably
+
+DEFAULT_SIZES = (10, 10_000, 100_000)
+SAMPLE_METADATA = {
+    'nda': {'recipient_name': 'Jane Roe', 'start_date': '2025-01-01', 'end_date': '2026-01-01'},
+    'offer': {'recipient_name': 'Jane Roe', 'start_date': '2025-02-01', 'role': 'Software Engineer', 'salary': '85000'},
+    'invoice': {
+        'recipient_name': 'Jane Roe', 'due_date': '2025-03-31', 'item': 'Consulting',
+        'description': 'Consulting services for March', 'amount': '12000',
+    },
+}
+SAMPLE_CLAUSE = (
+    "<p><strong>Confidentiality.</strong> The Receiving Party shall hold all Confidential Information "
+    "in strict confidence and shall not disclose it to any third party without prior written consent.</p>"
+)
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class _PeakRSS:
+    """Samples the resident set size on a background thread while the block runs."""
+    INTERVAL = 0.002
+
+    def __enter__(self):
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.INTERVAL):
+            self.peak = max(self.peak, _current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def _current_rss() -> int:
+    """Resident set size in bytes; the lifetime peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def measure(case: Case, repeat: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        case.run(case.setup() if case.setup else None)
+
+    times, queries = [], []
+    with _PeakRSS() as rss:
+        for _ in range(repeat):
+            argument = case.setup() if case.setup else None
+            counter = _QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                for _ in range(case.number):
+                    case.run(argument)
+                times.append((time.perf_counter() - start) * 1000 / case.number)
+            queries.append(counter.count / case.number)
+
+    times.sort()
+    return {
+        'iterations': repeat,
+        'number': case.number,
+        'wall_ms': {
+            'min': round(times[0], 4),
+            'median': round(statistics.median(times), 4),
+            'mean': round(statistics.fmean(times), 4),
+            'p95': round(times[min(len(times) - 1, int(len(times) * 0.95))], 4),
+        },
+        'queries': round(statistics.median(queries), 2),
+        'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+    }
+
+
+def _expect(response, status_code):
+    if response.status_code != status_code:
+        raise BenchmarkError(f"{response.request['PATH_INFO']} answered {response.status_code}: {response.content[:200]!r}")
+    return response
+
+
+# Cases
+
+def render_cases():
+    from documents.utils import template_registry
+
+    def case(document_type):
+        template = template_registry.active(document_type)
+        context = {**SAMPLE_METADATA[document_type], 'issuer': 'John Doe', 'ai_clause_details': SAMPLE_CLAUSE}
+        return Case(f"render_html.{document_type}", lambda _: template_registry.render(template, context), number=MICRO_NUMBER)
+
+    return [case(document_type) for document_type in SAMPLE_METADATA]
+
+
+def pdf_cases(engines):
+    from documents.utils import generate_pdf, template_registry
+
+    cases = []
+    for engine_name in engines:
+        engine = import_string(generate_pdf.PDF_ENGINES[engine_name])()
+        for document_type, metadata in SAMPLE_METADATA.items():
+            template = template_registry.active(document_type)
+            context = {**metadata, 'issuer': 'John Doe', 'ai_clause_details': SAMPLE_CLAUSE}
+            job = template_registry.render_job(template, context)
+            cases.append(Case(f"generate_pdf.{engine_name}.{document_type}", lambda _, engine=engine, job=job: engine.render(*job)))
+    return cases
+
+
+def crypto_cases():
+    from documents.utils import artefacts, encryption, envelope
+
+    metadata = {**SAMPLE_METADATA['offer'], 'issuer': 'John Doe', 'ai_clause_details': SAMPLE_CLAUSE}
+    blob = envelope.encrypt_json(metadata)
+    encrypted = artefacts.encrypt_metadata(metadata)
+    return [
+        # GeneratedDocument.metadata is stored as one AES-GCM envelope
+        Case('envelope.encrypt_metadata', lambda _: envelope.encrypt_json(metadata), number=MICRO_NUMBER),
+        Case('envelope.decrypt_metadata', lambda _: envelope.decrypt_json(blob), number=MICRO_NUMBER),
+        # the encrypted artefacts render each value as a Fernet token
+        Case('fernet.encrypt_artefact_values', lambda _: artefacts.encrypt_metadata(metadata), number=MICRO_NUMBER),
+        Case('fernet.decrypt_artefact_values', lambda _: {k: encryption.decrypt_value(v) for k, v in encrypted.items()}, number=MICRO_NUMBER),
+    ]
+
+
+def _payload(document_type, index=0):
+    return {
+        'template_type': document_type,
+        'prompt': f"Add a confidentiality clause ({index})",
+        'metadata': SAMPLE_METADATA[document_type],
+        'signer_username': 'bench-signer',
+        'signer_email': 'bench-signer@example.com',
+        'signer_first_name': 'Bench',
+        'signer_last_name': 'Signer',
+        'name': f"Benchmark {document_type}",
+        'fresh_clause': True,  # every iteration goes to the (stub) model
+    }
+
+
+def api_cases(owner_client, signer_client, owner):
+    from documents.models import GeneratedDocument
+    from documents.utils import pipeline
+
+    counter = iter(range(1, 1_000_000))
+
+    def generate(_):
+        _expect(owner_client.post('/documents/v1/generate/', _payload('nda', next(counter)), format='json'), 201)
+
+    def new_document():
+        return pipeline.generate_document(owner, _payload('nda', next(counter))).pk
+
+    def sign(pk):
+        _expect(signer_client.post(f'/signature/v1/sign/{pk}/'), 201)
+
+    def status_of_signed():
+        return GeneratedDocument.objects.filter(owner=owner, is_signed=True).values_list('pk', flat=True).first()
+
+    return [
+        Case('api.generate', generate),
+        Case('api.sign', sign, new_document),
+        Case('api.signed_status', lambda pk: _expect(signer_client.get(f'/signature/v1/status/{pk}/'), 200), status_of_signed),
+    ]
+
+
+def seed_documents(owner, signer, size: int, batch_size: int = 5000):
+    """Add bare documents until `owner` has `size` of them, all waiting on `signer`."""
+    from documents.models import GeneratedDocument
+
+    missing = size - GeneratedDocument.objects.filter(owner=owner).count()
+    types = list(SAMPLE_METADATA)
+    now = timezone.now()
+    while missing > 0:
+        batch = min(batch_size, missing)
+        GeneratedDocument.objects.bulk_create([
+            GeneratedDocument(
+                owner=owner,
+                signer=signer,
+                document_type=types[i % len(types)],
+                name=f"Seeded document {i}",
+                plain_pdf='seed/document.pdf',
+                created_at=now,
+            )
+            for i in range(batch)
+        ])
+        missing -= batch
+
+
+def list_cases(owner_client, signer_client, size):
+    return [
+        Case(f"api.list_documents[{size}]", lambda _: _expect(owner_client.get('/documents/v1/list/'), 200)),
+        Case(f"api.signer_inbox[{size}]", lambda _: _expect(signer_client.get('/documents/v1/inbox/?status=all'), 200)),
+    ]
+
+
+# Running
+
+def _start_openai_stub():
+    from documents.utils import openai_stub
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), openai_stub.make_handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _selected(name, only):
+    return not only or any(pattern in name for pattern in only)
+
+
+def run(only=(), sizes=DEFAULT_SIZES, repeat=5, warmup=1, engines=None, report=print) -> dict:
+    """Run every case whose name contains one of `only` (all when empty) and return the results."""
+    from rest_framework.test import APIClient
+    from documents.utils import ai_client, generate_pdf
+    from users.authentication import VersionedAccessToken
+    from users.models import User
+
+    engines = engines or list(generate_pdf.PDF_ENGINES)
+    media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+    stub = _start_openai_stub()
+    overrides = override_settings(
+        MEDIA_ROOT=media_root,
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub.server_port}/v1",
+        OPENAI_API_KEY='benchmark',
+        EMAIL_OUTBOX_EAGER=True,
+        DOCUMENT_JOBS_EAGER=True,
+        PDF_RENDERER_ADDRESS='',
+        PDF_RENDERER_POOL_SIZE=0,
+        SUMMARY_PRECOMPUTE='off',
+        ENCRYPTED_ARTEFACTS='lazy',
+    )
+
+    setup_test_environment()  # locmem email backend, 'testserver' allowed
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    overrides.enable()
+    ai_client.reset_client()
+    results = {}
+    try:
+        owner = User.objects.create_user(
+            username='bench-owner', email='bench-owner@example.com', password='benchmark', first_name='John', last_name='Doe',
+        )
+        signer = User.objects.create_user(
+            username='bench-signer', email='bench-signer@example.com', password='benchmark', first_name='Bench', last_name='Signer',
+        )
+        owner_client, signer_client = APIClient(), APIClient()
+        owner_client.credentials(HTTP_AUTHORIZATION=f"Bearer {VersionedAccessToken.for_user(owner)}")
+        signer_client.credentials(HTTP_AUTHORIZATION=f"Bearer {VersionedAccessToken.for_user(signer)}")
+
+        groups = [
+            lambda: render_cases(),
+            lambda: pdf_cases(engines),
+            lambda: crypto_cases(),
+            lambda: api_cases(owner_client, signer_client, owner),
+        ]
+        for size in sorted(sizes):
+            groups.append(lambda size=size: (seed_documents(owner, signer, size), list_cases(owner_client, signer_client, size))[1])
+
+        for group in groups:
+            cases = group()
+            for case in cases:
+                if not _selected(case.name, only):
+                    continue
+                results[case.name] = measure(case, repeat, warmup)
+                report(case.name, results[case.name])
+    finally:
+        overrides.disable()
+        ai_client.reset_client()
+        stub.shutdown()
+        stub.server_close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'pdf_engines': engines,
+            'repeat': repeat,
+            'warmup': warmup,
+            'sizes': sorted(sizes),
+        },
+        'results': results,
+    }
+
+
+def save(results: dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: dict, baseline: dict, threshold: float, only=()) -> list:
+    """
+    Compare two result sets case by case. Returns (name, status, details)
+    rows, status being 'ok', 'regression', 'new' or 'missing'. Wall time
+    and peak RSS regress when they grow by more than `threshold`
+    (a fraction); query counts regress on any increase. Time is compared on
+    the fastest iteration, which other load on the machine disturbs least.
+    Baseline cases left out by `only` aren't reported missing.
+    """
+    rows = []
+    current_results, baseline_results = current['results'], baseline['results']
+    for name, result in current_results.items():
+        base = baseline_results.get(name)
+        if base is None:
+            rows.append((name, 'new', {}))
+            continue
+
+        details = {
+            'wall_ms': (base['wall_ms']['min'], result['wall_ms']['min']),
+            'queries': (base['queries'], result['queries']),
+            'peak_rss_mb': (base['peak_rss_mb'], result['peak_rss_mb']),
+        }
+        regressed = (
+            result['wall_ms']['min'] > base['wall_ms']['min'] * (1 + threshold)
+            or result['queries'] > base['queries']
+            or result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold)
+        )
+        rows.append((name, 'regression' if regressed else 'ok', details))
+
+    for name in baseline_results:
+        if name not in current_results and _selected(name, only):
+            rows.append((name, 'missing', {}))
+    return rows
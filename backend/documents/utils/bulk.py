@@ -0,0 +1,252 @@
+"""
+Bulk document generation.
+
+`generate_bulk` validates every row, provisions all signers in batches,
+asks the AI once per distinct (template, prompt) unless a row names a
+streamed clause draft, renders each chunk's PDFs in parallel through the
+renderer pool and yields one event per row so the view can stream progress
+as NDJSON. The stream always ends with a 'summary' event, preceded by an
+'error' event if the run stopped early.
+
+Rows sharing a template and prompt share one clause, generated from the
+metadata those rows have in common; values that differ per row (names,
+amounts) are in the document itself, not in the clause.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import json
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from users.models import User
+from users.utils import blind_index, search_index
+from documents.serializers import DocumentCreateSerializer
+from documents.utils import pdf_pool, pipeline
+
+import logging
+logger = logging.getLogger(__name__)
+
+ROW_FIELDS = set(DocumentCreateSerializer().fields) - {'metadata'}
+
+
+class BulkInputError(ValueError):
+    pass
+
+
+def _merge(defaults: dict, row: dict) -> dict:
+    merged = {**defaults, **row}
+    merged['metadata'] = {**defaults.get('metadata', {}), **row.get('metadata', {})}
+    return merged
+
+
+def _csv_rows(text: str) -> list:
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        row = {'metadata': {}}
+        for column, value in record.items():
+            if column is None or value in (None, ''):
+                continue
+            column = column.strip()
+            if column in ROW_FIELDS:
+                row[column] = value
+            else:
+                row['metadata'][column.removeprefix('metadata.')] = value
+        rows.append(row)
+    return rows
+
+
+def rows_from_request(request) -> list:
+    """
+    Accept a JSON array of rows, a JSON object with shared fields plus a
+    `rows` array, or CSV (a `text/csv` body or a multipart `file`). For CSV,
+    shared fields come from the query string or form fields and every column
+    that isn't a document field becomes metadata.
+    """
+    if request.content_type.startswith('text/csv'):
+        defaults = request.query_params.dict()
+        rows = _csv_rows(request.body.decode('utf-8-sig'))
+    elif 'file' in request.FILES:
+        defaults = {k: v for k, v in request.data.items() if k != 'file'}
+        defaults.update(request.query_params.dict())
+        rows = _csv_rows(request.FILES['file'].read().decode('utf-8-sig'))
+    elif isinstance(request.data, list):
+        defaults, rows = {}, request.data
+    elif isinstance(request.data, dict) and isinstance(request.data.get('rows'), list):
+        defaults = {k: v for k, v in request.data.items() if k != 'rows'}
+        rows = request.data['rows']
+    else:
+        raise BulkInputError("Expected a JSON array of rows, an object with 'rows', or CSV.")
+
+    if isinstance(defaults.get('metadata'), str):
+        try:
+            defaults['metadata'] = json.loads(defaults['metadata'])
+        except json.JSONDecodeError:
+            raise BulkInputError("'metadata' must be a JSON object.")
+    if not rows:
+        raise BulkInputError("No rows to generate.")
+    if len(rows) > settings.BULK_GENERATION_MAX_ROWS:
+        raise BulkInputError(f"At most {settings.BULK_GENERATION_MAX_ROWS} rows can be generated at once.")
+    if not all(isinstance(row, dict) for row in rows):
+        raise BulkInputError("Every row must be an object.")
+    return [_merge(defaults, row) for row in rows]
+
+
+def _chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def provision_signers(rows: list) -> dict:
+    """Fetch or create every signer referenced by `rows`, a batch at a time."""
+    by_username = {}
+    for data in rows:
+        by_username.setdefault(data['signer_username'], data)
+
+    signers = {}
+    for batch in _chunked(list(by_username), settings.BULK_SIGNER_BATCH_SIZE):
+        found = {user.username: user for user in User.objects.filter(username__in=batch)}
+
+        # Unknown usernames may still belong to an existing account with the same email.
+        wanted = {
+            blind_index.email_index(by_username[username]['signer_email']): username
+            for username in batch if username not in found
+        }
+        for user in User.objects.filter(email_index__in=list(wanted)):
+            found.setdefault(wanted[user.email_index], user)
+
+        missing = [
+            User(username=username, **pipeline.signer_defaults(by_username[username]))
+            for username in batch if username not in found
+        ]
+        if missing:
+            # ignore_conflicts covers signers created concurrently by another request.
+            User.objects.bulk_create(missing, ignore_conflicts=True)
+            provisioned = list(User.objects.filter(username__in=[u.username for u in missing]))
+            search_index.index_users(provisioned)  # bulk_create bypasses User.save()
+            found.update({user.username: user for user in provisioned})
+            logger.info(f"Bulk provisioned {len(missing)} signer(s)")
+        signers.update(found)
+    return signers
+
+
+def _clause_key(data):
+    return (data['template_type'], data['prompt'], data.get('clause_id'))
+
+
+def clause_requests(valid: list) -> dict:
+    """One payload per clause key, carrying only the metadata every row with that key shares."""
+    requests = {}
+    for _, data in valid:
+        key = _clause_key(data)
+        if key not in requests:
+            requests[key] = {**data, 'metadata': dict(data['metadata'])}
+            continue
+        shared = requests[key]['metadata']
+        for field in [field for field, value in shared.items() if data['metadata'].get(field) != value]:
+            del shared[field]
+    return requests
+
+
+def _resolve_clause(owner, data):
+    try:
+        return pipeline.resolve_clause(owner, data, pipeline.base_metadata(owner, data))
+    finally:
+        connection.close()
+
+
+def _resolve_clauses(owner, chunk, clauses, requests):
+    pending = {}
+    for _, data in chunk:
+        key = _clause_key(data)
+        if key not in clauses and key not in pending:
+            pending[key] = requests[key]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=settings.AI_MAX_CONCURRENCY) as executor:
+        for key, result in zip(pending, executor.map(lambda d: _resolve_clause(owner, d), pending.values())):
+            clauses[key] = result
+
+
+def _render_pdfs(jobs: list) -> list:
+    """Render a chunk's PDFs, waiting and retrying while the renderer pool is full."""
+    for attempt in range(settings.BULK_RENDER_BUSY_RETRIES + 1):
+        try:
+            return pdf_pool.render_pdfs(*jobs)
+        except pdf_pool.RendererBusy:
+            if attempt == settings.BULK_RENDER_BUSY_RETRIES:
+                raise
+            delay = settings.BULK_RENDER_BUSY_BACKOFF * (2 ** attempt)
+            logger.warning(f"[BulkGenerate] PDF renderer busy, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def generate_bulk(owner, rows: list):
+    total = len(rows)
+    counts = {'created': 0, 'failed': 0}
+    yield {'type': 'start', 'total': total}
+    try:
+        yield from _generate(owner, rows, counts)
+    except Exception as e:
+        logger.error(f"[BulkGenerate] Stopped early: {str(e)}", exc_info=True)
+        yield {'type': 'error', 'error': 'Bulk generation stopped early.', 'done': counts['created'] + counts['failed']}
+
+    logger.info(f"Bulk generation by {owner.username}: {counts['created']} created, {counts['failed']} failed")
+    yield {'type': 'summary', 'total': total, **counts}
+
+
+def _generate(owner, rows: list, counts: dict):
+    total = len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = DocumentCreateSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            counts['failed'] += 1
+            yield {'type': 'row', 'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+    signers = provision_signers([data for _, data in valid])
+    requests = clause_requests(valid)
+    clauses = {}
+
+    for chunk in _chunked(valid, settings.BULK_GENERATION_CHUNK_SIZE):
+        _resolve_clauses(owner, chunk, clauses, requests)
+
+        rendered = []
+        for index, data in chunk:
+            try:
+                clause, source = clauses[_clause_key(data)]
+                metadata = {**pipeline.base_metadata(owner, data), 'ai_clause_details': clause}
+                rendered.append((index, data, pipeline.render_document(data, metadata), source))
+            except Exception as e:
+                counts['failed'] += 1
+                logger.error(f"[BulkGenerate] Row {index} failed to render: {str(e)}", exc_info=True)
+                yield {'type': 'row', 'index': index, 'status': 'error', 'error': 'Failed to render document.'}
+
+        try:
+            jobs = [pipeline.render_job(item) for _, _, item, _ in rendered]
+            pdfs = _render_pdfs(jobs) if jobs else []
+        except Exception as e:
+            logger.error(f"[BulkGenerate] PDF rendering failed for a chunk: {str(e)}", exc_info=True)
+            error = 'The server is busy, please try again shortly.' if isinstance(e, pdf_pool.RendererBusy) else 'Failed to render PDF.'
+            for index, _, _, _ in rendered:
+                counts['failed'] += 1
+                yield {'type': 'row', 'index': index, 'status': 'error', 'error': error}
+            rendered = []
+
+        for position, (index, data, item, source) in enumerate(rendered):
+            try:
+                doc = pipeline.store_document(
+                    owner, signers[data['signer_username']], data, item, source, pdfs[position],
+                )
+                counts['created'] += 1
+                yield {'type': 'row', 'index': index, 'status': 'created', 'document_id': doc.id, 'clause_source': source}
+            except Exception as e:
+                counts['failed'] += 1
+                logger.error(f"[BulkGenerate] Row {index} failed to store: {str(e)}", exc_info=True)
+                yield {'type': 'row', 'index': index, 'status': 'error', 'error': 'Failed to store document.'}
+
+        yield {'type': 'progress', 'done': counts['created'] + counts['failed'], 'total': total}
@@ -0,0 +1,40 @@
+"""
+Clauses streamed ahead of generation.
+
+`documents/v1/clause/stream/` stores each finished clause as a
+`ClauseDraft` and returns its id. A generate call that passes it back as
+`clause_id` uses that clause instead of asking the model again, so users can
+iterate on the prompt before paying for rendering. Drafts are only valid for
+`CLAUSE_DRAFT_TTL` seconds.
+"""
+from datetime import timedelta
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from documents.models import ClauseDraft
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=settings.CLAUSE_DRAFT_TTL)
+
+
+def save(owner, template_type: str, clause: str, source: str) -> ClauseDraft:
+    # Expired drafts are cleared out as the owner streams new ones.
+    ClauseDraft.objects.filter(owner=owner, created_at__lt=_cutoff()).delete()
+    return ClauseDraft.objects.create(owner=owner, template_type=template_type, clause=clause, source=source)
+
+
+def find(owner, clause_id, template_type: str):
+    """The owner's unexpired draft `clause_id` for `template_type`, or None."""
+    try:
+        clause_id = uuid.UUID(str(clause_id))
+    except ValueError:
+        return None
+    return ClauseDraft.objects.filter(
+        pk=clause_id,
+        owner=owner,
+        template_type=template_type,
+        created_at__gte=_cutoff(),
+    ).first()
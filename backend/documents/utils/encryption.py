@@ -1,7 +1,68 @@
-from cryptography.fernet import Fernet
+"""
+Fernet encryption shared by every app.
+
+`FERNET_KEY` encrypts; it and every key in `FERNET_OLD_KEYS` can decrypt, so
+a key can be rotated by making it the primary key, moving the old one to
+`FERNET_OLD_KEYS` and running `manage.py rotate_keys`.
+"""
+import re
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from django.conf import settings
 
-fernet = Fernet(settings.FERNET_KEY.encode())
+# Fernet tokens as they appear inside the rendered encrypted HTML.
+TOKEN_RE = re.compile(r'gAAAAA[A-Za-z0-9_\-]+=*')
+
+_fernet = None
+_primary = None
+
+
+def _load():
+    global _fernet, _primary
+    if _fernet is None:
+        keys = [settings.FERNET_KEY, *settings.FERNET_OLD_KEYS]
+        fernets = [Fernet(key.encode()) for key in keys if key]
+        _primary = fernets[0]
+        _fernet = MultiFernet(fernets)
+    return _fernet
+
+
+def reset():
+    """Forget the loaded keys, e.g. after the key settings changed."""
+    global _fernet, _primary
+    _fernet = _primary = None
+
 
 def encrypt_value(value: str) -> str:
-    return fernet.encrypt(value.encode()).decode()
\ No newline at end of file
+    return _load().encrypt(value.encode()).decode()
+
+
+def decrypt_value(value: str) -> str:
+    return _load().decrypt(value.encode()).decode()
+
+
+def is_current(token: str) -> bool:
+    """True if `token` is already encrypted under the primary key."""
+    _load()
+    try:
+        _primary.decrypt(token.encode())
+        return True
+    except InvalidToken:
+        return False
+
+
+def rotate_value(token: str) -> str:
+    """Re-encrypt `token` under the primary key. Raises `InvalidToken` if no key can decrypt it."""
+    if is_current(token):
+        return token
+    return _load().rotate(token.encode()).decode()
+
+
+def rotate_text(text: str) -> str:
+    """Re-encrypt every Fernet token embedded in `text`, leaving anything undecryptable as it is."""
+    def replace(match):
+        try:
+            return rotate_value(match.group(0))
+        except InvalidToken:
+            return match.group(0)
+    return TOKEN_RE.sub(replace, text)
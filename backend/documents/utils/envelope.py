@@ -0,0 +1,118 @@
+"""
+Envelope encryption for document metadata.
+
+Each value is encrypted once with AES-256-GCM under its own random data key.
+The data key is stored alongside the ciphertext, wrapped (AES-GCM again) by
+the master key. A blob is laid out as
+
+    version (1) | master key id (4) | wrap nonce (12) | wrapped data key (48)
+    | nonce (12) | ciphertext + tag
+
+The master key id is a fingerprint of the master key, so blobs written
+under an older master key are decrypted with that key until
+`manage.py rotate_keys` re-encrypts them.
+"""
+import hashlib
+import hmac
+import json
+import os
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from django.conf import settings
+
+VERSION = b'\x01'
+KEY_ID_SIZE = 4
+NONCE_SIZE = 12
+WRAPPED_KEY_SIZE = 32 + 16
+HEADER_SIZE = 1 + KEY_ID_SIZE + NONCE_SIZE + WRAPPED_KEY_SIZE
+
+
+class EnvelopeError(ValueError):
+    pass
+
+
+def _derive(secret: str) -> bytes:
+    return hmac.new(secret.encode(), b'metadata-master-key', hashlib.sha256).digest()
+
+
+def key_id(master_key: bytes) -> bytes:
+    return hashlib.sha256(b'key-id:' + master_key).digest()[:KEY_ID_SIZE]
+
+
+def _master_keys() -> list:
+    """
+    Every usable master key, the current one first. Without
+    `METADATA_MASTER_KEY` the master keys are derived from the Fernet keys,
+    so they rotate along with `FERNET_KEY`.
+    """
+    explicit = [settings.METADATA_MASTER_KEY, *settings.METADATA_OLD_MASTER_KEYS]
+    derived = [settings.FERNET_KEY, *settings.FERNET_OLD_KEYS]
+    keys = [hashlib.sha256(key.encode()).digest() for key in explicit if key]
+    keys += [_derive(key) for key in derived if key]
+    return keys
+
+
+def _master_key() -> bytes:
+    return _master_keys()[0]
+
+
+def _master_key_for(kid: bytes) -> bytes:
+    for master_key in _master_keys():
+        if key_id(master_key) == kid:
+            return master_key
+    raise EnvelopeError("Value was encrypted under an unknown master key.")
+
+
+def encrypt(plaintext: bytes) -> bytes:
+    master_key = _master_key()
+    kid = key_id(master_key)
+    data_key = AESGCM.generate_key(bit_length=256)
+
+    wrap_nonce = os.urandom(NONCE_SIZE)
+    wrapped_key = AESGCM(master_key).encrypt(wrap_nonce, data_key, VERSION + kid)
+
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = AESGCM(data_key).encrypt(nonce, plaintext, VERSION + kid)
+    return VERSION + kid + wrap_nonce + wrapped_key + nonce + ciphertext
+
+
+def decrypt(blob: bytes) -> bytes:
+    if len(blob) < HEADER_SIZE + NONCE_SIZE or blob[:1] != VERSION:
+        raise EnvelopeError("Not an envelope-encrypted value.")
+
+    kid = blob[1:1 + KEY_ID_SIZE]
+    master_key = _master_key_for(kid)
+
+    offset = 1 + KEY_ID_SIZE
+    wrap_nonce = blob[offset:offset + NONCE_SIZE]
+    wrapped_key = blob[offset + NONCE_SIZE:HEADER_SIZE]
+    nonce = blob[HEADER_SIZE:HEADER_SIZE + NONCE_SIZE]
+    ciphertext = blob[HEADER_SIZE + NONCE_SIZE:]
+    try:
+        data_key = AESGCM(master_key).decrypt(wrap_nonce, wrapped_key, VERSION + kid)
+        return AESGCM(data_key).decrypt(nonce, ciphertext, VERSION + kid)
+    except Exception as e:
+        raise EnvelopeError(f"Could not decrypt value: {e}") from e
+
+
+def current_key_id() -> bytes:
+    return key_id(_master_key())
+
+
+def is_current(blob: bytes) -> bool:
+    return blob[1:1 + KEY_ID_SIZE] == current_key_id()
+
+
+def rotate(blob: bytes) -> bytes:
+    """Re-encrypt `blob` under the current master key (with a fresh data key)."""
+    if is_current(blob):
+        return blob
+    return encrypt(decrypt(blob))
+
+
+def encrypt_json(value) -> bytes:
+    return encrypt(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def decrypt_json(blob: bytes):
+    return json.loads(decrypt(blob))
@@ -1,10 +1,48 @@
+from collections import namedtuple
+import io
+
+from django.conf import settings
+from django.utils.module_loading import import_string
 from xhtml2pdf import pisa
-import tempfile
 
-def generate_pdf_from_html(html_content: str) -> bytes:
-    output = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    with open(output.name, "wb") as pdf_file:
-        pisa.CreatePDF(html_content, dest=pdf_file)
+PDF_ENGINES = {
+    'xhtml2pdf': 'documents.utils.generate_pdf.XHTML2PDFEngine',
+    'reportlab': 'documents.utils.reportlab_engine.ReportLabEngine',
+}
+
+# A single render request. `template_name`, `context` and `template_version`
+# are optional hints that let engines which don't parse HTML build the
+# document themselves.
+RenderJob = namedtuple('RenderJob', ['html', 'template_name', 'context', 'template_version'], defaults=[None, None, None])
+
+
+class PDFRenderError(Exception):
+    pass
+
+
+class PDFEngine:
+    def render(self, html: str, template_name=None, context=None, template_version=None) -> bytes:
+        raise NotImplementedError
+
+
+class XHTML2PDFEngine(PDFEngine):
+    def render(self, html, template_name=None, context=None, template_version=None):
+        buffer = io.BytesIO()
+        result = pisa.CreatePDF(html, dest=buffer)
+        if result.err:
+            raise PDFRenderError(f"xhtml2pdf reported {result.err} error(s) while rendering.")
+        return buffer.getvalue()
+
+
+_engine = None
+
+
+def get_engine() -> PDFEngine:
+    global _engine
+    if _engine is None:
+        _engine = import_string(PDF_ENGINES.get(settings.PDF_ENGINE, settings.PDF_ENGINE))()
+    return _engine
+
 
-    with open(output.name, "rb") as f:
-        return f.read()
\ No newline at end of file
+def generate_pdf_from_html(html_content: str, template_name=None, context=None, template_version=None) -> bytes:
+    return get_engine().render(html_content, template_name=template_name, context=context, template_version=template_version)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from documents.models import GenerationJob
+from documents.utils import pipeline
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def enqueue_generation(owner, data: dict) -> GenerationJob:
+    """
+    Persist a generation request as a pending job. The job is picked up by
+    `manage.py run_generation_worker`, or run inline when
+    `DOCUMENT_JOBS_EAGER` is enabled (useful for local development).
+    """
+    job = GenerationJob.objects.create(owner=owner, payload=data)
+    logger.info(f"Generation job {job.id} queued by {owner.username}")
+
+    if settings.DOCUMENT_JOBS_EAGER and claim_job(job.id):
+        job.refresh_from_db()
+        run_job(job)
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Hand jobs whose worker died mid-run back to the queue, or fail them once
+    they have used up their attempts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_TIMEOUT)
+    stale = GenerationJob.objects.filter(status='running', started_at__lt=cutoff)
+
+    failed = stale.filter(attempts__gte=settings.GENERATION_JOB_MAX_ATTEMPTS).update(
+        status='failed', error='Job timed out.', finished_at=timezone.now()
+    )
+    requeued = stale.update(status='pending')
+    if failed or requeued:
+        logger.warning(f"Stale generation jobs: {requeued} requeued, {failed} failed")
+    return requeued
+
+
+def claim_job(job_id) -> bool:
+    # Conditional UPDATE so only one worker can move a job out of 'pending'.
+    return bool(GenerationJob.objects.filter(pk=job_id, status='pending').update(
+        status='running',
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    ))
+
+
+def claim_next_job():
+    pending = (
+        GenerationJob.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in pending:
+        if claim_job(job_id):
+            return GenerationJob.objects.select_related('owner').get(pk=job_id)
+    return None
+
+
+def run_job(job: GenerationJob) -> GenerationJob:
+    try:
+        doc = pipeline.generate_document(job.owner, job.payload, on_stage=job.mark_stage)
+    except Exception as e:
+        logger.error(f"[GenerationJob {job.id}] Failed at stage {job.stage}: {str(e)}", exc_info=True)
+        if job.stage in job.stages:
+            job.stages[job.stage].update(status='failed', finished_at=timezone.now().isoformat())
+        job.error = str(e)
+        if job.attempts < settings.GENERATION_JOB_MAX_ATTEMPTS:
+            job.status = 'pending'
+            delay = settings.GENERATION_JOB_RETRY_BACKOFF * (2 ** (job.attempts - 1))
+            job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'stages', 'error', 'next_attempt_at', 'finished_at', 'updated_at'])
+        return job
+
+    if job.stage in job.stages:
+        job.stages[job.stage].update(status='done', finished_at=timezone.now().isoformat())
+    job.document = doc
+    job.status = 'succeeded'
+    job.error = None
+    job.payload = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['document', 'status', 'stages', 'error', 'payload', 'finished_at', 'updated_at'])
+    logger.info(f"Generation job {job.id} finished: document {doc.id}")
+    return job
@@ -0,0 +1,194 @@
+"""
+Online re-encryption under the current keys, driven by `manage.py rotate_keys`.
+
+Each target is split into contiguous pk ranges that can be processed by
+separate processes. A range streams its rows in pk order, re-encrypts only
+what is not under the current key yet and records its position in a
+`KeyRotationCheckpoint` after every batch, so an interrupted run resumes
+where it stopped. Rows are updated one at a time in autocommit mode with a
+compare-and-swap on the old value: no long transactions, no locks held
+across a batch, and a row rewritten concurrently by the app is left alone.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError
+from django.db.models import Max, Min
+from cryptography.fernet import InvalidToken
+
+from documents.models import GeneratedDocument, KeyRotationCheckpoint
+from documents.utils import encryption, envelope
+from summary.models import DocumentSummary
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def current_key_id() -> str:
+    """Fingerprint of the keys rows are rotated to; a new key means a new run."""
+    material = b'key-rotation:' + settings.FERNET_KEY.encode() + envelope.current_key_id()
+    return hashlib.sha256(material).hexdigest()[:16]
+
+
+def _rotate_metadata(pk, blob) -> bool:
+    if blob is None or envelope.is_current(blob):
+        return False
+    rotated = envelope.rotate(blob)
+    return bool(GeneratedDocument.objects.filter(pk=pk, metadata=blob).update(metadata=rotated))
+
+
+def _rotate_html(pk, name) -> bool:
+    if not name or not default_storage.exists(name):
+        return False
+    with default_storage.open(name, 'rb') as f:
+        html = f.read().decode('utf-8')
+    rotated = encryption.rotate_text(html)
+    if rotated == html:
+        return False
+
+    # Write a new file and swap the reference, so readers never see a half-written file.
+    new_name = default_storage.save(name, ContentFile(rotated.encode('utf-8')))
+    if GeneratedDocument.objects.filter(pk=pk, encrypted_html=name).update(encrypted_html=new_name):
+        default_storage.delete(name)
+        return True
+    default_storage.delete(new_name)
+    return False
+
+
+def _rotate_json(value):
+    if isinstance(value, str):
+        try:
+            return encryption.rotate_value(value)
+        except InvalidToken:
+            return encryption.rotate_text(value)
+    if isinstance(value, list):
+        return [_rotate_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _rotate_json(item) for key, item in value.items()}
+    return value
+
+
+SUMMARY_FIELDS = ('terms', 'responsibilities', 'dates', 'signatures_required')
+
+
+def _rotate_summary(pk, *values, attempts=3) -> bool:
+    # Pending summaries are filled in later (see summary.utils.precompute), so
+    # the rotated values are only swapped in if nothing changed since they
+    # were read; otherwise the row is read again and retried.
+    for _ in range(attempts):
+        current = dict(zip(SUMMARY_FIELDS, values))
+        changes = {
+            field: rotated for field, value in current.items()
+            if (rotated := _rotate_json(value)) != value
+        }
+        if not changes:
+            return False
+        # None means SQL NULL here, which JSONField lookups only match via isnull.
+        unchanged = {
+            (f"{field}__isnull" if value is None else field): (True if value is None else value)
+            for field, value in current.items()
+        }
+        if DocumentSummary.objects.filter(pk=pk, **unchanged).update(**changes):
+            return True
+        values = DocumentSummary.objects.filter(pk=pk).values_list(*SUMMARY_FIELDS).first()
+        if values is None:
+            return False
+    logger.warning(f"[KeyRotation] Summary {pk} kept changing, left for the next run")
+    return False
+
+
+TARGETS = {
+    'metadata': (GeneratedDocument, ('id', 'metadata'), _rotate_metadata),
+    'html': (GeneratedDocument, ('id', 'encrypted_html'), _rotate_html),
+    'summaries': (DocumentSummary, ('id', *SUMMARY_FIELDS), _rotate_summary),
+}
+
+
+def plan(target: str, workers: int, restart: bool = False) -> list:
+    """
+    Return the unfinished checkpoints of `target` for the current keys,
+    splitting its pk range into `workers` shards on the first run.
+    """
+    key_id = current_key_id()
+    checkpoints = KeyRotationCheckpoint.objects.filter(target=target, key_id=key_id)
+    if restart:
+        checkpoints.delete()
+    if checkpoints.exists():
+        return list(checkpoints.filter(finished=False).order_by('start_pk'))
+
+    model = TARGETS[target][0]
+    bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+
+    low, high = bounds['low'], bounds['high']
+    size = -(-(high - low + 1) // workers)
+    shards = []
+    for start in range(low, high + 1, size):
+        shards.append(KeyRotationCheckpoint(
+            target=target,
+            key_id=key_id,
+            start_pk=start,
+            end_pk=min(start + size - 1, high),
+            last_pk=start - 1,
+        ))
+    return KeyRotationCheckpoint.objects.bulk_create(shards)
+
+
+def _rotate_with_retry(rotate_row, row, attempts=3) -> bool:
+    for attempt in range(attempts):
+        try:
+            return rotate_row(*row)
+        except DatabaseError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def run_shard(checkpoint_id: int, batch_size: int, rate: float = 0) -> tuple:
+    """
+    Rotate one pk range, resuming from its checkpoint. `rate` caps the rows
+    processed per second (0 = unthrottled). Returns (processed, rotated).
+
+    Values no current or old key can decrypt are logged and skipped. Any
+    other error stops the range with its checkpoint on the last row that
+    went through, so a rerun picks up from there.
+    """
+    checkpoint = KeyRotationCheckpoint.objects.get(pk=checkpoint_id)
+    model, fields, rotate_row = TARGETS[checkpoint.target]
+    rows = model.objects.filter(pk__lte=checkpoint.end_pk).order_by('pk').values_list(*fields)
+    update_fields = ['last_pk', 'processed', 'rotated', 'updated_at']
+
+    started = time.monotonic()
+    processed = 0
+    while True:
+        # One short keyset query per batch; no cursor stays open while rows are rewritten.
+        batch = list(rows.filter(pk__gt=checkpoint.last_pk)[:batch_size])
+        if not batch:
+            break
+
+        for row in batch:
+            try:
+                checkpoint.rotated += _rotate_with_retry(rotate_row, row)
+            except envelope.EnvelopeError as e:
+                logger.error(f"[KeyRotation] Skipping {checkpoint.target} row {row[0]}: {str(e)}")
+            except Exception:
+                checkpoint.save(update_fields=update_fields)
+                raise
+            checkpoint.last_pk = row[0]
+            checkpoint.processed += 1
+
+            processed += 1
+            if rate:
+                ahead = processed / rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        checkpoint.save(update_fields=update_fields)
+
+    checkpoint.finished = True
+    checkpoint.save(update_fields=['finished', 'updated_at'])
+    return checkpoint.processed, checkpoint.rotated
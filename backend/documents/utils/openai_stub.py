@@ -0,0 +1,123 @@
+"""
+Minimal OpenAI-compatible server for offline development and load tests.
+
+Implements `POST /v1/chat/completions` with canned answers: summaries get a
+JSON object in the shape `summarize_encrypted_html` expects, everything else
+gets a short markdown clause. Requests with `"stream": true` get the answer
+as server-sent `chat.completion.chunk` events, one word at a time. Latency,
+per-token delay and error rate are configurable so timeouts, retries and
+the concurrency cap can be exercised.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import time
+import uuid
+
+CLAUSE = (
+    "**Confidentiality.** The Receiving Party shall hold all Confidential Information "
+    "in strict confidence and shall not disclose it to any third party without prior written consent."
+)
+
+SUMMARY = {
+    "terms": "The parties agree to keep shared information confidential.",
+    "responsibilities": "The receiving party must not disclose confidential information.",
+    "dates": {"effective": "", "expiration": ""},
+    "signatures_required": {"recipient": ""},
+}
+
+
+def _answer(messages):
+    system = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+    if 'summar' in system.lower():
+        return json.dumps(SUMMARY)
+    return CLAUSE
+
+
+def make_handler(latency=0.0, jitter=0.0, error_rate=0.0, token_delay=0.0):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_stream(self, model, content):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')  # the body ends when the connection does
+            self.end_headers()
+            self.close_connection = True
+
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            def event(delta, finish_reason=None):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+
+            event({'role': 'assistant', 'content': ''})
+            for token in re.findall(r'\S+\s*', content):
+                time.sleep(token_delay)
+                event({'content': token})
+            event({}, 'stop')
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+                return
+
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+            if random.random() < error_rate:
+                status = random.choice([429, 500, 503])
+                self._send_json(status, {'error': {'message': 'Stub failure', 'type': 'server_error'}}, {'Retry-After': '0'})
+                return
+
+            content = _answer(body.get('messages', []))
+            if body.get('stream'):
+                self._send_stream(body.get('model', 'stub'), content)
+                return
+            self._send_json(200, {
+                'id': f"chatcmpl-{uuid.uuid4().hex}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+
+    return StubHandler
+
+
+def serve(host='127.0.0.1', port=8787, **options):
+    server = ThreadingHTTPServer((host, port), make_handler(**options))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,117 @@
+"""
+Persistent email outbox.
+
+Views call `queue_email`, which only writes an `OutboundEmail` row. The
+delivery worker (`manage.py run_email_worker`) sends pending mail in
+batches over a single backend connection, retries failures with
+exponential backoff and records the outcome on each row.
+"""
+from datetime import timedelta
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from documents.models import OutboundEmail
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject: str, body: str, to: list, attachment: str = None, document=None) -> OutboundEmail:
+    email = OutboundEmail.objects.create(
+        to=list(to),
+        subject=subject,
+        body=body,
+        attachment=attachment,
+        document=document,
+    )
+    if settings.EMAIL_OUTBOX_EAGER:
+        transaction.on_commit(deliver_pending)
+    return email
+
+
+def _claim_batch(batch_size: int) -> list:
+    candidates = (
+        OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    claimed = [
+        email_id for email_id in candidates
+        if OutboundEmail.objects.filter(pk=email_id, status='pending').update(
+            status='sending', attempts=F('attempts') + 1, locked_at=timezone.now()
+        )
+    ]
+    return list(OutboundEmail.objects.filter(pk__in=claimed).order_by('next_attempt_at'))
+
+
+def _build_message(email: OutboundEmail, connection) -> EmailMessage:
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=connection,
+    )
+    if email.attachment:
+        with default_storage.open(email.attachment, 'rb') as f:
+            message.attach(os.path.basename(email.attachment), f.read(), 'application/pdf')
+    return message
+
+
+def _record_failure(email: OutboundEmail, error: Exception):
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error(f"[Outbox] Giving up on email {email.id} after {email.attempts} attempt(s): {error}")
+    else:
+        email.status = 'pending'
+        delay = settings.EMAIL_OUTBOX_RETRY_BACKOFF * (2 ** (email.attempts - 1))
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"[Outbox] Email {email.id} failed, retrying in {delay}s: {error}")
+    email.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+
+
+def deliver_pending(batch_size: int = None) -> int:
+    """Send one batch of due emails over a single connection. Returns the number sent."""
+    batch = _claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0
+
+    sent = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            _record_failure(email, e)
+        return 0
+
+    try:
+        for email in batch:
+            try:
+                _build_message(email, connection).send()
+            except Exception as e:
+                _record_failure(email, e)
+                continue
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = None
+            email.save(update_fields=['status', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+
+    logger.info(f"[Outbox] Delivered {sent}/{len(batch)} email(s)")
+    return sent
+
+
+def requeue_stuck(older_than: int = 600) -> int:
+    """Return emails left in 'sending' by a crashed worker to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return OutboundEmail.objects.filter(status='sending', locked_at__lt=cutoff).update(status='pending')
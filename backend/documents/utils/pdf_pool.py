@@ -0,0 +1,312 @@
+"""
+Pool of long-lived PDF renderer processes.
+
+Renderer processes import xhtml2pdf/reportlab and render the stylesheet of
+every active template once at start-up, so requests only pay for the
+document itself.
+When `PDF_RENDERER_ADDRESS` is set, the pool runs out-of-process
+(`manage.py run_pdf_renderer`) and is shared by every gunicorn worker over a
+local socket; otherwise each process lazily starts its own pool.
+"""
+import math
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from documents.utils import generate_pdf, template_registry
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class RendererError(Exception):
+    pass
+
+
+class RendererBusy(RendererError):
+    """Raised when the pool already holds `PDF_RENDERER_MAX_PENDING` jobs."""
+
+
+class RendererTimeout(RendererError):
+    pass
+
+
+def _warmup_jobs() -> list:
+    """A one-line document in the stylesheet of each active template, built in the parent process."""
+    try:
+        templates = template_registry.active_templates()
+    except DatabaseError as e:
+        logger.warning(f"Could not load templates to warm the PDF renderers: {str(e)}")
+        return []
+    jobs = []
+    for template in templates:
+        styles = "".join(re.findall(r'<style.*?</style>', template.template.template.source, re.S))
+        html = f"<html><head>{styles}</head><body><p>warm-up</p></body></html>"
+        jobs.append(generate_pdf.RenderJob(html, template.name, {}, template.version))
+    return jobs
+
+
+def _warm_worker(jobs):
+    # Render each template's stylesheet once so fonts and CSS parsing are
+    # initialised before the first real job reaches this process.
+    for job in jobs:
+        try:
+            generate_pdf.generate_pdf_from_html(*job)
+        except Exception:
+            logger.warning(f"Failed to warm renderer with {job.template_name} v{job.template_version}", exc_info=True)
+
+
+def _render(job):
+    return generate_pdf.generate_pdf_from_html(*job)
+
+
+def _worker_main(conn, warmup_jobs):
+    """Renderer process: warm up, report ready, then render jobs from `conn` until it closes."""
+    _warm_worker(warmup_jobs)
+    conn.send(True)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send((True, _render(job)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:  # the exception itself doesn't pickle
+                conn.send((False, RuntimeError(str(e))))
+
+
+class _Worker:
+    """One renderer process and the pipe jobs are sent over, used by one job at a time."""
+
+    def __init__(self, warmup_jobs):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child, warmup_jobs), name='pdf-renderer', daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def _receive(self, timeout):
+        if not self.conn.poll(timeout):
+            raise RendererTimeout(f"PDF rendering exceeded {timeout}s.")
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            raise RendererError("PDF renderer process died.")
+
+    def wait_ready(self, timeout):
+        if not self.ready:
+            self._receive(timeout)
+            self.ready = True
+
+    def run(self, job, timeout):
+        # The deadline counts from the moment this worker starts on the job.
+        try:
+            self.conn.send(job)
+        except (BrokenPipeError, OSError):
+            raise RendererError("PDF renderer process died.")
+        ok, result = self._receive(timeout)
+        if not ok:
+            raise result
+        return result
+
+    def kill(self):
+        self.conn.close()
+        self.process.terminate()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class RendererPool:
+    """
+    `size` renderer processes, each running one job at a time. A job that
+    overruns `timeout` has its own process killed and replaced; the other
+    workers, and the jobs they are running, are left alone.
+    """
+
+    def __init__(self, size=None, timeout=None, max_pending=None):
+        self.size = size or settings.PDF_RENDERER_POOL_SIZE
+        self.timeout = timeout or settings.PDF_RENDERER_TIMEOUT
+        self.max_pending = max_pending or settings.PDF_RENDERER_MAX_PENDING
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._available = threading.Condition()
+        self._idle = []
+        self._workers = set()
+        self._warmup = None
+
+    def _checkout(self) -> _Worker:
+        with self._available:
+            while not self._idle and len(self._workers) >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            if self._warmup is None:
+                self._warmup = _warmup_jobs()
+            worker = _Worker(self._warmup)
+            self._workers.add(worker)
+        try:
+            worker.wait_ready(self.timeout)
+        except RendererError:
+            self._discard(worker)
+            raise
+        return worker
+
+    def _checkin(self, worker):
+        with self._available:
+            if worker in self._workers:
+                self._idle.append(worker)
+                self._available.notify()
+
+    def _discard(self, worker):
+        with self._available:
+            self._workers.discard(worker)
+            self._available.notify()
+        worker.kill()
+
+    def _run(self, job):
+        worker = self._checkout()
+        try:
+            result = worker.run(job, self.timeout)
+        except RendererError as e:
+            # Timed out or died: only this worker is replaced.
+            logger.warning(f"Replacing PDF renderer process: {str(e)}")
+            self._discard(worker)
+            raise
+        except BaseException:
+            self._checkin(worker)
+            raise
+        self._checkin(worker)
+        return result
+
+    def start(self):
+        """Spawn (and warm) every worker up front instead of on first use."""
+        workers = [self._checkout() for _ in range(self.size)]
+        for worker in workers:
+            self._checkin(worker)
+
+    def render_many(self, jobs):
+        jobs = list(jobs)
+        held = 0
+        try:
+            # Each job in flight holds one of `max_pending` slots. A batch takes
+            # the slots that are free and feeds the rest of its jobs through
+            # them as they finish, so any batch size works while a full pool
+            # still turns new work away.
+            while held < len(jobs) and self._slots.acquire(blocking=False):
+                held += 1
+            if jobs and not held:
+                raise RendererBusy("PDF renderer queue is full.")
+            if len(jobs) <= 1:
+                return [self._run(job) for job in jobs]
+
+            with ThreadPoolExecutor(max_workers=min(held, self.size), thread_name_prefix='pdf-dispatch') as dispatch:
+                futures = [dispatch.submit(self._run, job) for job in jobs]
+                try:
+                    return [future.result() for future in futures]
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            for _ in range(held):
+                self._slots.release()
+
+    def shutdown(self):
+        with self._available:
+            workers, self._workers, self._idle = list(self._workers), set(), []
+            self._available.notify_all()
+        for worker in workers:
+            worker.kill()
+
+
+_local_pool = None
+_local_pool_lock = threading.Lock()
+
+
+def get_local_pool() -> RendererPool:
+    global _local_pool
+    with _local_pool_lock:
+        if _local_pool is None:
+            _local_pool = RendererPool()
+        return _local_pool
+
+
+def _address():
+    address = settings.PDF_RENDERER_ADDRESS
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return (host, int(port))
+    return address
+
+
+def _authkey():
+    return settings.SECRET_KEY.encode()
+
+
+def render_pdfs(*jobs) -> list:
+    """
+    Render several `generate_pdf.RenderJob`s in parallel and return their PDF
+    bytes in the same order.
+    """
+    if settings.PDF_RENDERER_POOL_SIZE == 0:
+        return [_render(job) for job in jobs]
+
+    if not settings.PDF_RENDERER_ADDRESS:
+        return get_local_pool().render_many(list(jobs))
+
+    with Client(_address(), authkey=_authkey()) as conn:
+        conn.send(list(jobs))
+        # Worst case the server runs the jobs one round of PDF_RENDERER_POOL_SIZE
+        # at a time, each with its own timeout; leave headroom for it to report first.
+        rounds = math.ceil(len(jobs) / max(settings.PDF_RENDERER_POOL_SIZE, 1))
+        if not conn.poll(rounds * settings.PDF_RENDERER_TIMEOUT + 5):
+            raise RendererTimeout("PDF renderer did not respond in time.")
+        ok, result = conn.recv()
+
+    if ok:
+        return result
+    error_class = {'busy': RendererBusy, 'timeout': RendererTimeout}.get(result, RendererError)
+    raise error_class(f"PDF renderer failed: {result}")
+
+
+def _handle_connection(pool, conn):
+    try:
+        with conn:
+            jobs = conn.recv()
+            try:
+                conn.send((True, pool.render_many(jobs)))
+            except RendererBusy:
+                conn.send((False, 'busy'))
+            except RendererTimeout:
+                conn.send((False, 'timeout'))
+            except Exception as e:
+                logger.error(f"[PDFRenderer] Render failed: {str(e)}", exc_info=True)
+                conn.send((False, str(e)))
+    except (EOFError, OSError):
+        logger.warning("PDF renderer client disconnected early")
+
+
+def serve(pool: RendererPool, address=None):
+    """Accept render requests on `PDF_RENDERER_ADDRESS` until interrupted."""
+    address = address or _address()
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)  # stale socket from a previous run
+    pool.start()
+
+    with Listener(address, authkey=_authkey()) as listener:
+        logger.info(f"PDF renderer listening on {address} with {pool.size} worker(s)")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(pool, conn), daemon=True).start()
@@ -0,0 +1,135 @@
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from users.models import User
+from users.utils import blind_index
+from documents.models import GeneratedDocument
+from documents.utils import pdf_pool, artefacts, ai, clause_drafts, template_registry
+from documents.utils.generate_pdf import RenderJob
+from summary.utils import precompute
+
+import logging
+logger = logging.getLogger(__name__)
+
+def _noop_stage(stage: str) -> None:
+    pass
+
+
+def clause_context(data: dict) -> str:
+    return " ".join([str(v) for v in data['metadata'].values()])
+
+
+def base_metadata(owner, data: dict) -> dict:
+    return {**data['metadata'], 'issuer': owner.get_full_name()}
+
+
+def resolve_clause(owner, data: dict, metadata: dict) -> tuple:
+    """
+    `(clause, source)` for the payload: the streamed draft named by
+    `clause_id` while it is still valid, otherwise `ai.generate_clause`.
+    """
+    if data.get('clause_id'):
+        draft = clause_drafts.find(owner, data['clause_id'], data['template_type'])
+        if draft is not None:
+            return draft.clause, draft.source
+        logger.warning(f"Clause draft {data['clause_id']} is gone, generating the clause again")
+    return ai.generate_clause(
+        data['template_type'],
+        data['prompt'],
+        clause_context(data),
+        metadata,
+        use_cache=not data.get('fresh_clause', False),
+    )
+
+
+def render_document(data: dict, metadata: dict) -> dict:
+    """
+    Render the plain HTML for `metadata` with the active template of the
+    document type. The encrypted variants are derived later, see `artefacts`.
+    """
+    template = template_registry.active(data['template_type'])
+    return {
+        'template': template,
+        'template_id': template.id,
+        'metadata': metadata,
+        'html_plain': template_registry.render(template, metadata),
+    }
+
+
+def render_job(rendered: dict) -> RenderJob:
+    return template_registry.render_job(rendered['template'], rendered['metadata'], rendered['html_plain'])
+
+
+def signer_defaults(data: dict) -> dict:
+    return {
+        'email': data['signer_email'],
+        'first_name': data['signer_first_name'],
+        'last_name': data['signer_last_name'],
+        'role': 'signer',
+        'password': make_password(None),  # unusable until the signer sets one
+        'email_index': blind_index.email_index(data['signer_email']),
+    }
+
+
+def get_or_create_signer(data: dict) -> User:
+    """
+    Match the signer by username, then by email through the blind index, and
+    only create a new account when neither exists.
+    """
+    signer = User.objects.filter(username=data['signer_username']).first()
+    if signer is None:
+        signer = User.objects.filter(email_index=blind_index.email_index(data['signer_email'])).first()
+    if signer is not None:
+        return signer
+
+    signer, created = User.objects.get_or_create(
+        username=data['signer_username'],
+        defaults=signer_defaults(data),
+    )
+    if created:
+        logger.info(f"Signer created: {signer.username}")
+    return signer
+
+
+def store_document(owner, signer, data: dict, rendered: dict, clause_source, pdf_plain: bytes) -> GeneratedDocument:
+    name = data.get('name') or f"{data['template_type'].capitalize()} Document"
+    with transaction.atomic():
+        doc = GeneratedDocument.objects.create(
+            owner=owner,
+            signer=signer,
+            document_type=data['template_type'],
+            name=name,
+            template_id=rendered['template_id'],
+            clause_source=clause_source,
+            metadata=rendered['metadata'],
+        )
+        clean_name = name.replace(" ", "_")
+        doc.plain_pdf.save(f"{clean_name}.pdf", ContentFile(pdf_plain))
+        doc.plain_html.save(f"{clean_name}.html", ContentFile(rendered['html_plain'].encode('utf-8')))
+        artefacts.schedule(doc)
+        precompute.on_document_created(doc)
+
+    logger.info(f"Document generated: {doc.id} by {owner.username}")
+    return doc
+
+
+def generate_document(owner, data: dict, on_stage=_noop_stage) -> GeneratedDocument:
+    """
+    Run the full generation pipeline (AI -> render -> PDF -> store) for the
+    validated payload of a `DocumentCreateSerializer`. `on_stage` is called
+    with the name of each stage as it starts so callers can report progress.
+    """
+    on_stage('ai')
+    metadata = base_metadata(owner, data)
+    metadata['ai_clause_details'], clause_source = resolve_clause(owner, data, metadata)
+
+    on_stage('render')
+    rendered = render_document(data, metadata)
+
+    on_stage('pdf')
+    pdf_plain, = pdf_pool.render_pdfs(render_job(rendered))
+
+    on_stage('store')
+    signer = get_or_create_signer(data)
+    return store_document(owner, signer, data, rendered, clause_source, pdf_plain)
@@ -0,0 +1,168 @@
+"""
+ReportLab engine for the bundled fixed-layout templates (NDA, invoice and
+offer letter). The layout mirrors `documents/templates/*.html` but is built
+straight from the render context with platypus, so no HTML/CSS parsing is
+involved. Templates it does not know are handed to the xhtml2pdf engine.
+"""
+import io
+import re
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from documents.utils.generate_pdf import PDFEngine, XHTML2PDFEngine
+
+BODY = ParagraphStyle('body', fontName='Times-Roman', fontSize=12, leading=20, spaceAfter=8)
+TITLE = ParagraphStyle('title', parent=BODY, fontName='Times-Bold', fontSize=22, leading=28, alignment=TA_CENTER, spaceAfter=16)
+
+SIGNATURE_LINE_WIDTH = 225  # 300px in the HTML templates
+
+
+def _text(context, key):
+    return escape(str(context.get(key, '') or ''))
+
+
+def _bold(context, key):
+    return f"<b>{_text(context, key)}</b>"
+
+
+def _html_fragment(html):
+    """
+    Reduce the markdown-generated AI clause to the inline markup supported by
+    reportlab paragraphs: one paragraph per block, bold/italic kept.
+    """
+    html = str(html or '')
+    html = re.sub(r'<li[^>]*>', '\n• ', html)
+    html = re.sub(r'</?(p|div|ul|ol|li|h[1-6]|br)[^>]*>', '\n', html)
+    html = re.sub(r'<(/?)strong>', r'<\1b>', html)
+    html = re.sub(r'<(/?)em>', r'<\1i>', html)
+    html = re.sub(r'<(?!/?[bi]>)[^>]+>', '', html)
+
+    paragraphs = []
+    for block in filter(None, (b.strip() for b in html.split('\n'))):
+        try:
+            paragraphs.append(Paragraph(block, BODY))
+        except ValueError:
+            paragraphs.append(Paragraph(escape(re.sub(r'<[^>]+>', '', block)), BODY))
+    return paragraphs
+
+
+def _signature(label_lines, space_before=2 * cm):
+    flowables = [
+        Spacer(1, space_before),
+        HRFlowable(width=SIGNATURE_LINE_WIDTH, thickness=1, color=colors.black, hAlign='LEFT', spaceAfter=5),
+    ]
+    return flowables + [Paragraph(line, BODY) for line in label_lines]
+
+
+def _recipient_signature(context, signed_label, unsigned_label):
+    if context.get('signature_text'):
+        return _signature([_text(context, 'signature_text'), f"<i>{signed_label}</i>"], space_before=3 * cm)
+    return _signature([_text(context, 'recipient_name'), f"<i>{unsigned_label}</i>"], space_before=3 * cm)
+
+
+def build_nda(context):
+    return [
+        Paragraph("Non-Disclosure Agreement (NDA)", TITLE),
+        Paragraph(f"<b>Effective Date:</b> {_text(context, 'start_date')}", BODY),
+        Paragraph(f"<b>Expiration Date:</b> {_text(context, 'end_date')}", BODY),
+        Spacer(1, 20),
+        Paragraph(
+            f'This NDA is entered into by {_bold(context, "issuer")} ("Disclosing Party") and '
+            f'{_bold(context, "recipient_name")} ("Receiving Party").', BODY
+        ),
+        Paragraph(
+            "The Receiving Party agrees not to disclose or use any confidential information "
+            "shared by the Disclosing Party except as required in the performance of their duties.", BODY
+        ),
+        Paragraph(
+            f"This agreement will remain in effect until {_bold(context, 'end_date')}, "
+            "unless terminated earlier in writing.", BODY
+        ),
+        *_html_fragment(context.get('ai_clause_details')),
+        *_recipient_signature(context, 'Recipient Signature', 'Recipient Signature'),
+        *_signature([_bold(context, 'issuer'), "<i>Disclosing Party Signature</i>"]),
+    ]
+
+
+def build_invoice(context):
+    cell = ParagraphStyle('cell', parent=BODY, spaceAfter=0)
+    table = Table(
+        [
+            [Paragraph('<b>Item</b>', cell), Paragraph('<b>Description</b>', cell), Paragraph('<b>Amount</b>', cell)],
+            [
+                Paragraph(_text(context, 'item'), cell),
+                Paragraph(_text(context, 'description'), cell),
+                # The base-14 fonts have no rupee glyph.
+                Paragraph(f"Rs. {_text(context, 'amount')}", cell),
+            ],
+        ],
+        colWidths=['30%', '45%', '25%'],
+    )
+    table.setStyle(TableStyle([
+        ('LINEBELOW', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 9),
+    ]))
+    return [
+        Paragraph("Invoice", TITLE),
+        Paragraph(f"<b>Issued To:</b> {_text(context, 'recipient_name')}", BODY),
+        Paragraph(f"<b>Due Date:</b> {_text(context, 'due_date')}", BODY),
+        Spacer(1, 20),
+        table,
+        *_signature([_bold(context, 'issuer'), "<i>Authorized Signature</i>"]),
+    ]
+
+
+def build_offer_letter(context):
+    return [
+        Paragraph("Offer of Employment", TITLE),
+        Paragraph(f"Date: {_text(context, 'start_date')}", BODY),
+        Paragraph(f"Dear {_text(context, 'recipient_name')},", BODY),
+        Paragraph(
+            f"We are excited to offer you the position of {_bold(context, 'role')} at our company. "
+            "We were impressed by your skills and believe you'll be a valuable asset to our team.", BODY
+        ),
+        Paragraph(
+            f"Your starting salary will be <b>Rs. {_text(context, 'salary')}</b> per month. "
+            f"Your start date is expected to be {_bold(context, 'start_date')}.", BODY
+        ),
+        Paragraph(
+            "This offer is contingent upon the completion of necessary formalities and documentation. "
+            "Please indicate your acceptance by signing below.", BODY
+        ),
+        *_recipient_signature(context, 'Signed Electronically', 'Signature'),
+        Spacer(1, 2 * cm),
+        Paragraph("Sincerely,", BODY),
+        *_signature([_bold(context, 'issuer'), "<i>Authorized Signature</i>"]),
+    ]
+
+
+# Layouts written for one version of a template. Other versions (published
+# through the template registry) are rendered from their HTML instead.
+BUILDERS = {
+    ('nda.html', 1): build_nda,
+    ('invoice.html', 1): build_invoice,
+    ('offer_letter.html', 1): build_offer_letter,
+}
+
+
+class ReportLabEngine(PDFEngine):
+    def __init__(self):
+        self.fallback = XHTML2PDFEngine()
+
+    def render(self, html, template_name=None, context=None, template_version=None):
+        builder = BUILDERS.get((template_name, template_version))
+        if builder is None or context is None:
+            return self.fallback.render(html)
+
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+        doc.build(builder(context))
+        return buffer.getvalue()
@@ -0,0 +1,171 @@
+"""
+Serving stored files to authorised users.
+
+`serve_file` answers conditional requests (ETag / Last-Modified -> 304),
+byte ranges (206, including multipart/byteranges for several ranges) and,
+with `FILE_SERVE_MODE` set to 'x-accel' or 'x-sendfile', hands the transfer
+to the front proxy once the view has checked access.
+
+Blobs in `ContentAddressedStorage` are named after the SHA-256 of their
+content, so the name itself is a strong ETag; files saved under their old
+names get a weak one from size and modification time.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import get_random_string
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from documents import storage
+
+CHUNK_SIZE = 64 * 1024
+MAX_RANGES = 16
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def etag_for(name: str, size: int, modified) -> str:
+    if storage.is_blob(name):
+        return f'"{os.path.splitext(os.path.basename(name))[0]}"'
+    return f'W/"{size:x}-{int(modified.timestamp()):x}"'
+
+
+def parse_ranges(header: str, size: int):
+    """
+    Parse a `Range: bytes=...` header into (start, end) pairs, end inclusive.
+    Returns None when the header should be ignored (not bytes, malformed or
+    too many ranges) and [] when no range can be satisfied.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(','):
+        match = RANGE_RE.match(part)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes.
+            length = int(last)
+            if length == 0:
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def _if_range_matches(request, etag: str, modified) -> bool:
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Only a strong ETag can validate a range.
+        return not etag.startswith('W/') and if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(modified.timestamp()) <= since
+
+
+def _read_range(field_file, start: int, end: int):
+    field_file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = field_file.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _multipart(field_file, ranges, size, content_type, boundary):
+    for start, end in ranges:
+        yield (
+            f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode('latin-1')
+        yield from _read_range(field_file, start, end)
+    yield f"\r\n--{boundary}--\r\n".encode('latin-1')
+    field_file.close()
+
+
+def _single(field_file, start, end):
+    yield from _read_range(field_file, start, end)
+    field_file.close()
+
+
+def _offloaded(field_file, name: str, content_type: str) -> HttpResponse:
+    response = HttpResponse(content_type=content_type)
+    if settings.FILE_SERVE_MODE == 'x-accel':
+        response['X-Accel-Redirect'] = quote(settings.FILE_SERVE_ACCEL_PREFIX.rstrip('/') + '/' + name)
+    else:
+        response['X-Sendfile'] = field_file.storage.path(name)
+    return response
+
+
+def serve_file(request, field_file, content_type: str, filename: str = None):
+    """Serve `field_file` (a FieldFile) with caching headers and Range support."""
+    name = field_file.name
+    file_storage = field_file.storage
+    size = file_storage.size(name)
+    modified = file_storage.get_modified_time(name)
+    etag = etag_for(name, size, modified)
+    compressed = storage.is_compressed(name)
+
+    def headers(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified.timestamp())
+        response['Accept-Ranges'] = 'none' if compressed else 'bytes'
+        patch_cache_control(response, private=True, no_cache=True)
+        if filename:
+            response['Content-Disposition'] = content_disposition_header(False, filename)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(modified.timestamp()))
+    if not_modified is not None:
+        return headers(not_modified)
+
+    # Compressed blobs are decompressed on the way out, so the proxy can't send them.
+    if settings.FILE_SERVE_MODE in ('x-accel', 'x-sendfile') and not compressed:
+        return headers(_offloaded(field_file, name, content_type))
+
+    ranges = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and not compressed and _if_range_matches(request, etag, modified):
+        ranges = parse_ranges(range_header, size)
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return headers(response)
+
+    if not ranges:
+        return headers(FileResponse(field_file.open('rb'), content_type=content_type))
+
+    field_file.open('rb')
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_single(field_file, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = str(end - start + 1)
+        return headers(response)
+
+    boundary = get_random_string(24)
+    response = StreamingHttpResponse(
+        _multipart(field_file, ranges, size, content_type, boundary),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    return headers(response)
@@ -0,0 +1,86 @@
+"""
+Minimal SMTP server for exercising the email outbox offline.
+
+Speaks just enough SMTP (no TLS, no auth) for Django's SMTP backend and
+writes every received message to `output_dir` as an .eml file. Use it with
+EMAIL_HOST=127.0.0.1, EMAIL_PORT=<port> and EMAIL_USE_TLS=False.
+"""
+from pathlib import Path
+import socketserver
+import uuid
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def _reset(self):
+        self.mail_from, self.recipients, self.lines = None, [], []
+
+    def handle(self):
+        self._reset()
+        in_data = False
+        self._reply("220 docsign SMTP stub ready")
+
+        for raw in self.rfile:
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+
+            if in_data:
+                if line == '.':
+                    self.server.store(self.mail_from, self.recipients, "\n".join(self.lines))
+                    self._reset()
+                    in_data = False
+                    self._reply("250 OK: queued")
+                else:
+                    self.lines.append(line[1:] if line.startswith('..') else line)
+                continue
+
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self._reply("250-docsign SMTP stub")
+                self._reply("250 8BITMIME")
+            elif command == 'HELO':
+                self._reply("250 docsign SMTP stub")
+            elif command == 'MAIL':
+                self.mail_from = line.split(':', 1)[-1].strip()
+                self._reply("250 OK")
+            elif command == 'RCPT':
+                self.recipients.append(line.split(':', 1)[-1].strip())
+                self._reply("250 OK")
+            elif command == 'DATA':
+                in_data = True
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif command in ('RSET', 'NOOP'):
+                if command == 'RSET':
+                    self._reset()
+                self._reply("250 OK")
+            elif command == 'QUIT':
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, output_dir=None):
+        super().__init__(address, SMTPStubHandler)
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.messages = []
+
+    def store(self, mail_from, recipients, message):
+        self.messages.append({'from': mail_from, 'to': recipients, 'message': message})
+        logger.info(f"SMTP stub received mail from {mail_from} to {', '.join(recipients)}")
+        if self.output_dir:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            (self.output_dir / f"{uuid.uuid4().hex}.eml").write_text(message, encoding='utf-8')
+
+
+def serve(host='127.0.0.1', port=1025, output_dir=None):
+    with SMTPStubServer((host, port), output_dir=output_dir) as server:
+        server.serve_forever()
@@ -0,0 +1,163 @@
+"""
+Document templates from the database.
+
+Each `DocumentTemplate` row is one version of a document type's template:
+its HTML, its CSS and the metadata fields it needs. One version per type is
+active. Rows are not edited once saved; `publish` adds the next version and
+activates it. Every `GeneratedDocument` points at the version it was
+rendered with, so signing re-renders it exactly as it was first rendered.
+
+Compiled `Template` objects are cached per process by row id. Versions
+never change, so these entries never go stale. Which version is active is
+re-read every `TEMPLATE_REGISTRY_REFRESH` seconds, and immediately in the
+process that publishes. `preload` compiles the active templates when web
+and worker processes start.
+"""
+from collections import namedtuple
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Max
+from django.template import engines
+
+from documents.models import DocumentTemplate
+from documents.utils.generate_pdf import RenderJob
+
+import logging
+logger = logging.getLogger(__name__)
+
+CompiledTemplate = namedtuple('CompiledTemplate', ['id', 'document_type', 'name', 'version', 'required_fields', 'template'])
+
+
+class TemplateNotFound(LookupError):
+    pass
+
+
+_lock = threading.Lock()
+_compiled = {}  # DocumentTemplate id -> CompiledTemplate
+_active = {}  # document type -> DocumentTemplate id
+_active_loaded_at = None
+
+
+def source(html: str, css: str) -> str:
+    """The full template: `html` with `css` in a <style> block at the end of its <head>."""
+    if not css:
+        return html
+    style = f"<style>\n{css}\n</style>\n"
+    if '</head>' in html:
+        return html.replace('</head>', f"{style}</head>", 1)
+    return style + html
+
+
+def _compile(row) -> CompiledTemplate:
+    return CompiledTemplate(
+        row.id,
+        row.document_type,
+        row.name,
+        row.version,
+        tuple(row.required_fields or ()),
+        engines['django'].from_string(source(row.html, row.css)),
+    )
+
+
+def _compile_missing(ids):
+    missing = [pk for pk in ids if pk not in _compiled]
+    if missing:
+        compiled = {row.id: _compile(row) for row in DocumentTemplate.objects.filter(pk__in=missing)}
+        with _lock:
+            _compiled.update(compiled)
+
+
+def get(template_id: int) -> CompiledTemplate:
+    """A specific template version."""
+    if template_id not in _compiled:
+        _compile_missing([template_id])
+        if template_id not in _compiled:
+            raise TemplateNotFound(f"Template {template_id} does not exist.")
+    return _compiled[template_id]
+
+
+def _load_active():
+    global _active, _active_loaded_at
+    active = dict(DocumentTemplate.objects.filter(is_active=True).values_list('document_type', 'id'))
+    _compile_missing(active.values())
+    with _lock:
+        _active = active
+        _active_loaded_at = time.monotonic()
+
+
+def _refresh_active():
+    loaded_at = _active_loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > settings.TEMPLATE_REGISTRY_REFRESH:
+        _load_active()
+
+
+def active(document_type: str) -> CompiledTemplate:
+    """The version new documents of `document_type` are rendered with."""
+    _refresh_active()
+    try:
+        return _compiled[_active[document_type]]
+    except KeyError:
+        raise TemplateNotFound(f"No active template for {document_type!r}.")
+
+
+def active_templates() -> list:
+    """The active version of every document type."""
+    _refresh_active()
+    return [_compiled[template_id] for template_id in _active.values()]
+
+
+def for_document(doc) -> CompiledTemplate:
+    """The version `doc` was rendered with."""
+    if doc.template_id:
+        return get(doc.template_id)
+    return active(doc.document_type)
+
+
+def render(template: CompiledTemplate, context: dict) -> str:
+    return template.template.render(context)
+
+
+def render_job(template: CompiledTemplate, context: dict, html: str = None) -> RenderJob:
+    """A PDF render request for `template` with `context`, carrying the hints engines pick a layout by."""
+    return RenderJob(render(template, context) if html is None else html, template.name, context, template.version)
+
+
+def invalidate():
+    global _active_loaded_at
+    _active_loaded_at = None
+
+
+def preload():
+    """Compile every active template now instead of on first use."""
+    try:
+        _load_active()
+    except DatabaseError as e:
+        # e.g. before the first migrate; templates are loaded on first use then.
+        logger.warning(f"Could not preload document templates: {str(e)}")
+        return
+    logger.info(f"Preloaded {len(_active)} document template(s)")
+
+
+def activate(row: DocumentTemplate):
+    """Make `row` the active version of its document type."""
+    with transaction.atomic():
+        DocumentTemplate.objects.filter(document_type=row.document_type, is_active=True).exclude(pk=row.pk).update(is_active=False)
+        DocumentTemplate.objects.filter(pk=row.pk).update(is_active=True)
+        row.is_active = True
+        transaction.on_commit(invalidate)
+
+
+def publish(row: DocumentTemplate) -> DocumentTemplate:
+    """Save an unsaved `row` as the next version of its document type and activate it."""
+    with transaction.atomic():
+        latest = DocumentTemplate.objects.filter(document_type=row.document_type).aggregate(latest=Max('version'))['latest']
+        DocumentTemplate.objects.filter(document_type=row.document_type, is_active=True).update(is_active=False)
+        row.version = (latest or 0) + 1
+        row.is_active = True
+        row.save()
+        transaction.on_commit(invalidate)
+    logger.info(f"Published {row.document_type} template v{row.version}")
+    return row
@@ -2,27 +2,28 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.core.files.base import ContentFile
 from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
 from django.db.models import Q
 
-from users.models import User
-from documents.models import GeneratedDocument
+from documents.models import GeneratedDocument, GenerationJob
 from documents.serializers import (
+    ClauseStreamSerializer,
     DocumentCreateSerializer,
     GeneratedDocumentSerializer,
-    GeneratedDocumentListSerializer
+    GeneratedDocumentListSerializer,
+    GenerationJobSerializer,
+    SignerInboxSerializer
 )
 
-from documents.utils import render_html, generate_pdf, encryption, ai
+from documents.utils import ai, artefacts, bulk, clause_drafts, jobs, outbox, pdf_pool, pipeline, serving
+from documents.pagination import KeysetPagination
 from rest_framework.generics import ListAPIView
-from django.core.mail import EmailMessage
-from rest_framework_simplejwt.tokens import AccessToken
-from django.utils.crypto import get_random_string
+from users.authentication import VersionedAccessToken
 from decouple import config
 
+import json
 import logging
 logger = logging.getLogger(__name__)
 
@@ -38,67 +39,152 @@ class GenerateDocumentView(APIView):
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             data = serializer.validated_data
-            TEMPLATES_MATCH = {
-                'nda': 'nda',
-                'invoice': 'invoice',
-                'offer': 'offer_letter',
-            }
-            matching_template = TEMPLATES_MATCH.get(data['template_type'])
-            template = f"{matching_template}.html"
-
-            signer, created = User.objects.get_or_create(
-                username=data['signer_username'],
-                defaults={
-                    'email': data['signer_email'],
-                    'first_name': data['signer_first_name'],
-                    'last_name': data['signer_last_name'],
-                    'role': 'signer',
-                    'password': get_random_string(12),
-                }
-            )
-            if created:
-                logger.info(f"Signer created: {signer.username}")
-
-            context = " ".join([str(v) for v in data['metadata'].values()])
-            ai_content = ai.generate_ai_clause(data['prompt'], context)
-            metadata = {**data['metadata'], 'ai_clause_details': ai_content, 'issuer': request.user.get_full_name()}
-
-            html_plain = render_html.render_html(template, metadata)
-            pdf_plain = generate_pdf.generate_pdf_from_html(html_plain)
-
-            encrypted_metadata = {
-                k: encryption.encrypt_value(str(v)) for k, v in metadata.items()
-            }
-            html_encrypted = render_html.render_html(template, encrypted_metadata)
-            pdf_encrypted = generate_pdf.generate_pdf_from_html(html_encrypted)
-
-            doc = GeneratedDocument.objects.create(
-                owner=request.user,
-                signer=signer,
-                document_type=data['template_type'],
-                name=data.get('name', f"{data['template_type'].capitalize()} Document"),
-                encrypted_metadata=encrypted_metadata
-            )
-            clean_name = data.get("name", f"{data['template_type'].capitalize()} Document").replace(" ", "_")
-            doc.plain_pdf.save(f"{clean_name}.pdf", ContentFile(pdf_plain))
-            doc.encrypted_pdf.save(f"{clean_name}_encrypted.pdf", ContentFile(pdf_encrypted))
-            doc.plain_html.save(f"{clean_name}.html", ContentFile(html_plain.encode('utf-8')))
-            doc.encrypted_html.save(f"{clean_name}_encrypted.html", ContentFile(html_encrypted.encode('utf-8')))
+            if data.get('clause_id') and not clause_drafts.find(request.user, data['clause_id'], data['template_type']):
+                return Response({'clause_id': ["Unknown or expired clause draft."]}, status=status.HTTP_400_BAD_REQUEST)
 
-            logger.info(f"Document generated: {doc.id} by {request.user.username}")
-            return Response(GeneratedDocumentSerializer(doc).data, status=status.HTTP_201_CREATED)
+            job = jobs.enqueue_generation(request.user, data)
+            data = GenerationJobSerializer(job).data
+            if job.status == 'succeeded':
+                return Response(data, status=status.HTTP_201_CREATED)
+            return Response(data, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"[GenerateDocumentView] Error: {str(e)}", exc_info=True)
             return Response({'error': 'Something went wrong while generating the document.'}, status=500)
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ClauseStreamView(APIView):
+    """
+    Stream an AI clause as Server-Sent Events. `delta` events carry the
+    markdown as the model writes it; `done` carries the finished clause
+    (HTML), its source and a `clause_id` that `generate/` accepts in place
+    of generating the clause again; `error` ends a failed stream.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ClauseStreamSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = request.user
+        data = serializer.validated_data
+        clause_events = ai.stream_clause(
+            data['template_type'],
+            data['prompt'],
+            pipeline.clause_context(data),
+            pipeline.base_metadata(owner, data),
+            use_cache=not data['fresh_clause'],
+        )
+
+        def events():
+            yield ": stream opened\n\n"  # headers go out before the model answers
+            try:
+                for event, *payload in clause_events:
+                    if event == 'delta':
+                        yield _sse('delta', {'text': payload[0]})
+                        continue
+                    clause, source = payload
+                    draft = clause_drafts.save(owner, data['template_type'], clause, source)
+                    yield _sse('done', {'clause_id': str(draft.id), 'clause': clause, 'source': source})
+            except Exception as e:
+                logger.error(f"[ClauseStreamView] Error: {str(e)}", exc_info=True)
+                yield _sse('error', {'error': 'Something went wrong while generating the clause.'})
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class BulkGenerateDocumentView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            rows = bulk.rows_from_request(request)
+        except bulk.BulkInputError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Bulk generation of {len(rows)} document(s) started by {request.user.username}")
+        events = (json.dumps(event, default=str) + "\n" for event in bulk.generate_bulk(request.user, rows))
+        response = StreamingHttpResponse(events, content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'  # let nginx flush progress lines as they are produced
+        return response
+
+
+class GenerationJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(GenerationJob.objects.select_related('document'), pk=pk, owner=request.user)
+        return Response(GenerationJobSerializer(job).data)
+
+
 class GeneratedDocumentListView(ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = GeneratedDocumentListSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return GeneratedDocument.objects.filter(owner=self.request.user).order_by('-created_at')
+        # Only the listed columns; loading whole signer rows would decrypt their encrypted fields.
+        queryset = (
+            GeneratedDocument.objects.filter(owner=self.request.user)
+            .select_related('signer', 'signed_version')
+            .only(
+                'id', 'name', 'document_type', 'created_at', 'owner_id',
+                'signer__id', 'signer__username',
+                'signed_version__id', 'signed_version__original_document_id', 'signed_version__signed_at',
+            )
+            .order_by('-created_at', '-id')
+        )
+
+        document_type = self.request.query_params.get('type')
+        if document_type:
+            queryset = queryset.filter(document_type=document_type)
+
+        signed = self.request.query_params.get('signed')
+        if signed in ('true', '1'):
+            queryset = queryset.filter(is_signed=True)
+        elif signed in ('false', '0'):
+            queryset = queryset.filter(is_signed=False)
+
+        return queryset
+
+
+class SignerInboxView(ListAPIView):
+    """
+    Documents waiting on (or already signed by) the current user, newest
+    first. `?status=pending|signed|all` filters on the denormalized
+    `is_signed` flag so the lookup stays on the (signer, created_at) index.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SignerInboxSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = (
+            GeneratedDocument.objects.filter(signer=self.request.user)
+            .select_related('owner', 'signed_version')
+            .only(
+                'id', 'name', 'document_type', 'created_at', 'is_signed', 'signer_id',
+                'owner__id', 'owner__username',
+                'signed_version__id', 'signed_version__original_document_id', 'signed_version__signed_at',
+            )
+            .order_by('-created_at', '-id')
+        )
+
+        inbox_status = self.request.query_params.get('status', 'pending')
+        if inbox_status == 'pending':
+            queryset = queryset.filter(is_signed=False)
+        elif inbox_status == 'signed':
+            queryset = queryset.filter(is_signed=True)
+
+        return queryset
 
 
 class GeneratedDocumentServeView(APIView):
@@ -112,11 +198,20 @@ class GeneratedDocumentServeView(APIView):
                 pk=pk,
             )
 
+            if request.query_params.get('variant') == 'encrypted':
+                # Rendered and cached on the first request for it.
+                if not document.encrypted_pdf:
+                    artefacts.encrypted_pdf(document)
+                return serving.serve_file(request, document.encrypted_pdf, 'application/pdf')
+
             if not document.plain_pdf:
                 return Response({'error': 'PDF not available'}, status=status.HTTP_404_NOT_FOUND)
 
-            return FileResponse(document.plain_pdf.open('rb'), content_type='application/pdf')
+            return serving.serve_file(request, document.plain_pdf, 'application/pdf')
 
+        except pdf_pool.RendererBusy:
+            logger.warning(f"[ServeDocument] PDF renderer busy, rejected document {pk}")
+            return Response({'error': 'The server is busy, please try again shortly.'}, status=503)
         except Exception as e:
             logger.error(f"[ServeDocument] Failed to serve PDF for document {pk}: {str(e)}", exc_info=True)
             return Response({'error': 'Failed to serve the document PDF.'}, status=500)
@@ -137,7 +232,7 @@ class SendToSignerView(APIView):
             signer_name = f"{document.signer.first_name} {document.signer.last_name}".strip()
 
             # Generate token and build frontend URL
-            token = str(AccessToken.for_user(document.signer))
+            token = str(VersionedAccessToken.for_user(document.signer))
             frontend_base_url = config("FRONTEND_URL", default="https://your-frontend.com")
             sign_url = f"{frontend_base_url}/sign?token={token}&doc={document.id}"
 
@@ -153,18 +248,20 @@ class SendToSignerView(APIView):
             Thank you.
             """
 
-            email = EmailMessage(
+            # Attaching the PDF is optional; the sign link above always opens the document.
+            attach = request.data.get('attach', settings.SIGNER_EMAIL_ATTACH_PDF)
+            if isinstance(attach, str):
+                attach = attach.lower() in ('1', 'true', 'yes')
+
+            email = outbox.queue_email(
                 subject=email_subject,
                 body=email_body,
                 to=[signer_email],
+                attachment=document.plain_pdf.name if attach and document.plain_pdf else None,
+                document=document,
             )
-
-            if document.plain_pdf and document.plain_pdf.path:
-                email.attach_file(document.plain_pdf.path)
-
-            email.send()
-            logger.info(f"Sent document {document.id} to signer {document.signer.username}")
-            return Response({'message': 'Document sent to signer successfully.'})
+            logger.info(f"Queued document {document.id} for signer {document.signer.username} (email {email.id})")
+            return Response({'message': 'Document queued for delivery to the signer.', 'email_id': email.id}, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             logger.error(f"[SendToSignerView] Error: {str(e)}", exc_info=True)
@@ -1,10 +1,12 @@
 from django.contrib import admin
+from users.admin import EncryptedUserSearchMixin
 from .models import SignedDocument
 
 @admin.register(SignedDocument)
-class SignedDocumentAdmin(admin.ModelAdmin):
+class SignedDocumentAdmin(EncryptedUserSearchMixin, admin.ModelAdmin):
     list_display = ('original_document', 'signed_at', 'signed_by')
     search_fields = ('original_document__name', 'signed_by__username')
+    encrypted_search_lookups = ('signed_by',)
     readonly_fields = ('signed_pdf', 'signed_encrypted_pdf', 'signed_at')
     fieldsets = (
         (None, {
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SignatureConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'signature'
+
+    def ready(self):
+        from signature import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='signeddocument',
+            name='signed_encrypted_pdf',
+            field=models.FileField(blank=True, null=True, upload_to='documents/signed_encrypted/'),
+        ),
+    ]
@@ -5,9 +5,15 @@ from documents.models import GeneratedDocument
 class SignedDocument(models.Model):
     original_document = models.OneToOneField(GeneratedDocument, on_delete=models.CASCADE, related_name='signed_version')
     signed_pdf = models.FileField(upload_to='documents/signed/')
-    signed_encrypted_pdf = models.FileField(upload_to='documents/signed_encrypted/')
+    signed_encrypted_pdf = models.FileField(upload_to='documents/signed_encrypted/', null=True, blank=True)
     signed_at = models.DateTimeField(auto_now_add=True)
     signed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
     def __str__(self):
         return f"Signed copy of {self.original_document.name}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        GeneratedDocument.objects.filter(pk=self.original_document_id).update(is_signed=True)
+
+    # Deletes, including queryset, admin and cascading ones, clear `is_signed` in signature.signals.
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from documents.models import GeneratedDocument
+from signature.models import SignedDocument
+
+
+@receiver(post_delete, sender=SignedDocument)
+def clear_is_signed(sender, instance, **kwargs):
+    """Keep `GeneratedDocument.is_signed` in sync however the signed copy was deleted."""
+    GeneratedDocument.objects.filter(pk=instance.original_document_id).update(is_signed=False)
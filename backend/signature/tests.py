@@ -1,3 +1,198 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from rest_framework.test import APIClient
+
+from documents.models import GeneratedDocument, OutboundEmail, StoredBlob
+from documents.utils import artefacts, outbox, pipeline
+from signature import views as signature_views
+from signature.models import SignedDocument
+from signature.utils import signing
+from signature.utils.stamp import StampError, find_signature_position, stamp_signature
+from users.models import User
+
+
+def make_pdf(*lines):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setFont('Times-Roman', 12)
+    for index, line in enumerate(lines):
+        pdf.drawString(72, 700 - index * 40, line)
+    pdf.save()
+    return buffer.getvalue()
+
+
+class StampSignatureTests(SimpleTestCase):
+    def test_signed_pdf_is_an_incremental_update(self):
+        original = make_pdf('Non-Disclosure Agreement', 'Recipient Signature')
+        signed = stamp_signature(original, 'nda', 'Signed by Bob Doe')
+
+        self.assertTrue(signed.startswith(original))
+        self.assertGreater(len(signed), len(original))
+        self.assertIn('Signed by Bob Doe', PdfReader(io.BytesIO(signed)).pages[0].extract_text())
+
+    def test_stamp_is_placed_after_the_signature_caption(self):
+        reader = PdfReader(io.BytesIO(make_pdf('Offer Letter', 'Signature')))
+        page_index, x, y, size = find_signature_position(reader, 'offer')
+        self.assertEqual(page_index, 0)
+        self.assertGreater(x, 72)
+        self.assertAlmostEqual(y, 660, delta=1)
+        self.assertEqual(size, 12)
+
+    def test_without_caption_stamps_the_bottom_margin(self):
+        original = make_pdf('No signature block here')
+        page_index, x, y, _ = find_signature_position(PdfReader(io.BytesIO(original)), 'nda')
+        self.assertEqual(page_index, 0)
+        self.assertLess(y, 72)
+        self.assertTrue(stamp_signature(original, 'nda', 'Bob Doe').startswith(original))
+
+    def test_invalid_pdf(self):
+        with self.assertRaises(StampError):
+            stamp_signature(b'not a pdf', 'nda', 'Bob Doe')
+
+
+PAYLOAD = {
+    'template_type': 'nda',
+    'prompt': 'confidentiality',
+    'metadata': {'recipient_name': 'Bob', 'start_date': '2025-01-01', 'end_date': '2026-01-01'},
+    'signer_username': 'bob',
+    'signer_email': 'bob@example.com',
+    'signer_first_name': 'Bob',
+    'signer_last_name': 'Doe',
+    'name': 'Bob NDA',
+}
+
+
+@override_settings(PDF_RENDERER_POOL_SIZE=0, SUMMARY_PRECOMPUTE='off', ENCRYPTED_ARTEFACTS='lazy',
+                   SIGNATURE_MODE='stamp', EMAIL_OUTBOX_EAGER=False)
+class SigningTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        owner = User.objects.create_user(username='alice', email='alice@example.com', password='pw12345678',
+                                         first_name='Alice', last_name='Doe')
+        with mock.patch.object(pipeline, 'resolve_clause', return_value=('<p>Clause</p>', 'fallback')):
+            self.doc = pipeline.generate_document(owner, PAYLOAD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doc.signer)
+
+    def sign(self):
+        response = self.client.post(f'/signature/v1/sign/{self.doc.pk}/')
+        self.assertEqual(response.status_code, 201)
+        return SignedDocument.objects.get(original_document=self.doc)
+
+    def view(self, variant=None):
+        query = f'?variant={variant}' if variant else ''
+        response = self.client.get(f'/signature/v1/view/{self.doc.pk}/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+
+
+class SignDocumentTests(SigningTestCase):
+    def test_sign(self):
+        signed = self.sign()
+        self.doc.refresh_from_db()
+        self.assertTrue(self.doc.is_signed)
+        self.assertEqual(signed.signed_by, self.doc.signer)
+        self.assertEqual(StoredBlob.objects.get(name=signed.signed_pdf.name).refcount, 1)
+        self.assertEqual(OutboundEmail.objects.get(document=self.doc).to, ['alice@example.com'])
+
+        response = self.client.post(f'/signature/v1/sign/{self.doc.pk}/')
+        self.assertEqual(response.status_code, 400)
+
+    def referenced_blobs(self):
+        return dict(StoredBlob.objects.filter(refcount__gt=0).values_list('name', 'refcount'))
+
+    def test_failure_rolls_back_the_signature_and_its_files(self):
+        referenced = self.referenced_blobs()
+        with mock.patch.object(outbox, 'queue_email', side_effect=RuntimeError('boom')), \
+                self.assertLogs(signature_views.logger, 'ERROR'):
+            response = self.client.post(f'/signature/v1/sign/{self.doc.pk}/')
+        self.assertEqual(response.status_code, 500)
+        self.doc.refresh_from_db()
+        self.assertFalse(self.doc.is_signed)
+        self.assertFalse(SignedDocument.objects.exists())
+        self.assertEqual(self.referenced_blobs(), referenced)
+
+    def test_concurrently_signed_document_is_rejected(self):
+        # Another request signs between this one's check and its insert.
+        other = SignedDocument(original_document=self.doc, signed_by=self.doc.signer)
+        referenced = self.referenced_blobs()
+        original = signing.signed_pdfs
+
+        def sign_meanwhile(doc, text):
+            pdfs = original(doc, text)
+            other.save()
+            return pdfs
+
+        with mock.patch.object(signing, 'signed_pdfs', side_effect=sign_meanwhile), \
+                self.assertLogs(signing.logger, 'WARNING'):
+            response = self.client.post(f'/signature/v1/sign/{self.doc.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SignedDocument.objects.get().pk, other.pk)
+        self.assertEqual(self.referenced_blobs(), referenced)
+
+    def test_unnamed_document_can_be_signed(self):
+        self.assertEqual(signing.signed_file_stem(self.doc), 'Bob NDA')
+        GeneratedDocument.objects.filter(pk=self.doc.pk).update(name=None)
+        self.doc.refresh_from_db()
+        self.assertEqual(signing.signed_file_stem(self.doc), 'nda')
+        self.sign()
+
+    def test_bulk_sign(self):
+        second = GeneratedDocument.objects.get(pk=self.doc.pk)
+        second.pk = None
+        second.name = 'Second NDA'
+        second.is_signed = False
+        second.save()
+        response = self.client.post('/signature/v1/sign/bulk/', {'document_ids': [self.doc.pk, second.pk, 999]},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['signed'], 2)
+        self.assertEqual([r['status'] for r in response.data['results']], ['signed', 'signed', 'not_found'])
+        self.assertEqual(GeneratedDocument.objects.filter(is_signed=True).count(), 2)
+        self.assertEqual([email.to for email in OutboundEmail.objects.all()], [['alice@example.com']])
+
+
+class SignedEncryptedPDFTests(SigningTestCase):
+    def test_encrypted_variant_is_stamped_on_first_request(self):
+        signed = self.sign()
+        self.assertFalse(signed.signed_encrypted_pdf)
+
+        body = self.view('encrypted')
+        signed.refresh_from_db()
+        self.doc.refresh_from_db()
+        self.assertTrue(signed.signed_encrypted_pdf)
+        # Stamped onto the document's encrypted PDF, which was rendered for it.
+        with self.doc.encrypted_pdf.open('rb') as f:
+            self.assertTrue(body.startswith(f.read()))
+        self.assertIn('Signed by Bob Doe', PdfReader(io.BytesIO(body)).pages[-1].extract_text())
+
+        with mock.patch.object(artefacts, 'encrypted_pdf') as render:
+            self.assertEqual(self.view('encrypted'), body)
+        render.assert_not_called()
+
+    def test_encrypted_variant_rendered_before_signing_is_stamped_at_once(self):
+        encrypted = artefacts.encrypted_pdf(self.doc)
+        signed = self.sign()
+        self.assertTrue(signed.signed_encrypted_pdf)
+        self.assertTrue(self.view('encrypted').startswith(encrypted))
+
+    @override_settings(SIGNATURE_MODE='render')
+    def test_render_mode(self):
+        self.sign()
+        body = self.view('encrypted')
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertIn('Signed by Bob Doe', PdfReader(io.BytesIO(body)).pages[-1].extract_text())
+        self.assertNotEqual(body, self.view())
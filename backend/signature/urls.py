@@ -1,8 +1,9 @@
 from django.urls import path
-from signature.views import SignDocumentView, ViewSignedPDFView, SignedStatusView
+from signature.views import SignDocumentView, BulkSignDocumentView, ViewSignedPDFView, SignedStatusView
 
 urlpatterns = [
     path('sign/<int:pk>/', SignDocumentView.as_view(), name='sign-document'),
+    path('sign/bulk/', BulkSignDocumentView.as_view(), name='sign-documents-bulk'),
     path('view/<int:pk>/', ViewSignedPDFView.as_view(), name='view-signed-pdf'),
     path('status/<int:pk>/', SignedStatusView.as_view(), name='signed-status'),
 ]
\ No newline at end of file
@@ -0,0 +1,213 @@
+"""
+Producing signed PDFs, for one document or a batch.
+
+`signed_pdfs` stamps the stored PDFs (or re-renders them, see
+`SIGNATURE_MODE`); the signed encrypted PDF is produced on first use by
+`signed_encrypted_pdf`, like the document's own encrypted PDF. `sign_bulk` checks a whole batch against the signer in
+one query, produces the signed PDFs on a thread pool, writes every
+`SignedDocument` in one transaction and queues one digest email per owner.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
+
+from documents.models import GeneratedDocument
+from documents.utils import artefacts, pdf_pool, outbox, template_registry
+from signature.models import SignedDocument
+from signature.utils import stamp
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def signature_text_for(user) -> str:
+    return f"Signed by {f'{user.first_name} {user.last_name}'.strip()}"
+
+
+def stamp_pdfs(doc, signature_text):
+    """
+    Stamp the signature onto the stored plain PDF, and onto the encrypted
+    PDF if it has been rendered already (otherwise that variant is None).
+    """
+    with doc.plain_pdf.open('rb') as f:
+        plain = f.read()
+    encrypted = None
+    if doc.encrypted_pdf:
+        with doc.encrypted_pdf.open('rb') as f:
+            encrypted = stamp.stamp_signature(f.read(), doc.document_type, signature_text)
+    return stamp.stamp_signature(plain, doc.document_type, signature_text), encrypted
+
+
+def render_signed_pdfs(doc, signature_text):
+    """Re-render the plain PDF with the signature text in the template."""
+    template = template_registry.for_document(doc)
+    metadata = {**(doc.metadata or {}), 'signature_text': signature_text}
+    pdf, = pdf_pool.render_pdfs(template_registry.render_job(template, metadata))
+    return pdf, None
+
+
+def signed_pdfs(doc, signature_text):
+    """
+    Return the (plain, encrypted) signed PDFs for `doc`. The encrypted one
+    is only produced here when it is cheap, i.e. by stamping an encrypted
+    PDF that already exists; otherwise it is None and `signed_encrypted_pdf`
+    produces it when it is first asked for.
+    """
+    if settings.SIGNATURE_MODE == 'stamp' and doc.plain_pdf:
+        try:
+            return stamp_pdfs(doc, signature_text)
+        except stamp.StampError as e:
+            logger.warning(f"Stamping document {doc.id} failed, re-rendering: {str(e)}")
+    return render_signed_pdfs(doc, signature_text)
+
+
+def signed_encrypted_pdf(signed: SignedDocument) -> bytes:
+    """
+    The signed encrypted PDF of `signed`, produced and cached on first use:
+    the document's encrypted PDF (itself rendered on demand, see
+    `documents.utils.artefacts`) with the signature stamped on, or
+    re-rendered with the signature text when stamping is off or fails.
+    """
+    if signed.signed_encrypted_pdf:
+        try:
+            with signed.signed_encrypted_pdf.open('rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+    doc = signed.original_document
+    signature_text = signature_text_for(signed.signed_by)
+    pdf = None
+    if settings.SIGNATURE_MODE == 'stamp':
+        try:
+            pdf = stamp.stamp_signature(artefacts.encrypted_pdf(doc), doc.document_type, signature_text)
+        except stamp.StampError as e:
+            logger.warning(f"Stamping the encrypted PDF of document {doc.id} failed, re-rendering: {str(e)}")
+    if pdf is None:
+        template = template_registry.for_document(doc)
+        metadata = {**artefacts.encrypt_metadata(doc.metadata or {}), 'signature_text': signature_text}
+        pdf, = pdf_pool.render_pdfs(template_registry.render_job(template, metadata))
+
+    artefacts.store(signed, 'signed_encrypted_pdf', f"{signed_file_stem(doc)}_signed_encrypted.pdf", pdf)
+    return pdf
+
+
+def signed_file_stem(doc) -> str:
+    return ''.join(c for c in doc.name or doc.document_type if c.isalnum() or c in (' ', '_')).rstrip()
+
+
+def _build_signed(doc, user, pdfs) -> SignedDocument:
+    """Store the signed files and return an unsaved `SignedDocument` pointing at them."""
+    signed = SignedDocument(original_document=doc, signed_by=user)
+    stem = signed_file_stem(doc)
+    signed.signed_pdf.save(f"{stem}_signed.pdf", ContentFile(pdfs[0]), save=False)
+    if pdfs[1] is not None:
+        signed.signed_encrypted_pdf.save(f"{stem}_signed_encrypted.pdf", ContentFile(pdfs[1]), save=False)
+    return signed
+
+
+def _discard_files(signed: SignedDocument):
+    signed.signed_pdf.delete(save=False)
+    signed.signed_encrypted_pdf.delete(save=False)
+
+
+def _save_signed(rows: list) -> list:
+    """
+    Insert all rows in one statement. If another request signed one of the
+    documents meanwhile, fall back to row-by-row inserts so only the
+    conflicting documents fail. Returns the rows that were saved.
+    """
+    try:
+        with transaction.atomic():
+            SignedDocument.objects.bulk_create(rows)
+            GeneratedDocument.objects.filter(pk__in=[row.original_document_id for row in rows]).update(is_signed=True)
+        return rows
+    except IntegrityError:
+        logger.warning("Bulk signing hit an already-signed document, saving row by row")
+
+    saved = []
+    with transaction.atomic():
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.pk = None
+                    row.save()
+                saved.append(row)
+            except IntegrityError:
+                _discard_files(row)
+    return saved
+
+
+def notify_owners(signer, documents: list):
+    """Queue one digest email per owner listing the documents `signer` signed."""
+    by_owner = defaultdict(list)
+    for doc in documents:
+        by_owner[doc.owner_id].append(doc)
+
+    signer_name = f"{signer.first_name} {signer.last_name}".strip() or signer.username
+    for owned in by_owner.values():
+        names = "\n".join(f"- {doc.name or doc.document_type}" for doc in owned)
+        outbox.queue_email(
+            subject=f"{len(owned)} document(s) signed by {signer_name}",
+            body=f"{signer_name} has signed the following documents:\n\n{names}",
+            to=[owned[0].owner.email],
+            document=owned[0] if len(owned) == 1 else None,
+        )
+
+
+def _sign_one(doc, signature_text):
+    try:
+        return signed_pdfs(doc, signature_text), None
+    except pdf_pool.RendererBusy:
+        return None, 'The server is busy, please try again shortly.'
+    except Exception as e:
+        logger.error(f"[BulkSign] Failed to sign document {doc.id}: {str(e)}", exc_info=True)
+        return None, 'Failed to sign the document.'
+    finally:
+        connection.close()  # the template registry and blob storage query from this thread
+
+
+def sign_bulk(user, document_ids: list) -> list:
+    """Sign every document in `document_ids` for `user`. Returns one result per id, in order."""
+    documents = {
+        doc.id: doc
+        for doc in GeneratedDocument.objects.filter(pk__in=document_ids).select_related('owner')
+    }
+
+    results = {}
+    signable = []
+    for pk in dict.fromkeys(document_ids):
+        doc = documents.get(pk)
+        if doc is None:
+            results[pk] = {'id': pk, 'status': 'not_found'}
+        elif doc.signer_id != user.id:
+            results[pk] = {'id': pk, 'status': 'forbidden'}
+        elif doc.is_signed:
+            results[pk] = {'id': pk, 'status': 'already_signed'}
+        else:
+            signable.append(doc)
+
+    signature_text = signature_text_for(user)
+    with ThreadPoolExecutor(max_workers=settings.BULK_SIGN_WORKERS) as executor:
+        outcomes = list(executor.map(lambda doc: _sign_one(doc, signature_text), signable))
+
+    rows = []
+    for doc, (pdfs, error) in zip(signable, outcomes):
+        if error:
+            results[doc.id] = {'id': doc.id, 'status': 'error', 'error': error}
+        else:
+            rows.append(_build_signed(doc, user, pdfs))
+
+    saved = _save_signed(rows) if rows else []
+    for row in saved:
+        results[row.original_document_id] = {'id': row.original_document_id, 'status': 'signed', 'signed_at': row.signed_at}
+    for row in rows:
+        results.setdefault(row.original_document_id, {'id': row.original_document_id, 'status': 'already_signed'})
+
+    if saved:
+        notify_owners(user, [row.original_document for row in saved])
+    logger.info(f"Bulk signing by {user.username}: {len(saved)} of {len(document_ids)} document(s) signed")
+    return [results[pk] for pk in dict.fromkeys(document_ids)]
@@ -0,0 +1,96 @@
+"""
+Stamp signatures onto already-generated PDFs.
+
+Instead of re-rendering the template with `signature_text`, the signature is
+drawn on the recipient signature line of the existing PDF through a
+reportlab overlay and written as a PDF incremental update, so the signed
+file is the original bytes unchanged followed by the stamp.
+"""
+import io
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.units import cm
+from reportlab.pdfgen import canvas
+
+# Caption printed under the recipient signature line in each template.
+SIGNATURE_LABELS = {
+    'nda': 'Recipient Signature',
+    'offer': 'Signature',
+}
+
+STAMP_FONT = 'Times-Italic'
+SIGNATURE_LINE_WIDTH = 225  # 300px in the HTML templates
+MIN_FONT_SIZE = 8
+MAX_FONT_SIZE = 14
+
+
+class StampError(Exception):
+    pass
+
+
+def _text_runs(page) -> list:
+    """Return (text, x, y, font size) for every non-blank text run on `page`."""
+    runs = []
+
+    def visitor(text, cm_matrix, tm_matrix, font_dict, font_size):
+        if text.strip():
+            # Origin of the text matrix mapped through the current transformation matrix.
+            tx, ty = tm_matrix[4], tm_matrix[5]
+            x = tx * cm_matrix[0] + ty * cm_matrix[2] + cm_matrix[4]
+            y = tx * cm_matrix[1] + ty * cm_matrix[3] + cm_matrix[5]
+            size = font_size * abs(tm_matrix[3] * cm_matrix[3])
+            runs.append((text.strip(), x, y, size))
+
+    page.extract_text(visitor_text=visitor)
+    return runs
+
+
+def find_signature_position(reader: PdfReader, document_type: str):
+    """
+    Locate where the signature goes as (page index, x, y, font size).
+
+    The stamp is set on the baseline of the template's recipient signature
+    caption, just past the end of the signature line. Only the caption is
+    used as an anchor: it is a single short run in every engine, whereas the
+    positions pypdf reports for wrapped lines are not reliable. Documents
+    without a recipient signature block are stamped in the bottom margin of
+    the last page.
+    """
+    label = SIGNATURE_LABELS.get(document_type)
+    if label:
+        for page_index in reversed(range(len(reader.pages))):
+            captions = [run for run in _text_runs(reader.pages[page_index]) if run[0] == label]
+            if captions:
+                _, x, y, size = captions[-1]
+                size = max(MIN_FONT_SIZE, min(size, MAX_FONT_SIZE))
+                return page_index, x + SIGNATURE_LINE_WIDTH + size, y, size
+
+    return len(reader.pages) - 1, 2 * cm, 1.5 * cm, MIN_FONT_SIZE + 2
+
+
+def _overlay(width, height, x, y, size, text):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(width, height))
+    pdf.setFont(STAMP_FONT, size)
+    pdf.drawString(x, y, text)
+    pdf.save()
+    buffer.seek(0)
+    return PdfReader(buffer).pages[0]
+
+
+def stamp_signature(pdf_bytes: bytes, document_type: str, text: str) -> bytes:
+    """Return `pdf_bytes` with `text` stamped on the signature line, appended as an incremental update."""
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        page_index, x, y, size = find_signature_position(reader, document_type)
+
+        writer = PdfWriter(io.BytesIO(pdf_bytes), incremental=True)
+        page = writer.pages[page_index]
+        box = page.mediabox
+        page.merge_page(_overlay(float(box.width), float(box.height), x, y, size, text))
+
+        output = io.BytesIO()
+        writer.write(output)
+        return output.getvalue()
+    except Exception as e:
+        raise StampError(f"Could not stamp signature: {e}") from e
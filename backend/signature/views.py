@@ -3,19 +3,18 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
-from django.core.mail import send_mail
+from django.db import transaction
 from documents.models import GeneratedDocument
 from signature.models import SignedDocument
-from documents.utils import render_html, generate_pdf
-from signature.utils.decrypt import decrypt_value
-from django.http import FileResponse
+from documents.utils import pdf_pool, outbox, serving
+from signature.utils import signing
 from django.conf import settings
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+
 class SignDocumentView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -29,58 +28,64 @@ class SignDocumentView(APIView):
             if hasattr(doc, 'signed_version'):
                 return Response({'error': 'This document has already been signed.'}, status=400)
 
-            # Load the encrypted metadata
-            metadata = {
-                k: decrypt_value(str(v))
-                for k, v in doc.encrypted_metadata.items()
-            }
-
-            # Add signer info
             signer_name = f"{request.user.first_name} {request.user.last_name}".strip()
-            metadata['signature_text'] = f"Signed by {signer_name}"
-            plain_metadata = {k: decrypt_value(v) for k, v in doc.encrypted_metadata.items()}
-            plain_metadata['signature_text'] = f"Signed by {signer_name}"
-            
-            TEMPLATE_MATCH = {
-                'nda': 'nda',
-                'invoice': 'invoice',
-                'offer': 'offer_letter',
-            }
-            template_name = TEMPLATE_MATCH.get(doc.document_type, 'default_template')
-            template = f"{template_name}.html"
-
-            # Generate signed HTML → PDF
-            html_signed = render_html.render_html(template, plain_metadata)
-            signed_pdf = generate_pdf.generate_pdf_from_html(html_signed)
-
-            html_signed_enc = render_html.render_html(template, metadata)
-            signed_pdf_enc = generate_pdf.generate_pdf_from_html(html_signed_enc)
-
-            # Save new signed document
-            signed = SignedDocument.objects.create(
-                original_document=doc,
-                signed_by=request.user
-            )
-            cleaned_name = ''.join(c for c in doc.name if c.isalnum() or c in (' ', '_')).rstrip()
-            signed.signed_pdf.save(f"{cleaned_name}_signed.pdf", ContentFile(signed_pdf))
-            signed.signed_encrypted_pdf.save(f"{cleaned_name}_signed_encrypted.pdf", ContentFile(signed_pdf_enc))
-
-            # Notify owner
-            send_mail(
-                subject=f"Document Signed: {doc.name or doc.document_type}",
-                message=f"{signer_name} has signed your document: {doc.name or doc.document_type}.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[doc.owner.email],
-                fail_silently=True
-            )
+            signed_pdf, signed_pdf_enc = signing.signed_pdfs(doc, signing.signature_text_for(request.user))
+
+            # Save the signed copy and flag the document together; the files go if that fails.
+            signed = signing._build_signed(doc, request.user, (signed_pdf, signed_pdf_enc))
+            try:
+                with transaction.atomic():
+                    if not signing._save_signed([signed]):
+                        return Response({'error': 'This document has already been signed.'}, status=400)
+
+                    # Notify owner
+                    outbox.queue_email(
+                        subject=f"Document Signed: {doc.name or doc.document_type}",
+                        body=f"{signer_name} has signed your document: {doc.name or doc.document_type}.",
+                        to=[doc.owner.email],
+                        document=doc,
+                    )
+            except Exception:
+                signing._discard_files(signed)
+                raise
 
             logger.info(f"Document {doc.id} signed by {request.user.username}")
             return Response({'message': 'Document signed successfully.'}, status=201)
 
+        except pdf_pool.RendererBusy:
+            logger.warning(f"[SignDocumentView] PDF renderer busy, rejected document {pk}")
+            return Response({'error': 'The server is busy, please try again shortly.'}, status=503)
         except Exception as e:
             logger.error(f"[SignDocumentView] Error: {str(e)}", exc_info=True)
             return Response({'error': 'Failed to sign the document.'}, status=500)
 
+class BulkSignDocumentView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        document_ids = request.data.get('document_ids')
+        if not isinstance(document_ids, list) or not document_ids:
+            return Response({'error': "'document_ids' must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(document_ids) > settings.BULK_SIGN_MAX_DOCUMENTS:
+            return Response(
+                {'error': f"At most {settings.BULK_SIGN_MAX_DOCUMENTS} documents can be signed at once."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            document_ids = [int(pk) for pk in document_ids]
+        except (TypeError, ValueError):
+            return Response({'error': "'document_ids' must contain document ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = signing.sign_bulk(request.user, document_ids)
+            signed = sum(1 for result in results if result['status'] == 'signed')
+            return Response({'signed': signed, 'failed': len(results) - signed, 'results': results})
+
+        except Exception as e:
+            logger.error(f"[BulkSignDocumentView] Error: {str(e)}", exc_info=True)
+            return Response({'error': 'Failed to sign the documents.'}, status=500)
+
+
 class ViewSignedPDFView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -93,7 +98,22 @@ class ViewSignedPDFView(APIView):
         if not hasattr(doc, 'signed_version'):
             return Response({'error': 'Signed document not found.'}, status=404)
 
-        return FileResponse(doc.signed_version.signed_pdf.open('rb'), content_type='application/pdf')
+        signed = doc.signed_version
+        try:
+            if request.query_params.get('variant') == 'encrypted':
+                # Produced and cached on the first request for it.
+                if not signed.signed_encrypted_pdf:
+                    signing.signed_encrypted_pdf(signed)
+                return serving.serve_file(request, signed.signed_encrypted_pdf, 'application/pdf')
+
+            return serving.serve_file(request, signed.signed_pdf, 'application/pdf')
+
+        except pdf_pool.RendererBusy:
+            logger.warning(f"[ViewSignedPDF] PDF renderer busy, rejected document {pk}")
+            return Response({'error': 'The server is busy, please try again shortly.'}, status=503)
+        except Exception as e:
+            logger.error(f"[ViewSignedPDF] Failed to serve signed PDF for document {pk}: {str(e)}", exc_info=True)
+            return Response({'error': 'Failed to serve the signed PDF.'}, status=500)
 
 class SignedStatusView(APIView):
     permission_classes = [IsAuthenticated]
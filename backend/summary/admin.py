@@ -1,19 +1,28 @@
 from django.contrib import admin
-from .models import DocumentSummary
+from .models import DocumentSummary, SummaryResult
 
 @admin.register(DocumentSummary)
 class DocumentSummaryAdmin(admin.ModelAdmin):
-    list_display = ('document', 'generated_at')
+    list_display = ('document', 'status', 'attempts', 'generated_at')
+    list_filter = ('status',)
     search_fields = ('document__name',)
-    readonly_fields = ('generated_at',)
+    readonly_fields = ('status', 'text_hash', 'attempts', 'started_at', 'generated_at')
     fieldsets = (
         (None, {
-            'fields': ('document',)
+            'fields': ('document', 'status', 'text_hash', 'attempts')
         }),
         ('Summary Details', {
             'fields': ('terms', 'responsibilities', 'dates', 'signatures_required')
         }),
         ('Timestamps', {
-            'fields': ('generated_at',)
+            'fields': ('started_at', 'generated_at')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(SummaryResult)
+class SummaryResultAdmin(admin.ModelAdmin):
+    list_display = ('text_hash', 'status', 'uses', 'created_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('text_hash',)
+    readonly_fields = ('text_hash', 'status', 'result', 'error', 'uses', 'created_at', 'updated_at')
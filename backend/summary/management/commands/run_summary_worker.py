@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from documents.utils import template_registry
+from summary.utils import precompute
+
+
+class Command(BaseCommand):
+    help = "Compute queued document summaries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling.")
+        parser.add_argument('--max-jobs', type=int, default=0, help="Exit after processing this many summaries (0 = no limit).")
+        parser.add_argument('--poll-interval', type=float, default=settings.GENERATION_WORKER_POLL_INTERVAL,
+                            help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        processed = 0
+        template_registry.preload()
+        self.stdout.write("Summary worker started.")
+
+        while True:
+            precompute.requeue_stale()
+            summary = precompute.claim_next()
+
+            if summary is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            summary = precompute.run(summary)
+            processed += 1
+            self.stdout.write(f"Summary {summary.id} (document {summary.document_id}): {summary.status}")
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} summary job(s)."))
@@ -2,14 +2,55 @@ from django.db import models
 from documents.models import GeneratedDocument
 
 class DocumentSummary(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     document = models.OneToOneField(GeneratedDocument, on_delete=models.CASCADE, related_name='summary')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    text_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # key of the SummaryResult used
     
     terms = models.TextField(blank=True, null=True)
     responsibilities = models.TextField(blank=True, null=True)
     dates = models.JSONField(blank=True, null=True)  # e.g. { "effective": "...", "expiration": "..." }
     signatures_required = models.JSONField(blank=True, null=True)
 
+    attempts = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(blank=True, null=True)
     generated_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'generated_at']),
+        ]
+
+    def __str__(self):
+        return f"Summary for Document {self.document.id}"
+
+
+class SummaryResult(models.Model):
+    """
+    Model output for one normalized document text, shared by every document
+    with the same text. Values are stored as [[vN]] placeholders, so the
+    result holds no document data and each document fills in its own.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    text_hash = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    uses = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"Summary for Document {self.document.id}"
\ No newline at end of file
+        return f"Summary result {self.text_hash[:12]} ({self.status})"
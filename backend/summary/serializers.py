@@ -4,4 +4,4 @@ from summary.models import DocumentSummary
 class DocumentSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = DocumentSummary
-        fields = ['terms', 'responsibilities', 'dates', 'signatures_required', 'generated_at']
\ No newline at end of file
+        fields = ['status', 'terms', 'responsibilities', 'dates', 'signatures_required', 'generated_at']
\ No newline at end of file
@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from documents.models import GeneratedDocument
+from documents.tests import make_user
+from documents.utils import artefacts, encryption
+from summary.models import DocumentSummary, SummaryResult
+from summary.utils import precompute, summarizer
+
+RESULT = {
+    'terms': 'Confidentiality agreement with [[v1]].',
+    'responsibilities': '[[v1]] keeps the information secret.',
+    'dates': {'effective': '[[v2]]'},
+    'signatures_required': ['[[v1]]'],
+}
+
+
+@override_settings(SUMMARY_PRECOMPUTE='off', SUMMARY_JOB_MAX_ATTEMPTS=3, SUMMARY_JOB_TIMEOUT=300)
+class SharedSummaryTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('alice')
+        self.html = {}
+        html = mock.patch.object(artefacts, 'encrypted_html', side_effect=lambda doc: self.html[doc.pk])
+        html.start()
+        self.addCleanup(html.stop)
+        summarize = mock.patch.object(summarizer, 'summarize_text', return_value=RESULT)
+        self.summarize = summarize.start()
+        self.addCleanup(summarize.stop)
+
+    def document(self, recipient, date='2025-01-01', body='Non-Disclosure Agreement'):
+        doc = GeneratedDocument.objects.create(owner=self.owner, document_type='nda')
+        self.html[doc.pk] = (
+            f"<html><head><style>p {{ margin: 0 }}</style></head><body><h1>{body}</h1>"
+            f"<p>Recipient: {encryption.encrypt_value(recipient)}</p>"
+            f"<p>Effective: {encryption.encrypt_value(date)}</p></body></html>"
+        )
+        return doc
+
+    def summarize_document(self, doc):
+        summary = precompute.request_summary(doc)
+        self.assertTrue(precompute.claim(summary.pk))
+        return precompute.run(DocumentSummary.objects.select_related('document').get(pk=summary.pk))
+
+    def test_documents_with_the_same_text_share_one_result(self):
+        bob = self.summarize_document(self.document('Bob'))
+        carol = self.summarize_document(self.document('Carol', date='2026-02-02'))
+
+        self.summarize.assert_called_once()
+        self.assertNotIn('Bob', self.summarize.call_args.args[0])
+        self.assertEqual(bob.text_hash, carol.text_hash)
+        self.assertEqual(SummaryResult.objects.get().uses, 2)
+
+        # Each document fills the shared answer with its own encrypted values.
+        for summary, name, date in ((bob, 'Bob', '2025-01-01'), (carol, 'Carol', '2026-02-02')):
+            self.assertEqual(summary.status, 'ready')
+            self.assertEqual(encryption.decrypt_value(summary.signatures_required[0]), name)
+            self.assertEqual(encryption.decrypt_value(summary.dates['effective']), date)
+            self.assertNotIn(name, summary.terms)
+
+    def test_different_text_is_summarized_separately(self):
+        first = self.summarize_document(self.document('Bob'))
+        second = self.summarize_document(self.document('Bob', body='Offer Letter'))
+        self.assertEqual(self.summarize.call_count, 2)
+        self.assertNotEqual(first.text_hash, second.text_hash)
+
+    def test_hash_covers_the_prompt(self):
+        text = 'Recipient: [[v1]]'
+        before = precompute.text_hash(text)
+        with mock.patch.object(summarizer, 'FIELDS', summarizer.FIELDS + '\n- "parties": Who is involved.'):
+            self.assertNotEqual(precompute.text_hash(text), before)
+
+    def test_waits_for_a_result_computed_elsewhere(self):
+        first = self.summarize_document(self.document('Bob'))
+        result = SummaryResult.objects.get()
+        SummaryResult.objects.filter(pk=result.pk).update(status='running', result=None)
+
+        waiting = self.summarize_document(self.document('Carol'))
+        self.assertEqual((waiting.status, waiting.attempts), ('pending', 0))
+        self.assertEqual(waiting.text_hash, first.text_hash)
+
+        SummaryResult.objects.filter(pk=result.pk).update(status='done', result=RESULT)
+        self.assertEqual(self.summarize_document(waiting.document).status, 'ready')
+        self.summarize.assert_called_once()
+
+    def test_stale_running_result_is_taken_over(self):
+        self.summarize_document(self.document('Bob'))
+        SummaryResult.objects.update(status='running', result=None, updated_at=timezone.now() - timedelta(hours=1))
+
+        with self.assertLogs(precompute.logger, 'WARNING'):
+            summary = self.summarize_document(self.document('Carol'))
+        self.assertEqual(summary.status, 'ready')
+        self.assertEqual(self.summarize.call_count, 2)
+        self.assertEqual(SummaryResult.objects.get().status, 'done')
+
+    def test_failed_result_is_retried(self):
+        self.summarize.return_value = {'error': 'rate limited'}
+        with self.assertLogs(precompute.logger, 'WARNING'):
+            failed = self.summarize_document(self.document('Bob'))
+        self.assertEqual(failed.status, 'pending')
+        self.assertEqual(SummaryResult.objects.get().status, 'failed')
+
+        self.summarize.return_value = RESULT
+        self.assertEqual(self.summarize_document(failed.document).status, 'ready')
+        self.assertEqual(SummaryResult.objects.get().status, 'done')
+        self.assertEqual(self.summarize.call_count, 2)
+
+    def test_request_summary_shares_one_row(self):
+        doc = self.document('Bob')
+        with self.captureOnCommitCallbacks() as callbacks, override_settings(SUMMARY_PRECOMPUTE='thread'):
+            first = precompute.request_summary(doc)
+            second = precompute.request_summary(doc)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(len(callbacks), 1)
@@ -1,10 +1,7 @@
-from cryptography.fernet import Fernet
-from django.conf import settings
-
-fernet = Fernet(settings.FERNET_KEY.encode())
+from documents.utils import encryption
 
 def decrypt_value(value: str) -> str:
     try:
-        return fernet.decrypt(value.encode()).decode()
+        return encryption.decrypt_value(value)
     except Exception:
-        return value  # fallback if not encrypted or error
\ No newline at end of file
+        return value  # fallback if not encrypted or error
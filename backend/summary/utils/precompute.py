@@ -0,0 +1,198 @@
+"""
+Summaries computed ahead of time.
+
+Every new document gets a pending `DocumentSummary`. Depending on
+`SUMMARY_PRECOMPUTE` it is processed on an in-process thread pool right
+after the document is committed ('thread'), by `manage.py
+run_summary_worker` ('worker'), or only once someone asks for it ('off').
+
+The model only ever sees the extracted text with [[vN]] placeholders, so
+documents whose text matches share one `SummaryResult`, keyed by a hash of
+that text: the first one pays for the AI call, the others reuse its answer
+with their own encrypted values filled in.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from documents.utils import artefacts
+from summary.models import DocumentSummary, SummaryResult
+from summary.utils import summarizer
+
+import logging
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=settings.SUMMARY_MAX_CONCURRENCY, thread_name_prefix='summary')
+
+
+def text_hash(text: str) -> str:
+    # The prompt is part of the key, so changing it invalidates earlier results.
+    material = '\x00'.join([summarizer.MODEL, summarizer.SYSTEM_MSG, summarizer.FIELDS, text])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=settings.SUMMARY_JOB_TIMEOUT)
+
+
+def _schedule(summary_id: int):
+    if settings.SUMMARY_PRECOMPUTE != 'worker':
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, summary_id))
+
+
+def request_summary(doc) -> DocumentSummary:
+    """
+    Return the summary of `doc`, queueing it if it doesn't exist yet or
+    failed before. Concurrent requests share one row and one computation.
+
+    Without a worker nothing calls `requeue_stale`, so a summary left running
+    or waiting past `SUMMARY_JOB_TIMEOUT` (say its process died) is picked up
+    again here; the claim keeps it from running twice.
+    """
+    try:
+        with transaction.atomic():
+            summary, created = DocumentSummary.objects.get_or_create(document=doc)
+    except IntegrityError:
+        summary, created = DocumentSummary.objects.get(document=doc), False
+
+    if created:
+        _schedule(summary.id)
+    elif summary.status == 'failed' and DocumentSummary.objects.filter(pk=summary.pk, status='failed').update(status='pending'):
+        summary.status = 'pending'
+        _schedule(summary.id)
+    elif summary.status in ('pending', 'running') and settings.SUMMARY_PRECOMPUTE != 'worker':
+        cutoff = _stale_cutoff()
+        if (summary.started_at or summary.generated_at) < cutoff:
+            if summary.status == 'running':
+                status = 'failed' if summary.attempts >= settings.SUMMARY_JOB_MAX_ATTEMPTS else 'pending'
+                if not DocumentSummary.objects.filter(pk=summary.pk, status='running', started_at__lt=cutoff).update(status=status):
+                    return summary
+                summary.status = status
+            if summary.status == 'pending':
+                _schedule(summary.id)
+    return summary
+
+
+def on_document_created(doc):
+    if settings.SUMMARY_PRECOMPUTE != 'off':
+        request_summary(doc)
+
+
+def claim(summary_id: int) -> bool:
+    return bool(DocumentSummary.objects.filter(pk=summary_id, status='pending').update(
+        status='running',
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    ))
+
+
+def claim_next():
+    pending = (
+        DocumentSummary.objects.filter(status='pending')
+        .order_by('generated_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for summary_id in pending:
+        if claim(summary_id):
+            return DocumentSummary.objects.select_related('document').get(pk=summary_id)
+    return None
+
+
+def requeue_stale() -> int:
+    """Return summaries (and shared results) whose worker died mid-run to the queue."""
+    cutoff = _stale_cutoff()
+    SummaryResult.objects.filter(status='running', updated_at__lt=cutoff).update(status='failed', error='Timed out.')
+    stale = DocumentSummary.objects.filter(status='running', started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=settings.SUMMARY_JOB_MAX_ATTEMPTS).update(status='failed')
+    requeued = stale.update(status='pending')
+    if failed or requeued:
+        logger.warning(f"Stale summaries: {requeued} requeued, {failed} failed")
+    return requeued
+
+
+def _shared_result(key: str, text: str):
+    """
+    The model output for `text`: reused if already computed, computed here
+    if nobody else is on it, None if another worker is computing it now.
+    A result running for longer than `SUMMARY_JOB_TIMEOUT` is presumed
+    abandoned and taken over.
+    """
+    entry, created = SummaryResult.objects.get_or_create(text_hash=key)
+    if not created:
+        if entry.status == 'done':
+            SummaryResult.objects.filter(pk=entry.pk).update(uses=F('uses') + 1)
+            return entry.result
+        if entry.status == 'running':
+            taken = SummaryResult.objects.filter(pk=entry.pk, status='running', updated_at__lt=_stale_cutoff())
+            if not taken.update(updated_at=timezone.now()):
+                return None
+            logger.warning(f"Taking over stale summary result {key[:12]}")
+        # A failed result is retried by whoever claims it first.
+        elif not SummaryResult.objects.filter(pk=entry.pk, status='failed').update(status='running', updated_at=timezone.now()):
+            return None
+
+    try:
+        result = summarizer.summarize_text(text)
+    except Exception as e:
+        result = {'error': str(e)}
+    if 'error' in result:
+        SummaryResult.objects.filter(pk=entry.pk).update(status='failed', error=str(result['error']), result=None)
+    else:
+        SummaryResult.objects.filter(pk=entry.pk).update(status='done', result=result, error=None, uses=F('uses') + 1)
+    return result
+
+
+def run(summary: DocumentSummary) -> DocumentSummary:
+    """Fill in a claimed summary. Returns it pending again if its text is being summarised elsewhere."""
+    try:
+        text, tokens = summarizer.extract_text(artefacts.encrypted_html(summary.document))
+        key = text_hash(text)
+        result = _shared_result(key, text)
+    except Exception as e:
+        logger.error(f"[Summary {summary.id}] Failed: {str(e)}", exc_info=True)
+        result, key = {'error': str(e)}, summary.text_hash
+
+    summary.text_hash = key
+    if result is None:
+        summary.status = 'pending'
+        summary.attempts -= 1  # waiting for another worker isn't a failed attempt
+    elif 'error' in result:
+        summary.status = 'failed' if summary.attempts >= settings.SUMMARY_JOB_MAX_ATTEMPTS else 'pending'
+        logger.warning(f"Summary {summary.id} failed (attempt {summary.attempts}): {result['error']}")
+    else:
+        result = summarizer.restore_tokens(result, tokens)
+        summary.terms = result.get('terms', '')
+        summary.responsibilities = result.get('responsibilities', '')
+        summary.dates = result.get('dates', {})
+        summary.signatures_required = result.get('signatures_required', [])
+        summary.status = 'ready'
+    summary.save()
+
+    if result is not None and 'error' not in result:
+        logger.info(f"Generated summary for document {summary.document_id}")
+    return summary
+
+
+def _run_in_thread(summary_id: int):
+    try:
+        if not claim(summary_id):
+            return
+        summary = run(DocumentSummary.objects.select_related('document').get(pk=summary_id))
+        if summary.status == 'pending':
+            # Retry after an error, or now if the text it waited for finished meanwhile.
+            if not SummaryResult.objects.filter(text_hash=summary.text_hash, status='running').exists():
+                _executor.submit(_run_in_thread, summary_id)
+        else:
+            # Documents that waited for this text can be filled in from the shared result now.
+            waiting = DocumentSummary.objects.filter(text_hash=summary.text_hash, status='pending')
+            for waiting_id in waiting.values_list('id', flat=True):
+                _executor.submit(_run_in_thread, waiting_id)
+    except Exception as e:
+        logger.error(f"[Summary {summary_id}] {str(e)}", exc_info=True)
+    finally:
+        connection.close()
@@ -1,46 +1,262 @@
-from openai import OpenAI
-from django.conf import settings
-import re
+"""
+Summaries of encrypted documents.
+
+The rendered HTML is mostly markup, CSS and long Fernet tokens, none of
+which helps the model. `extract_text` keeps only the readable structure
+(headings, paragraphs, list items, table rows) and swaps every token for a
+short placeholder such as `[[v3]]`; the placeholders are put back into the
+model's answer, so values stay encrypted end to end.
+
+Text that fits in `SUMMARY_MAX_INPUT_TOKENS` is summarised in one call.
+Longer text is split into chunks that are summarised concurrently (map)
+and the partial summaries are then merged (reduce).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 import json
+import math
+import re
 
-openai = OpenAI(api_key=settings.OPENAI_API_KEY)
+from django.conf import settings
+
+from documents.utils import ai_client, encryption
+
+import logging
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4o-mini"
+SYSTEM_MSG = (
+    "You are an assistant that summarizes encrypted legal/business documents "
+    "and extracts structured summaries for easy review. Values shown as [[vN]] "
+    "are encrypted; copy them verbatim when you use them."
+)
+FIELDS = """Return a JSON object with the following fields:
+- "terms": A brief explanation of the main agreement or legal terms.
+- "responsibilities": What each party is expected to do or avoid.
+- "dates": Important dates such as effective date, expiration, or signing date.
+- "signatures_required": Names or roles of signers required for this document.
+
+If any field is missing, leave it as null or an empty string."""
+
+PLACEHOLDER_RE = re.compile(r'\[\[v(\d+)\]\]')
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'br', 'tr', 'table', 'ul', 'ol', 'header', 'footer', 'title'}
+SKIP_TAGS = {'style', 'script', 'head', 'noscript', 'template'}
 
-def summarize_encrypted_html(html_content: str) -> dict:
-    system_msg = (
-        "You are an assistant that summarizes encrypted HTML legal/business documents "
-        "and extracts structured summaries for easy review."
-    )
 
-    prompt = f"""
-    Below is an encrypted HTML document.
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
 
-    Extract and return a structured JSON object with the following fields:
-    - "terms": A brief explanation of the main agreement or legal terms.
-    - "responsibilities": What each party is expected to do or avoid.
-    - "dates": Important dates such as effective date, expiration, or signing date.
-    - "signatures_required": Names or roles of signers required for this document.
 
-    If any field is missing from the document, leave it as null or an empty string.
+def estimate_prompt_tokens(*messages: str) -> int:
+    return sum(estimate_tokens(m) + MESSAGE_OVERHEAD_TOKENS for m in messages)
 
-    ### ENCRYPTED HTML:
-    {html_content}
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._current = []
+        self._prefix = ''
+        self._skip = 0
+        self._cells = None
+
+    def _flush(self):
+        text = ' '.join(''.join(self._current).split())
+        if text:
+            self.blocks.append(self._prefix + text)
+        self._current = []
+        self._prefix = ''
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif re.fullmatch(r'h[1-6]', tag):
+            self._flush()
+            self._prefix = '#' * int(tag[1]) + ' '
+        elif tag == 'li':
+            self._flush()
+            self._prefix = '- '
+        elif tag == 'tr':
+            self._flush()
+            self._cells = []
+        elif tag in ('td', 'th') and self._cells is not None:
+            self._current = []
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in ('td', 'th') and self._cells is not None:
+            self._cells.append(' '.join(''.join(self._current).split()))
+            self._current = []
+        elif tag == 'tr' and self._cells is not None:
+            row = ' | '.join(cell for cell in self._cells if cell)
+            if row:
+                self.blocks.append(row)
+            self._cells = None
+        elif tag in BLOCK_TAGS or tag == 'li' or re.fullmatch(r'h[1-6]', tag):
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_text(html_content: str) -> tuple:
     """
+    Reduce `html_content` to its readable text, one block per line. Returns
+    (text, tokens) where `tokens` maps each placeholder to the Fernet token
+    it replaced.
+    """
+    parser = _TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+
+    tokens = {}
+    seen = {}
+
+    def placeholder(match):
+        token = match.group(0)
+        if token not in seen:
+            seen[token] = f"[[v{len(seen) + 1}]]"
+            tokens[seen[token]] = token
+        return seen[token]
+
+    text = '\n'.join(parser.blocks)
+    return encryption.TOKEN_RE.sub(placeholder, text), tokens
+
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
+def restore_tokens(value, tokens: dict):
+    """Put the Fernet tokens back in place of their placeholders, anywhere in `value`."""
+    if isinstance(value, str):
+        return PLACEHOLDER_RE.sub(lambda m: tokens.get(m.group(0), m.group(0)), value)
+    if isinstance(value, list):
+        return [restore_tokens(item, tokens) for item in value]
+    if isinstance(value, dict):
+        return {key: restore_tokens(item, tokens) for key, item in value.items()}
+    return value
+
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """Split `text` on line boundaries into chunks of at most about `max_tokens`."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, size = [], [], 0
+    for line in text.split('\n'):
+        # A single oversized block is cut on word boundaries.
+        while len(line) > max_chars:
+            cut = line.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.extend(['\n'.join(current)] if current else [])
+            current, size = [], 0
+            chunks.append(line[:cut])
+            line = line[cut:].lstrip()
+        if size + len(line) + 1 > max_chars and current:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _parse(content: str) -> dict:
+    content = content.strip()
+    if content.startswith("```"):
+        content = re.sub(r"^```[a-zA-Z]*\n?", "", content)
+        content = content.rstrip("`").rstrip()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return {"error": "AI returned non-JSON content", "raw": content}
+
+
+def _complete(prompt: str) -> dict:
+    response = ai_client.chat_completion(
+        model=MODEL,
         messages=[
-            {"role": "system", "content": system_msg},
+            {"role": "system", "content": SYSTEM_MSG},
             {"role": "user", "content": prompt}
         ],
         temperature=0.3
     )
+    return _parse(response.choices[0].message.content)
 
-    content = response.choices[0].message.content.strip()
-    if content.startswith("```"):
-            content = re.sub(r"^```[a-zA-Z]*\n?", "", content)
-            content = content.rstrip("`").rstrip()
 
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        return {"error": "AI returned non-JSON content", "raw": content}
\ No newline at end of file
+def _summarize_part(text: str, part: int = None, parts: int = None) -> dict:
+    scope = f"part {part} of {parts} of a document" if parts else "a document"
+    return _complete(f"Below is the text of {scope}.\n\n{FIELDS}\n\n### DOCUMENT:\n{text}")
+
+
+def _merge(partials: list) -> dict:
+    """Reduce partial summaries to one, in groups if they don't fit in one call."""
+    budget = settings.SUMMARY_MAX_INPUT_TOKENS
+    while len(partials) > 1:
+        groups, group = [], []
+        for partial in partials:
+            encoded = json.dumps(partial, ensure_ascii=False)
+            if group and estimate_tokens(json.dumps(group, ensure_ascii=False) + encoded) > budget:
+                groups.append(group)
+                group = []
+            group.append(partial)
+        groups.append(group)
+        if len(groups) == len(partials):
+            groups = [partials]  # every partial alone exceeds the budget; merge them anyway
+
+        partials = _map(
+            lambda group: group[0] if len(group) == 1 else _complete(
+                "Below are summaries of consecutive parts of one document, in order. "
+                f"Merge them into a single summary of the whole document.\n\n{FIELDS}\n\n"
+                f"### PARTIAL SUMMARIES:\n{json.dumps(group, ensure_ascii=False)}"
+            ),
+            groups,
+        )
+        failed = next((partial for partial in partials if "error" in partial), None)
+        if failed:
+            return failed
+    return partials[0]
+
+
+def _map(function, items: list) -> list:
+    if len(items) == 1:
+        return [function(items[0])]
+    with ThreadPoolExecutor(max_workers=min(settings.SUMMARY_MAX_CONCURRENCY, len(items))) as executor:
+        return list(executor.map(function, items))
+
+
+def summarize_text(text: str) -> dict:
+    """Summarise extracted document text, map-reducing it when it exceeds the input budget."""
+    budget = settings.SUMMARY_MAX_INPUT_TOKENS
+    if estimate_prompt_tokens(SYSTEM_MSG, FIELDS, text) <= budget:
+        return _summarize_part(text)
+
+    chunk_budget = budget - estimate_prompt_tokens(SYSTEM_MSG, FIELDS) - 50
+    chunks = chunk_text(text, chunk_budget)
+    logger.info(f"Summarizing {estimate_tokens(text)} estimated tokens in {len(chunks)} chunk(s)")
+
+    partials = _map(lambda item: _summarize_part(item[1], item[0] + 1, len(chunks)), list(enumerate(chunks)))
+    failed = next((partial for partial in partials if "error" in partial), None)
+    if failed:
+        return failed
+    return _merge(partials)
+
+
+def summarize_encrypted_html(html_content: str) -> dict:
+    text, tokens = extract_text(html_content)
+    logger.info(
+        f"Summary input reduced from ~{estimate_tokens(html_content)} to ~{estimate_tokens(text)} tokens"
+    )
+    result = summarize_text(text)
+    if "error" in result:
+        return result
+    return restore_tokens(result, tokens)
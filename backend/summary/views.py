@@ -3,10 +3,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from summary.models import DocumentSummary
 from documents.models import GeneratedDocument
 from summary.serializers import DocumentSummarySerializer
-from summary.utils.summarizer import summarize_encrypted_html
+from summary.utils import precompute
 from summary.utils.decrypt import decrypt_value
 import logging
 
@@ -22,31 +21,11 @@ class GenerateDocumentSummaryView(APIView):
             if doc.signer != request.user:
                 return Response({'error': 'You are not authorized to summarize this document.'}, status=403)
 
-            if hasattr(doc, 'summary'):
-                return Response({'message': 'Summary already exists for this document.'}, status=400)
-
-            html_path = doc.encrypted_html.path if doc.encrypted_html else None
-            try:
-                with open(html_path, 'r', encoding='utf-8') as f:
-                    encrypted_html = f.read()
-            except FileNotFoundError:
-                return Response({'error': 'Encrypted HTML not found.'}, status=404)
-
-            result = summarize_encrypted_html(encrypted_html)
-
-            if "error" in result:
-                return Response(result, status=500)
-
-            summary = DocumentSummary.objects.create(
-                document=doc,
-                terms=result.get("terms", ""),
-                responsibilities=result.get("responsibilities", ""),
-                dates=result.get("dates", {}),
-                signatures_required=result.get("signatures_required", []),
-            )
-
-            logger.info(f"Generated summary for document {doc.id}")
-            return Response(DocumentSummarySerializer(summary).data, status=201)
+            # Usually precomputed when the document was created; otherwise queued now.
+            summary = precompute.request_summary(doc)
+            if summary.status != 'ready':
+                return Response({'status': 'pending'}, status=202)
+            return Response(DocumentSummarySerializer(summary).data)
 
         except Exception as e:
             logger.error(f"[GenerateDocumentSummaryView] {str(e)}", exc_info=True)
@@ -65,6 +44,10 @@ class ViewDocumentSummaryView(APIView):
 
             if not hasattr(doc, 'summary'):
                 return Response({'error': 'Summary not available.'}, status=404)
+            if doc.summary.status == 'failed':
+                return Response({'status': 'failed', 'error': 'Failed to generate summary.'}, status=500)
+            if doc.summary.status != 'ready':
+                return Response({'status': 'pending'}, status=202)
 
             summary_data = DocumentSummarySerializer(doc.summary).data
 
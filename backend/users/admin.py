@@ -1,12 +1,42 @@
 from django.contrib import admin
+from django.db.models import Q
 from users.models import User
+from users.utils import search_index
+
+
+class EncryptedUserSearchMixin:
+    """
+    Extends admin search to the encrypted name/email fields of the users
+    reached through `encrypted_search_lookups` (e.g. 'owner', 'signer'), via
+    the searchable-encryption index. Use '' to search the model itself.
+    """
+    encrypted_search_lookups = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term or not self.encrypted_search_lookups:
+            return results, may_have_duplicates
+
+        user_ids = search_index.search_users(User.objects.all(), search_term).values('pk')
+        condition = Q()
+        for lookup in self.encrypted_search_lookups:
+            condition |= Q(**{f"{lookup}__in" if lookup else 'pk__in': user_ids})
+        return results | queryset.filter(condition), may_have_duplicates
+
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(EncryptedUserSearchMixin, admin.ModelAdmin):
     list_display = ('username', 'masked_email', 'role', 'is_active', 'is_staff')
     search_fields = ('username',)
+    encrypted_search_lookups = ('',)
     list_filter = ('role', 'is_active', 'is_staff')
     ordering = ('username',)
+    actions = ['revoke_tokens']
+
+    @admin.action(description="Revoke issued access tokens")
+    def revoke_tokens(self, request, queryset):
+        for user in queryset:
+            user.revoke_tokens()
 
     def masked_email(self, obj):
         try:
@@ -0,0 +1,40 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.utils import user_cache
+
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+class VersionedAccessToken(AccessToken):
+    """Access token carrying the user's `token_version`; bumping it revokes the token."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` with the user served from `users.utils.user_cache`."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # Tokens issued before versions existed count as version 0.
+        token_version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        user = user_cache.get_user(user_id, token_version)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if user.token_version != token_version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
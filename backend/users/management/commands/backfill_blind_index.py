@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from users.models import User
+from users.utils import blind_index, search_index
+
+
+class Command(BaseCommand):
+    help = "Compute the email blind index and search tokens for users missing them (or all users with --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute every row, e.g. after changing BLIND_INDEX_KEY.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.only('id', *search_index.SEARCHABLE_FIELDS).order_by('pk')
+        if not options['all']:
+            users = users.filter(Q(email_index__isnull=True) | Q(search_tokens__isnull=True)).distinct()
+
+        batch, updated = [], 0
+        for user in users.iterator(chunk_size=options['batch_size']):
+            user.email_index = blind_index.email_index(user.email)
+            search_index.index_user(user)
+            batch.append(user)
+            if len(batch) >= options['batch_size']:
+                updated += User.objects.bulk_update(batch, ['email_index'])
+                batch = []
+        if batch:
+            updated += User.objects.bulk_update(batch, ['email_index'])
+
+        self.stdout.write(self.style.SUCCESS(f"Updated blind indexes for {updated} user(s)."))
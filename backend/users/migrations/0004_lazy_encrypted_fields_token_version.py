@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:42
+
+import documents.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=documents.fields.lazy_encrypt(models.EmailField(max_length=254, unique=True)),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='first_name',
+            field=documents.fields.lazy_encrypt(models.CharField(blank=True, max_length=150)),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='last_name',
+            field=documents.fields.lazy_encrypt(models.CharField(blank=True, max_length=150)),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import migrations
+
+
+def replace_raw_passwords(apps, schema_editor):
+    """
+    Signers used to be created with a random password stored as-is; replace
+    any password that isn't a hash with an unusable one.
+    """
+    User = apps.get_model('users', 'User')
+    raw = []
+    for user in User.objects.only('pk', 'password').iterator():
+        if not user.password or user.password.startswith('!'):
+            continue
+        try:
+            identify_hasher(user.password)
+        except ValueError:
+            user.password = make_password(None)
+            raw.append(user)
+    User.objects.bulk_update(raw, ['password'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_lazy_encrypted_fields_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_raw_passwords, migrations.RunPython.noop),
+    ]
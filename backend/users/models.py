@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django_cryptography.fields import encrypt
+from django.db import models, transaction
+from django.db.models import F
+from documents.fields import Ciphertext, lazy_encrypt
+from users.utils import blind_index, search_index, user_cache
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -10,9 +12,69 @@ class User(AbstractUser):
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
 
-    email = encrypt(models.EmailField(unique=True))
-    first_name = encrypt(models.CharField(max_length=150, blank=True))
-    last_name = encrypt(models.CharField(max_length=150, blank=True))
+    # Decrypted on first access, so loading a user for authentication doesn't pay for them
+    email = lazy_encrypt(models.EmailField(unique=True))
+    first_name = lazy_encrypt(models.CharField(max_length=150, blank=True))
+    last_name = lazy_encrypt(models.CharField(max_length=150, blank=True))
+
+    # Carried in access tokens; bumping it revokes every token issued before
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # HMAC of the normalized email, see users/utils/blind_index.py
+    email_index = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Remembered so save() can tell when access changed.
+        if all(field in user.__dict__ for field in user_cache.ACCESS_FIELDS):
+            user._loaded_access = tuple(user.__dict__[field] for field in user_cache.ACCESS_FIELDS)
+        return user
+
+    def save(self, *args, **kwargs):
+        # An email that was never read hasn't changed, and neither has its index.
+        if not isinstance(self.__dict__.get('email'), Ciphertext):
+            self.email_index = blind_index.email_index(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_index'}
+
+        # New tokens carry the new version, so every process's cached copy stops matching them.
+        access = tuple(getattr(self, field) for field in user_cache.ACCESS_FIELDS)
+        loaded = getattr(self, '_loaded_access', None)
+        access_changed = loaded is not None and access != loaded and (
+            update_fields is None or set(update_fields) & set(user_cache.ACCESS_FIELDS)
+        )
+        if access_changed:
+            self.token_version = F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
+        if access_changed:
+            self.refresh_from_db(fields=['token_version'])
+        self._loaded_access = access
+
+        if update_fields is None or set(update_fields) & set(search_index.SEARCHABLE_FIELDS):
+            search_index.index_user(self)
+
+        pk = self.pk
+        transaction.on_commit(lambda: user_cache.invalidate(pk))
+
+    def revoke_tokens(self):
+        User.objects.filter(pk=self.pk).update(token_version=F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        pk = self.pk
+        transaction.on_commit(lambda: user_cache.invalidate(pk))
+
+
+class UserSearchToken(models.Model):
+    """HMAC of a token or token prefix of an encrypted user field, see users/utils/search_index.py."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    field = models.CharField(max_length=20)
+    digest = models.CharField(max_length=64, db_index=True)
+
+    def __str__(self):
+        return f"{self.field} token for {self.user_id}"
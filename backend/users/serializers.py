@@ -1,9 +1,6 @@
 from rest_framework import serializers
 from users.models import User
-from django.contrib.auth.password_validation import validate_password
-
-from rest_framework import serializers
-from users.models import User
+from users.utils import blind_index
 from django.contrib.auth.password_validation import validate_password
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -21,10 +18,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         }
 
     def validate_email(self, value):
-        # Manual uniqueness check
-        for user in User.objects.all():
-            if user.email == value:
-                raise serializers.ValidationError("This email is already in use.")
+        # Encrypted emails can't be compared in SQL, so uniqueness goes through the blind index
+        if User.objects.filter(email_index=blind_index.email_index(value)).exists():
+            raise serializers.ValidationError("This email is already in use.")
         return value
 
     def validate(self, attrs):
@@ -40,4 +36,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'email', 'first_name', 'last_name', 'role']
-        read_only_fields = ['username', 'role']
\ No newline at end of file
+        read_only_fields = ['username', 'role']
+
+class UserLookupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'role']
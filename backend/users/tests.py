@@ -1,3 +1,178 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 
-# Create your tests here.
+from users.authentication import CachedJWTAuthentication, VersionedAccessToken
+from users.models import User, UserSearchToken
+from users.utils import blind_index, search_index, user_cache
+
+
+def make_user(username, email, first_name, last_name):
+    return User.objects.create_user(
+        username=username, email=email, password='pw12345678',
+        first_name=first_name, last_name=last_name,
+    )
+
+
+@override_settings(BLIND_INDEX_KEY='test-blind-index-key')
+class BlindIndexTests(TestCase):
+    def setUp(self):
+        self.jane = make_user('jane', 'Jane.Doe@Example.com', 'Jane', 'Doe')
+        self.john = make_user('john', 'john@example.com', 'John', 'Smith')
+
+    def test_email_index_is_normalized(self):
+        self.assertEqual(blind_index.email_index(' jane.doe@EXAMPLE.com '), self.jane.email_index)
+        self.assertIsNone(blind_index.email_index(''))
+
+    def test_lookup_by_email(self):
+        found = User.objects.filter(email_index=blind_index.email_index('jane.doe@example.com'))
+        self.assertEqual(list(found), [self.jane])
+        self.assertFalse(User.objects.filter(email_index=blind_index.email_index('nobody@example.com')).exists())
+
+    def test_index_does_not_contain_plaintext(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT email, email_index FROM {User._meta.db_table} WHERE id = %s", [self.jane.pk])
+            email, index = cursor.fetchone()
+        self.assertNotIn('jane', str(email).lower())
+        self.assertNotIn('jane', index)
+
+    def test_index_depends_on_key(self):
+        with override_settings(BLIND_INDEX_KEY='another-key'):
+            self.assertNotEqual(blind_index.email_index('jane.doe@example.com'), self.jane.email_index)
+
+    def test_changing_email_updates_index(self):
+        self.jane.email = 'jane@example.org'
+        self.jane.save()
+        self.assertEqual(User.objects.get(email_index=blind_index.email_index('jane@example.org')), self.jane)
+
+    def test_registration_rejects_a_taken_email(self):
+        response = APIClient().post('/users/v1/register/', {
+            'username': 'jane2', 'email': 'JANE.DOE@example.com', 'first_name': 'Jane', 'last_name': 'Doe',
+            'password': 'Str0ng-passw0rd', 'confirm_password': 'Str0ng-passw0rd', 'role': 'signer',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+
+
+@override_settings(BLIND_INDEX_KEY='test-blind-index-key')
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.jane = make_user('jane', 'Jane.Doe@Example.com', 'Jane', 'Doe')
+        self.john = make_user('john', 'john@example.com', 'John', 'Smith')
+        self.mary = make_user('mary', 'mj@example.org', 'Mary-Jane', "O'Brien")
+
+    def search(self, query, **kwargs):
+        return set(search_index.search_users(User.objects.all(), query, **kwargs))
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('ja'), {self.jane, self.mary})
+        self.assertEqual(self.search('jo'), {self.john})
+        self.assertEqual(self.search('DOE'), {self.jane})
+        self.assertEqual(self.search('jane do'), {self.jane})
+        self.assertEqual(self.search('example.com'), {self.jane, self.john})
+
+    def test_punctuated_terms(self):
+        self.assertEqual(self.search('Mary-Jane'), {self.mary})
+        self.assertEqual(self.search('mary-ja'), {self.mary})
+        self.assertEqual(self.search("O'Brien"), {self.mary})
+        self.assertEqual(self.search("o'bri"), {self.mary})
+        self.assertEqual(self.search('jane.doe'), {self.jane})
+        self.assertEqual(self.search('mary-john'), set())
+
+    def test_punctuated_exact_search(self):
+        self.assertEqual(self.search("o'brien", mode='exact'), {self.mary})
+        self.assertEqual(self.search('mary-jane', mode='exact', fields=['first_name']), {self.mary})
+        self.assertEqual(self.search('mary-ja', mode='exact'), set())
+
+    def test_prefix_search_is_limited_to_fields(self):
+        self.assertEqual(self.search('smi', fields=['first_name']), set())
+        self.assertEqual(self.search('smi', fields=['last_name']), {self.john})
+
+    def test_short_terms_match_nothing(self):
+        self.assertEqual(self.search('j'), set())
+        self.assertEqual(self.search(''), set())
+
+    def test_exact_search(self):
+        self.assertEqual(self.search('jan', mode='exact'), set())
+        self.assertEqual(self.search('jane', mode='exact'), {self.jane, self.mary})
+        self.assertEqual(self.search('jane.doe@example.com', mode='exact', fields=['email']), {self.jane})
+
+    def test_renamed_user_is_reindexed(self):
+        self.john.first_name = 'Jonas'
+        self.john.save()
+        self.assertEqual(self.search('jonas'), {self.john})
+        self.assertEqual(self.search('john', fields=['first_name']), set())
+        self.assertFalse(UserSearchToken.objects.filter(
+            user=self.john, digest=search_index.token_digest('first_name', 'john'),
+        ).exists())
+
+
+@override_settings(AUTH_USER_CACHE_ALIAS='default', AUTH_USER_CACHE_TTL=60)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.user = make_user('jane', 'jane@example.com', 'Jane', 'Doe')
+        self.token = VersionedAccessToken.for_user(self.user)
+
+    def authenticate(self, token=None):
+        return CachedJWTAuthentication().get_user(token or self.token)
+
+    def save(self, user, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save(**kwargs)
+
+    def test_cache_hit_runs_no_query(self):
+        self.assertEqual(self.authenticate(), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+
+    def test_access_changes_bump_the_token_version(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_staff = True
+        self.save(user, update_fields=['is_staff'])
+        self.assertEqual(User.objects.get(pk=user.pk).token_version, 1)
+
+        user.is_active = False
+        self.save(user)
+        self.assertEqual(user.token_version, 2)
+        self.assertEqual(User.objects.get(pk=user.pk).token_version, 2)
+
+    def test_other_changes_keep_the_token_version(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Janet'
+        self.save(user)
+        self.save(user, update_fields=['last_login'])
+        self.assertEqual(User.objects.get(pk=user.pk).token_version, 0)
+
+    def test_deactivated_user_token_is_rejected(self):
+        self.authenticate()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        self.save(user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_stale_copy_is_replaced_by_newer_tokens(self):
+        # Another process still holds the copy from before the user became staff.
+        self.authenticate()
+        stale = user_cache.get_user(self.user.pk, 0)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_staff = True
+        self.save(user)
+        caches['default'].set(user_cache._key(user.pk), stale)
+
+        promoted = self.authenticate(VersionedAccessToken.for_user(user))
+        self.assertTrue(promoted.is_staff)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_revoked_tokens_are_rejected(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.assertEqual(self.authenticate(VersionedAccessToken.for_user(self.user)), self.user)
@@ -1,8 +1,9 @@
 from django.urls import path
-from users.views import RegisterView, LoginView, ProfileView
+from users.views import RegisterView, LoginView, ProfileView, UserLookupView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='user-register'),
     path('login/', LoginView.as_view(), name='user-login'),
     path('profile/', ProfileView.as_view(), name='user-profile'),
+    path('lookup/', UserLookupView.as_view(), name='user-lookup'),
 ]
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+Keyed HMAC "blind indexes" for encrypted user fields.
+
+The encrypted columns can't be queried, so each one gets a deterministic
+HMAC-SHA256 of its normalized value that supports indexed exact-match
+lookups without revealing the plaintext.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+
+
+def _key() -> bytes:
+    if settings.BLIND_INDEX_KEY:
+        return settings.BLIND_INDEX_KEY.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), b'blind-index', hashlib.sha256).digest()
+
+
+def normalize_email(value: str) -> str:
+    return (value or '').strip().lower()
+
+
+def compute(value: str, purpose: str) -> str:
+    message = f"{purpose}:{value}".encode('utf-8')
+    return hmac.new(_key(), message, hashlib.sha256).hexdigest()
+
+
+def email_index(value: str):
+    value = normalize_email(value)
+    return compute(value, 'email') if value else None
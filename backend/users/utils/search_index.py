@@ -0,0 +1,107 @@
+"""
+Searchable-encryption index for the encrypted user fields.
+
+For each of `SEARCHABLE_FIELDS` a user gets `UserSearchToken` rows holding
+keyed HMACs (see `blind_index.compute`) of the normalized value's tokens
+and token prefixes. Searches hash the query the same way and become indexed
+`digest IN (...)` lookups instead of decrypting the table.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+
+from users.utils import blind_index
+
+SEARCHABLE_FIELDS = ('first_name', 'last_name', 'email')
+MIN_PREFIX = 2
+MAX_PREFIX = 20  # longer terms are matched on their first MAX_PREFIX characters
+
+
+def normalize(value: str) -> str:
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return value.strip().lower()
+
+
+def tokenize(value: str) -> list:
+    return [token for token in re.split(r'[^\w]+', normalize(value)) if token]
+
+
+def token_digest(field: str, token: str) -> str:
+    return blind_index.compute(token[:MAX_PREFIX] if len(token) > MAX_PREFIX else token, f"{field}:token")
+
+
+def prefix_digest(field: str, prefix: str) -> str:
+    return blind_index.compute(prefix[:MAX_PREFIX], f"{field}:prefix")
+
+
+def digests_for(field: str, value: str) -> set:
+    digests = set()
+    # The whole email is also a token so "jane.doe@example.com" matches exactly.
+    tokens = tokenize(value) + ([normalize(value)] if field == 'email' and value else [])
+    for token in tokens:
+        digests.add(token_digest(field, token))
+        for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+            digests.add(prefix_digest(field, token[:length]))
+    return digests
+
+
+def index_user(user):
+    from users.models import UserSearchToken
+
+    rows = [
+        UserSearchToken(user=user, field=field, digest=digest)
+        for field in SEARCHABLE_FIELDS
+        for digest in digests_for(field, getattr(user, field))
+    ]
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user=user).delete()
+        UserSearchToken.objects.bulk_create(rows, batch_size=500)
+
+
+def index_users(users):
+    for user in users:
+        index_user(user)
+
+
+def query_digests(term: str, fields=SEARCHABLE_FIELDS, mode='prefix') -> list:
+    term = normalize(term)
+    if not term:
+        return []
+    if mode == 'exact':
+        return [token_digest(field, term) for field in fields]
+    return [prefix_digest(field, term) for field in fields]
+
+
+def search_users(queryset, query: str, fields=SEARCHABLE_FIELDS, mode='prefix'):
+    """
+    Narrow `queryset` to users whose `fields` match every term of `query`.
+    `mode='prefix'` matches tokens starting with each term, `'exact'` whole
+    tokens (or a whole email address).
+    """
+    from users.models import UserSearchToken
+
+    # A whole email is one token for exact search; anything else is split the
+    # way the index was built, so "Mary-Jane" or "o'brien" need both parts.
+    if mode == 'exact' and '@' in query:
+        lookups = [(query.strip(), 'exact')]
+    else:
+        lookups = []
+        for term in query.split():
+            if mode == 'prefix' and len(normalize(term)) < MIN_PREFIX:
+                return queryset.none()
+            # Parts too short to have prefix digests ("o" in "o'brien") must match whole.
+            lookups += [
+                (token, 'exact' if len(token) < MIN_PREFIX else mode)
+                for token in tokenize(term)
+            ]
+    if not lookups:
+        return queryset.none()
+
+    for token, token_mode in lookups:
+        digests = query_digests(token, fields, token_mode)
+        queryset = queryset.filter(
+            pk__in=UserSearchToken.objects.filter(digest__in=digests).values('user_id')
+        )
+    return queryset
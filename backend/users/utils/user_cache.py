@@ -0,0 +1,48 @@
+"""
+Users loaded for authenticated requests.
+
+`CachedJWTAuthentication` looks the user up here instead of querying the
+row on every request. Entries live in the cache named by
+`AUTH_USER_CACHE_ALIAS` for `AUTH_USER_CACHE_TTL` seconds and are dropped
+when the user is saved. A token whose version differs from the cached one
+causes a fresh load. The encrypted fields are cached encrypted and only
+decrypted if a view reads them (see `documents.fields.lazy_encrypt`).
+
+A hit is trusted as long as its `token_version` matches the token, so a
+request needs no query at all. Changing any of `ACCESS_FIELDS` bumps
+`token_version` (see `User.save`), and tokens issued from then on make
+every process reload the user. With a per-process cache such as the
+default LocMemCache, the invalidation only reaches the process that saved
+the user; elsewhere older tokens keep working until the entry expires,
+so revocation takes up to `AUTH_USER_CACHE_TTL` seconds. A cache shared by
+all processes (Redis, Memcached) drops the entry everywhere at once.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+
+# Fields that decide what a user may do; changing one bumps `token_version`.
+ACCESS_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+
+
+def _key(user_id) -> str:
+    return f"auth-user:{user_id}"
+
+
+def get_user(user_id, token_version: int):
+    """The user `user_id`, from the cache when the cached copy matches `token_version`; None if missing."""
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    if settings.AUTH_USER_CACHE_TTL:
+        user = cache.get(_key(user_id))
+        if user is not None and user.token_version == token_version:
+            return user
+
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None and settings.AUTH_USER_CACHE_TTL:
+        cache.set(_key(user_id), user, settings.AUTH_USER_CACHE_TTL)
+    return user
+
+
+def invalidate(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(_key(user_id))
@@ -1,10 +1,14 @@
-from users.serializers import UserRegistrationSerializer, UserProfileSerializer
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from users.serializers import UserRegistrationSerializer, UserProfileSerializer, UserLookupSerializer
+from users.models import User
+from users.utils import search_index
+from users.authentication import VersionedAccessToken
+from rest_framework_simplejwt.serializers import TokenObtainSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
+from django.db.models import Q
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,10 +27,12 @@ class RegisterView(APIView):
             logger.error(f"Error during user registration: {str(e)}", exc_info=True)
             return Response({'error': 'An error occurred during registration'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class AccessOnlyTokenSerializer(TokenObtainPairSerializer):
+class AccessOnlyTokenSerializer(TokenObtainSerializer):
+    token_class = VersionedAccessToken
+
     def validate(self, attrs):
-        data = super().validate(attrs)
-        return {'access': data['access']}
+        super().validate(attrs)
+        return {'access': str(self.get_token(self.user))}
 
 class LoginView(TokenObtainPairView):
     try:
@@ -45,4 +51,41 @@ class ProfileView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error retrieving user profile: {str(e)}", exc_info=True)
-            return Response({'error': 'An error occurred while retrieving the profile'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': 'An error occurred while retrieving the profile'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class UserLookupView(APIView):
+    """
+    Search users by name or email. Staff search every active account; other
+    users only find the people they share documents with, i.e. the signers of
+    their documents and the owners of documents sent to them.
+    """
+    permission_classes = [IsAuthenticated]
+    max_results = 20
+
+    def get_queryset(self):
+        users = User.objects.filter(is_active=True)
+        if self.request.user.is_staff:
+            return users
+        me = self.request.user
+        related = User.objects.filter(Q(documents_to_sign__owner=me) | Q(created_documents__signer=me)).values('pk')
+        return users.filter(pk__in=related)
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        mode = request.query_params.get('mode', 'prefix')
+        fields = [f for f in request.query_params.get('fields', '').split(',') if f] or list(search_index.SEARCHABLE_FIELDS)
+
+        if mode not in ('prefix', 'exact'):
+            return Response({'error': "mode must be 'prefix' or 'exact'."}, status=status.HTTP_400_BAD_REQUEST)
+        if not set(fields) <= set(search_index.SEARCHABLE_FIELDS):
+            return Response({'error': f"fields must be a subset of {', '.join(search_index.SEARCHABLE_FIELDS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(query) < search_index.MIN_PREFIX:
+            return Response({'error': f"q must be at least {search_index.MIN_PREFIX} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            users = search_index.search_users(self.get_queryset(), query, fields=fields, mode=mode)
+            users = users.order_by('username')[:self.max_results]
+            return Response(UserLookupSerializer(users, many=True).data)
+        except Exception as e:
+            logger.error(f"Error during user lookup: {str(e)}", exc_info=True)
+            return Response({'error': 'An error occurred during user lookup'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -2,7 +2,7 @@
 
 import type React from "react"
 
-import { useState, useMemo } from "react"
+import { useState, useMemo, useEffect, useRef } from "react"
 import { useRouter } from "next/navigation"
 import { useAuth } from "@/contexts/auth-context"
 import { apiClient } from "@/lib/api"
@@ -53,6 +53,38 @@ export default function CreateDocumentPage() {
     signer_last_name: "",
     metadata: {},
   })
+  // Clause previewed through the streaming endpoint; its id lets the generate call skip the AI step
+  const [clausePreview, setClausePreview] = useState("")
+  const [clauseId, setClauseId] = useState<string | null>(null)
+  const [streaming, setStreaming] = useState(false)
+  // Generation runs as a background job; it is polled until the document exists or the job fails
+  const [job, setJob] = useState<{ id: number; status: string; stage: string | null; error: string | null; attempts: number } | null>(null)
+  const pollTimer = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  useEffect(() => () => {
+    if (pollTimer.current) clearTimeout(pollTimer.current)
+  }, [])
+
+  const followJob = (current: any) => {
+    setJob(current)
+    if (current.status === "succeeded") {
+      router.push("/dashboard")
+      return
+    }
+    if (current.status === "failed") {
+      setError(current.error ? `Document generation failed: ${current.error}` : "Document generation failed")
+      setLoading(false)
+      return
+    }
+    pollTimer.current = setTimeout(async () => {
+      try {
+        followJob(await apiClient.getGenerationJob(current.id))
+      } catch (err: any) {
+        setError(err.message || "Failed to check the document's progress")
+        setLoading(false)
+      }
+    }, 2000)
+  }
 
   // Memoize the fields to render based on selected template_type
   const dynamicFields = useMemo(() => {
@@ -65,20 +97,44 @@ export default function CreateDocumentPage() {
     setError("")
 
     try {
-      await apiClient.generateDocument(formData)
-      router.push("/dashboard")
+      // loading stays on while the job is followed
+      followJob(await apiClient.generateDocument(clauseId ? { ...formData, clause_id: clauseId } : formData))
     } catch (err: any) {
       setError(err.message || "Failed to create document")
-    } finally {
       setLoading(false)
     }
   }
 
+  const handlePreviewClause = async () => {
+    setStreaming(true)
+    setError("")
+    setClausePreview("")
+    setClauseId(null)
+
+    try {
+      const result = await apiClient.streamClause(
+        { template_type: formData.template_type, prompt: formData.prompt, metadata: formData.metadata },
+        (text) => setClausePreview((prev) => prev + text),
+      )
+      setClausePreview(new DOMParser().parseFromString(result.clause, "text/html").body.textContent || "")
+      setClauseId(result.clause_id)
+    } catch (err: any) {
+      setError(err.message || "Failed to generate the clause")
+    } finally {
+      setStreaming(false)
+    }
+  }
+
+  // The previewed clause only applies to the inputs it was generated from
+  const clauseInputs = ["template_type", "prompt"]
+
   const handleChange = (field: string, value: string) => {
+    if (clauseInputs.includes(field)) setClauseId(null)
     setFormData((prev) => ({ ...prev, [field]: value }))
   }
 
   const handleMetadataChange = (key: string, value: string) => {
+    setClauseId(null)
     setFormData((prev) => ({
       ...prev,
       metadata: { ...prev.metadata, [key]: value },
@@ -120,6 +176,15 @@ export default function CreateDocumentPage() {
                 </Alert>
               )}
 
+              {job && (job.status === "pending" || job.status === "running") && (
+                <Alert>
+                  <AlertDescription>
+                    {job.status === "running" && job.stage ? `Generating document (${job.stage})...` : "Document queued..."}
+                    {job.error && ` Attempt ${job.attempts} failed (${job.error}); retrying shortly.`}
+                  </AlertDescription>
+                </Alert>
+              )}
+
               <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
                 <div className="space-y-4">
                   <div className="space-y-2">
@@ -160,6 +225,21 @@ export default function CreateDocumentPage() {
                       rows={4}
                       required
                     />
+                    <Button
+                      type="button"
+                      variant="outline"
+                      size="sm"
+                      onClick={handlePreviewClause}
+                      disabled={streaming || !formData.template_type || !formData.prompt}
+                    >
+                      {streaming ? "Generating Clause..." : "Preview Clause"}
+                    </Button>
+                    {clausePreview && (
+                      <div className="rounded-md border bg-white p-3 text-sm text-gray-700 whitespace-pre-wrap">
+                        {clausePreview}
+                        {clauseId && <p className="mt-2 text-xs text-gray-500">This clause will be used in the document.</p>}
+                      </div>
+                    )}
                   </div>
                 </div>
 
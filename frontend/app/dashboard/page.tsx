@@ -23,6 +23,7 @@ interface Document {
 export default function DashboardPage() {
   const { user, logout } = useAuth()
   const [documents, setDocuments] = useState<Document[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const router = useRouter()
 
@@ -43,7 +44,8 @@ export default function DashboardPage() {
   const fetchDocuments = async () => {
     try {
       const data = await apiClient.getDocuments()
-      setDocuments(data)
+      setDocuments(data.results)
+      setNextCursor(data.next_cursor)
     } catch (error) {
       console.error("Failed to fetch documents:", error)
     } finally {
@@ -51,6 +53,17 @@ export default function DashboardPage() {
     }
   }
 
+  const fetchMoreDocuments = async () => {
+    if (!nextCursor) return
+    try {
+      const data = await apiClient.getDocuments(nextCursor)
+      setDocuments((current) => [...current, ...data.results])
+      setNextCursor(data.next_cursor)
+    } catch (error) {
+      console.error("Failed to fetch more documents:", error)
+    }
+  }
+
   const handleDownload = async (id: number, name: string) => {
     try {
       const response = await apiClient.getDocumentPDF(id)
@@ -195,6 +208,13 @@ export default function DashboardPage() {
               ))}
             </div>
           )}
+          {nextCursor && (
+            <div className="flex justify-center mt-6">
+              <Button variant="outline" onClick={fetchMoreDocuments}>
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       </main>
     </div>
@@ -16,6 +16,7 @@ interface Document {
 }
 
 interface Summary {
+  status?: "pending" | "ready" | "failed"
   terms?: string
   responsibilities?: string
   dates?: Record<string, string>
@@ -96,13 +97,17 @@ export default function SignPage() {
   const fetchSummary = async () => {
     setSummaryLoading(true)
     setSummaryError("")
+    let pending = false
     try {
       const data = await apiClient.getSummary(Number(docId))
-      setSummary(data)
+      // Still being computed in the background; check again shortly.
+      pending = data.status === "pending"
+      setSummary(pending ? null : data)
+      if (pending) setTimeout(fetchSummary, 2000)
     } catch (err: any) {
       setSummary(null)
     } finally {
-      setSummaryLoading(false)
+      setSummaryLoading(pending)
     }
   }
 
@@ -114,7 +119,6 @@ export default function SignPage() {
       await fetchSummary()
     } catch (err: any) {
       setSummaryError("Failed to generate summary")
-    } finally {
       setSummaryLoading(false)
     }
   }
@@ -90,6 +90,7 @@ export class ApiClient {
     signer_first_name: string
     signer_last_name: string
     name?: string
+    clause_id?: string
   }) {
     return this.request("/documents/v1/generate/", {
       method: "POST",
@@ -97,8 +98,72 @@ export class ApiClient {
     })
   }
 
-  async getDocuments() {
-    return this.request("/documents/v1/list/")
+  // Streams the AI clause as server-sent events; resolves with the finished clause and its reusable id
+  async streamClause(
+    clauseData: { template_type: string; prompt: string; metadata: Record<string, any>; fresh_clause?: boolean },
+    onDelta: (text: string) => void,
+  ): Promise<{ clause_id: string; clause: string; source: string }> {
+    const headers: HeadersInit = {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream, application/json",
+    }
+    if (this.token) {
+      headers.Authorization = `Bearer ${this.token}`
+    }
+
+    const response = await fetch(`${this.baseURL}/documents/v1/clause/stream/`, {
+      method: "POST",
+      headers,
+      body: JSON.stringify(clauseData),
+    })
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ error: "Network error" }))
+      throw new Error(error.error || error.message || "Request failed")
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let boundary
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+
+        let event = "message"
+        let data = ""
+        for (const line of block.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7)
+          else if (line.startsWith("data: ")) data += line.slice(6)
+        }
+        if (!data) continue
+
+        const payload = JSON.parse(data)
+        if (event === "delta") onDelta(payload.text)
+        else if (event === "done") return payload
+        else if (event === "error") throw new Error(payload.error)
+      }
+    }
+    throw new Error("Clause stream ended unexpectedly")
+  }
+
+  async getGenerationJob(id: number) {
+    return this.request(`/documents/v1/jobs/${id}/`)
+  }
+
+  async getDocuments(cursor?: string | null) {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""
+    return this.request(`/documents/v1/list/${query}`)
+  }
+
+  async getInbox(status: "pending" | "signed" | "all" = "pending", cursor?: string | null) {
+    const params = new URLSearchParams({ status })
+    if (cursor) params.set("cursor", cursor)
+    return this.request(`/documents/v1/inbox/?${params}`)
   }
 
   async getDocumentPDF(id: number) {
@@ -119,6 +184,13 @@ export class ApiClient {
   }
 
   // Signature endpoints
+  async signDocuments(ids: number[]) {
+    return this.request(`/signature/v1/sign/bulk/`, {
+      method: "POST",
+      body: JSON.stringify({ document_ids: ids }),
+    })
+  }
+
   async signDocument(id: number) {
     return this.request(`/signature/v1/sign/${id}/`, {
       method: "POST",